@@ -0,0 +1,241 @@
+import os
+import sys
+import json
+import gzip
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import contextlib
+from collections import namedtuple
+import storage
+import eventlog
+import history
+import monitor
+import diagnostics
+import app_classifier
+
+# A trace file starts with a header line followed by one tab-separated line
+# per second of foreground activity:
+#     <unix seconds>\t<process name>\t<window title>\t<url or empty>
+# Files ending in .gz are gzip-compressed.
+TRACE_HEADER = "#gbtw-trace\t1\n"
+
+TraceSample = namedtuple("TraceSample", "timestamp process_name window_title url")
+
+_UNSAFE_CHARS = str.maketrans({"\t": " ", "\n": " ", "\r": " "})
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class TraceRecorder:
+    """
+    Appends foreground samples to a trace file. Lines are buffered and
+    written in batches like the event log, so recording costs a list append
+    per tick.
+    """
+
+    def __init__(self, path, batch_size=60):
+        self.path = path
+        self.batch_size = batch_size
+        self._buffer = []
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with _open(path, "w") as f:
+                f.write(TRACE_HEADER)
+
+    def append(self, timestamp, process_name, window_title=None, url=None):
+        fields = [str(value or "").translate(_UNSAFE_CHARS) for value in (process_name, window_title, url)]
+        line = f"{timestamp:.3f}\t" + "\t".join(fields) + "\n"
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        with _open(self.path, "a") as f:
+            f.writelines(self._buffer)
+        self._buffer.clear()
+
+    def close(self):
+        self.flush()
+
+
+def read_trace(path):
+    """Yields the TraceSamples of a trace file in order; malformed lines are skipped."""
+    with _open(path, "r") as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) != 4:
+                continue
+            try:
+                timestamp = float(fields[0])
+            except ValueError:
+                continue
+            yield TraceSample(timestamp, fields[1], fields[2] or None, fields[3] or None)
+
+
+@contextlib.contextmanager
+def replay_environment(rulebook=None, difficulty="chill", initial_points=0, storage_kind="memory"):
+    """
+    Sets up a throwaway storage, event log and history and yields a Monitor
+    writing to them. The process-wide storage is restored afterwards.
+
+    Args:
+        rulebook (dict): The rulebook to classify with. Defaults to the current one.
+        difficulty (str): The difficulty level to score with.
+        initial_points (int): The balance before the first sample.
+        storage_kind (str): 'memory', 'json' or 'sqlite'; the backend whose
+                            persistence cost is measured.
+    """
+    if rulebook is None:
+        rulebook = storage.get_storage().read("productivity") or storage.DEFAULTS["productivity"]
+
+    directory = tempfile.mkdtemp(prefix="gbtw-replay-")
+    previous_storage = storage.get_storage()
+    state = storage.create_storage(storage_kind, os.path.join(directory, "state.db") if storage_kind == "sqlite" else directory)
+    storage.set_storage(state)
+    app_classifier._matcher_cache.clear()
+    activity_history = None
+    try:
+        state.write("productivity", rulebook)
+        state.write("settings", {"difficulty_level": difficulty})
+        state.write("points", {"points": initial_points})
+        # Retention is measured against the wall clock, which would purge an old trace
+        activity_history = history.open_history(os.path.join(directory, "history.db"), retention_days=0)
+        event_log = eventlog.EventLog(os.path.join(directory, "activity_log"))
+        replayed = monitor.Monitor(event_log, activity_history, state)
+        yield replayed
+        replayed.close()
+    finally:
+        if activity_history is not None and activity_history.connection is not getattr(state, "connection", None):
+            activity_history.connection.close()
+        storage.set_storage(previous_storage)
+        state.close()
+        app_classifier._matcher_cache.clear()
+        shutil.rmtree(directory, ignore_errors=True)
+
+def replay(samples, rulebook=None, difficulty="chill", initial_points=0, storage_kind="memory", speed=0):
+    """
+    Feeds recorded samples through the classifier, scorer and persistence
+    with the trace's own timestamps as the clock, in a throwaway storage
+    (see replay_environment()).
+
+    Args:
+        samples (iterable): TraceSamples, e.g. from read_trace().
+        speed (float): Replay this many times faster than recorded, or as
+                       fast as possible if 0.
+
+    Returns:
+        dict: Final points, points earned/lost, bonuses, seconds per category,
+              wall-clock time and per-stage timings.
+    """
+    with replay_environment(rulebook, difficulty, initial_points, storage_kind) as replayed:
+        report = {"samples": 0, "first_timestamp": None, "last_timestamp": None,
+                  "points_earned": 0, "points_lost": 0, "bonus_points": 0, "category_seconds": {}}
+        category_seconds = report["category_seconds"]
+        diagnostics.reset()
+        started = time.perf_counter()
+        first_timestamp = None
+        for sample in samples:
+            if first_timestamp is None:
+                first_timestamp = report["first_timestamp"] = sample.timestamp
+            if speed:
+                delay = (sample.timestamp - first_timestamp) / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+
+            app_name = monitor.app_name_from_sample(sample.process_name, sample.window_title, sample.url)
+            if not app_name:
+                continue
+            result = replayed.tick(app_name, now=sample.timestamp, window_title=sample.window_title)
+            report["samples"] += 1
+            report["last_timestamp"] = sample.timestamp
+            category_seconds[result.category] = category_seconds.get(result.category, 0) + 1
+            if result.delta > 0:
+                report["points_earned"] += result.delta
+            else:
+                report["points_lost"] -= result.delta
+            report["bonus_points"] += result.bonus
+
+        elapsed = time.perf_counter() - started
+        simulated = (report["last_timestamp"] - first_timestamp) if report["samples"] else 0
+        report["final_points"] = replayed.state.read("points").get("points", 0)
+        report["elapsed_seconds"] = elapsed
+        report["simulated_seconds"] = simulated
+        report["speedup"] = simulated / elapsed if elapsed else None
+        report["diagnostics"] = diagnostics.snapshot()
+        return report
+
+
+def record(path, duration=None, interval=1.0):
+    """Records the live foreground stream to path (Windows only) until duration seconds pass or Ctrl+C."""
+    import tracker
+
+    recorder = TraceRecorder(path)
+    started = time.time()
+    try:
+        while duration is None or time.time() - started < duration:
+            sample = tracker.get_foreground_sample()
+            if sample is not None:
+                recorder.append(time.time(), *sample)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        recorder.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record or replay GetB@ck2Work foreground activity traces.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="Record the foreground stream (Windows only).")
+    record_parser.add_argument("trace")
+    record_parser.add_argument("--duration", type=float, default=None, help="Stop after this many seconds.")
+
+    replay_parser = commands.add_parser("replay", help="Replay a trace and report points and timings.")
+    replay_parser.add_argument("trace")
+    replay_parser.add_argument("--rulebook", default=None,
+                               help="A productivity.json to classify with. Defaults to the current rulebook.")
+    replay_parser.add_argument("--difficulty", default="chill")
+    replay_parser.add_argument("--points", type=int, default=0, help="The balance before the first sample.")
+    replay_parser.add_argument("--storage", choices=("memory", "json", "sqlite"), default="memory")
+    replay_parser.add_argument("--speed", type=float, default=0,
+                               help="Replay this many times faster than recorded (0: as fast as possible).")
+    replay_parser.add_argument("--output", "-o", default=None, help="Write the report to this JSON file.")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        record(args.trace, args.duration)
+        return
+
+    rulebook = None
+    if args.rulebook:
+        with open(args.rulebook, "r", encoding="utf-8") as f:
+            rulebook = json.load(f)
+    report = replay(read_trace(args.trace), rulebook, args.difficulty, args.points, args.storage, args.speed)
+    if args.output:
+        storage.write_json_atomic(args.output, report)
+        print(f"Report written to '{args.output}'.")
+    else:
+        json.dump(report, sys.stdout, indent=4, ensure_ascii=False)
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -1,84 +1,378 @@
-import os
-import json
+import logging
+import re
+import fnmatch
+import storage
+import diagnostics
+
+logger = logging.getLogger(__name__)
+
+# Rule types understood in productivity.json. Plain strings are treated as
+# "keyword" rules (case-insensitive substring match) for backwards compatibility.
+# Typed rules can be written as a "type:pattern" string (e.g. "exact:Code.exe")
+# or as an object: {"type": "regex", "pattern": "^steam.*", "priority": 10}.
+# "title" rules match the foreground window title instead of the app name:
+# "title:pull request" applies when both words appear in the title.
+RULE_TYPES = ("keyword", "exact", "glob", "regex", "domain", "title")
+
+CATEGORY_KEYS = (
+    ("Productive", "productivity_app"),
+    ("Entertainment", "entertainment_app"),
+)
+
+_RESULT_CACHE_SIZE = 4096
+_TOKEN_PATTERN = re.compile(r"\w+")
+# Leading global flags such as "(?i)" and numbered group references such as
+# "\1": regex rules using either cannot be folded into the shared alternation
+_GLOBAL_FLAGS = re.compile(r"(?:\(\?[aiLmsux]+\))+")
+_NUMBERED_REFERENCE = re.compile(r"(?<!\\)(?:\\\\)*(?:\\[1-9]|\\g<\d|\(\?\(\d)")
+
+# Cache statistics, kept as plain counters because classify() is the hottest call
+_stats = {"classify.cache_hit": 0, "classify.cache_miss": 0, "title.cache_hit": 0, "title.cache_miss": 0,
+          "matcher.reuse": 0, "matcher.compile": 0}
+
+def cache_stats():
+    """Returns the classifier's cache hit/miss counters."""
+    return dict(_stats)
+
+diagnostics.add_counter_source(cache_stats)
 
 def _create_initial_json_file(file_path):
     """
-    Helper function to create an initial, empty JSON file with the expected structure.
+    Helper function to create an initial, empty rulebook with the expected structure.
     """
     initial_data = {
         "productivity_app": [],
         "entertainment_app": []
     }
+    state, key = storage.resolve(file_path)
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(initial_data, f, indent=4, ensure_ascii=False)
-        print(f"Info: '{file_path}' not found. Created an empty file with initial structure.")
-    except IOError as e:
-        print(f"Error: Could not create '{file_path}'. Reason: {e}")
-        # Re-raise the exception or handle appropriately if file creation is critical
-        # For now, we'll let the main function attempt to proceed, but it will likely fail
-        # if the file couldn't be created.
+        state.write(key, initial_data)
+        logger.info("'%s' not found. Created an empty file with initial structure.", file_path)
+    except Exception as e:
+        logger.error("Could not create '%s'. Reason: %s", file_path, e)
+        # For now, we'll let the caller attempt to proceed with an empty rulebook.
+
+def parse_rule(entry):
+    """
+    Converts one entry from productivity.json into a (rule_type, pattern, priority) tuple.
+
+    Args:
+        entry (str | dict): A plain keyword, a "type:pattern" string or a rule object.
+
+    Returns:
+        tuple | None: The parsed rule, or None if the entry is not a valid rule.
+    """
+    if isinstance(entry, str):
+        rule_type, sep, pattern = entry.partition(":")
+        if sep and rule_type.lower() in RULE_TYPES:
+            return rule_type.lower(), pattern, 0
+        if sep and rule_type.lower() == "re":
+            return "regex", pattern, 0
+        return "keyword", entry, 0
+
+    if isinstance(entry, dict):
+        rule_type = str(entry.get("type", "keyword")).lower()
+        pattern = entry.get("pattern")
+        priority = entry.get("priority", 0)
+        if rule_type in RULE_TYPES and isinstance(pattern, str) and isinstance(priority, int):
+            return rule_type, pattern, priority
+
+    return None
+
+
+def rule_text(entry):
+    """
+    Returns the "type:pattern" text form of a rule entry (plain keywords stay as they are).
+    """
+    rule = parse_rule(entry)
+    if rule is None:
+        return str(entry)
+    rule_type, pattern, _ = rule
+    return pattern if rule_type == "keyword" else f"{rule_type}:{pattern}"
+
+def rule_label(entry):
+    """
+    Returns a short human-readable label for a rule entry, e.g. "regex:^steam.* (priority 10)".
+    """
+    rule = parse_rule(entry)
+    if rule is None or not rule[2]:
+        return rule_text(entry)
+    return f"{rule_text(entry)} (priority {rule[2]})"
+
+
+class _CategoryRules:
+    """
+    All rules of one category at one priority level, compiled for fast lookup:
+    exact names and domains live in hash sets, keywords in a set bucketed by
+    length, and every glob/regex rule is folded into a single alternation.
+    Regex rules with global flags or numbered group references, which would
+    break or change meaning inside the alternation, are compiled on their own.
+    """
+
+    def __init__(self):
+        self.exact = set()
+        self.domains = set()
+        self.keywords = set()
+        self.keyword_lengths = ()
+        self.patterns = []
+        self.regex = None
+        self.standalone = []
+
+    def add(self, rule_type, pattern):
+        pattern = pattern.strip()
+        if not pattern:
+            return
+        if rule_type == "exact":
+            self.exact.add(pattern.lower())
+        elif rule_type == "domain":
+            self.domains.add(pattern.lower().lstrip("*.").rstrip("/"))
+        elif rule_type == "keyword":
+            self.keywords.add(pattern.lower())
+        elif rule_type == "glob":
+            self.patterns.append("^" + fnmatch.translate(pattern.lower()))
+        elif rule_type == "regex":
+            flags = _GLOBAL_FLAGS.match(pattern)
+            body = pattern[flags.end():] if flags else pattern
+            wrapped = f"^(?:{body})\\Z"
+            try:
+                if flags or _NUMBERED_REFERENCE.search(body):
+                    prefix = "(?" + "".join(re.findall(r"[aiLmsux]", flags.group())) + ")" if flags else ""
+                    self.standalone.append(re.compile(prefix + wrapped, re.IGNORECASE))
+                else:
+                    re.compile(wrapped)
+                    self.patterns.append(wrapped)
+            except re.error as e:
+                logger.warning("Ignoring invalid regex rule '%s'. Reason: %s", pattern, e)
+
+    def compile(self):
+        self.keyword_lengths = tuple(sorted({len(kw) for kw in self.keywords}))
+        if self.patterns:
+            try:
+                self.regex = re.compile("|".join(self.patterns), re.IGNORECASE)
+            except re.error:
+                # Rules that are valid alone can still clash, e.g. on a group name
+                self.standalone.extend(re.compile(pattern, re.IGNORECASE) for pattern in self.patterns)
+
+    def matches(self, name, domain_candidates):
+        if name in self.exact:
+            return True
+        if self.domains and not self.domains.isdisjoint(domain_candidates):
+            return True
+        if self.keywords:
+            keywords = self.keywords
+            name_length = len(name)
+            for length in self.keyword_lengths:
+                if length > name_length:
+                    break
+                for i in range(name_length - length + 1):
+                    if name[i:i + length] in keywords:
+                        return True
+        if self.regex is not None and self.regex.search(name):
+            return True
+        for regex in self.standalone:
+            if regex.search(name):
+                return True
+        return False
+
+
+def title_tokens(title):
+    """Splits a window title into lowercase words, e.g. "Inbox (3) - Outlook" -> ["inbox", "3", "outlook"]."""
+    return _TOKEN_PATTERN.findall(title.lower())
+
+
+class _TitleIndex:
+    """
+    Inverted index from title words to the title rules containing them.
 
-def classify_app(app_name, categories_file_path="productivity.json"):
+    Each rule is posted under its longest (and so likely rarest) word only.
+    A lookup walks the postings of the title's words and checks the rest of
+    each candidate rule against the title's word set, so its cost grows with
+    the title length and the number of near matches, not with the rule count.
+    """
+
+    def __init__(self):
+        self._postings = {}
+
+    def __bool__(self):
+        return bool(self._postings)
+
+    def add(self, pattern, rank, category):
+        words = frozenset(title_tokens(pattern))
+        if not words:
+            return
+        key = max(words, key=len)
+        self._postings.setdefault(key, []).append((rank, words, category))
+
+    def lookup(self, title):
+        """Returns (rank, category) of the best-ranked rule matching title, or None."""
+        words = set(title_tokens(title))
+        best = None
+        for word in words:
+            for rank, rule_words, category in self._postings.get(word, ()):
+                if (best is None or rank < best[0]) and rule_words <= words:
+                    best = (rank, category)
+        return best
+
+
+def _domain_candidates(name):
+    """
+    Returns the host of a name and all of its parent domains,
+    e.g. "www.youtube.com/watch" -> {"www.youtube.com", "youtube.com", "com"}.
+    """
+    host = re.split(r"[/?#:]", name.split("://", 1)[-1], maxsplit=1)[0]
+    parts = host.split(".")
+    return {".".join(parts[i:]) for i in range(len(parts))}
+
+
+class RuleMatcher:
+    """
+    A compiled rulebook. Rules are grouped by priority (highest first); within a
+    priority level productive rules win over entertainment rules, matching the
+    original keyword behaviour. Title rules are kept in a separate word index
+    and only consulted when a window title is given.
+    """
+
+    def __init__(self, data):
+        levels = {}
+        titles = []
+        for category, key in CATEGORY_KEYS:
+            entries = data.get(key, [])
+            if not isinstance(entries, list):
+                entries = [entries]
+            for entry in entries:
+                rule = parse_rule(entry)
+                if rule is None:
+                    continue
+                rule_type, pattern, priority = rule
+                level = levels.setdefault(priority, {})
+                if rule_type == "title":
+                    titles.append((priority, category, pattern))
+                    continue
+                level.setdefault(category, _CategoryRules()).add(rule_type, pattern)
+
+        # Levels are ranked by priority, highest first; title rules also by category order
+        priorities = sorted(levels, reverse=True)
+        self._levels = []
+        for priority in priorities:
+            compiled = []
+            for category, _ in CATEGORY_KEYS:
+                rules = levels[priority].get(category)
+                if rules is not None:
+                    rules.compile()
+                    compiled.append((category, rules))
+            self._levels.append(compiled)
+
+        level_ranks = {priority: rank for rank, priority in enumerate(priorities)}
+        category_ranks = {category: rank for rank, (category, _) in enumerate(CATEGORY_KEYS)}
+        self._titles = _TitleIndex()
+        for priority, category, pattern in titles:
+            self._titles.add(pattern, (level_ranks[priority], category_ranks[category]), category)
+        self._cache = {}
+        # Per-app title result, reused while the app's window title stays the same
+        self._title_cache = {}
+
+    def _classify_name(self, name):
+        """Returns (priority rank, category) of the best rule matching a lowercase name."""
+        result = self._cache.get(name)
+        if result is not None:
+            _stats["classify.cache_hit"] += 1
+            return result
+        _stats["classify.cache_miss"] += 1
+
+        result = (len(self._levels), "Unclassified")
+        domain_candidates = _domain_candidates(name)
+        for level_rank, level in enumerate(self._levels):
+            for category, rules in level:
+                if rules.matches(name, domain_candidates):
+                    result = (level_rank, category)
+                    break
+            else:
+                continue
+            break
+
+        if len(self._cache) >= _RESULT_CACHE_SIZE:
+            self._cache.clear()
+        self._cache[name] = result
+        return result
+
+    def classify(self, app_name, window_title=None):
+        """
+        Classifies an app by its name and, when given, its window title. A
+        title rule wins over a name rule of the same priority.
+        """
+        name = app_name.lower()
+        if not window_title or not self._titles:
+            return self._classify_name(name)[1]
+
+        cached = self._title_cache.get(name)
+        if cached is not None and cached[0] == window_title:
+            _stats["title.cache_hit"] += 1
+            return cached[1]
+        _stats["title.cache_miss"] += 1
+
+        rank, result = self._classify_name(name)
+        title_match = self._titles.lookup(window_title)
+        if title_match is not None and title_match[0][0] <= rank:
+            result = title_match[1]
+
+        if len(self._title_cache) >= _RESULT_CACHE_SIZE:
+            self._title_cache.clear()
+        self._title_cache[name] = (window_title, result)
+        return result
+
+
+# Compiled matchers keyed by file path, reused until the stored rulebook changes.
+_matcher_cache = {}
+
+def load_matcher(categories_file_path="productivity.json"):
+    """
+    Returns a compiled RuleMatcher for the given rulebook, recompiling it only
+    when the storage backend reports a new version of the document.
+    If the rulebook is missing, empty or invalid it is re-created empty.
+    """
+    state, key = storage.resolve(categories_file_path)
+    identity = getattr(state, "directory", state)
+    signature = state.version(key)
+    cached = _matcher_cache.get(categories_file_path)
+    if cached is not None and signature is not None and cached[0] == identity and cached[1] == signature:
+        _stats["matcher.reuse"] += 1
+        return cached[2]
+    _stats["matcher.compile"] += 1
+
+    data = state.read(key)
+    if not data:
+        logger.warning("'%s' is missing, empty or invalid. Initializing its content.", categories_file_path)
+        _create_initial_json_file(categories_file_path)
+        data = state.read(key)
+        signature = state.version(key)
+
+    matcher = RuleMatcher(data)
+    _matcher_cache[categories_file_path] = (identity, signature, matcher)
+    return matcher
+
+def classify_app(app_name, categories_file_path="productivity.json", window_title=None):
     """
     Classifies an application or website name as 'Productive' or 'Entertainment'
-    based on keywords found in a specified JSON file (e.g., productivity.json).
-    If the file does not exist, it will be created with an empty structure.
+    based on the rules found in the rulebook (productivity.json by default).
+    Rules may be plain keywords or typed rules (exact, glob, regex, domain,
+    title) with an optional priority; see RULE_TYPES.
+    If the rulebook does not exist, it will be created with an empty structure.
 
     Args:
         app_name (str): The name of the application or website to classify.
-        categories_file_path (str): The path to the JSON file containing classification keywords.
+        categories_file_path (str): The path to the JSON file containing classification rules.
                                     Defaults to 'productivity.json'.
+        window_title (str): The title of the app's foreground window, matched by title rules.
 
     Returns:
         str: A message indicating the classification, or an error/not found message.
     """
-    productive_keywords = []
-    entertainment_keywords = []
-
-    # The file creation/check is now handled at the start of the __main__ block
-    # so we assume it exists and is properly initialized at this point.
-    # However, we still need to handle cases where it might be empty or corrupted *after* creation.
-
     try:
-        # Check if the file is empty before loading JSON
-        if os.path.getsize(categories_file_path) == 0:
-            print(f"Warning: '{categories_file_path}' is empty. Initializing its content.")
-            _create_initial_json_file(categories_file_path) # Re-initialize if found empty
-
-        with open(categories_file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f) # Load the JSON data from the file
-
-            # Extract keywords from 'productivity_app' and 'entertainment_app' keys
-            # Ensure they are lists and convert all keywords to lowercase for matching
-            productive_keywords = [kw.lower() for kw in data.get('productivity_app', []) if isinstance(kw, str)]
-            entertainment_keywords = [kw.lower() for kw in data.get('entertainment_app', []) if isinstance(kw, str)]
-
-    except json.JSONDecodeError:
-        print(f"Error: The categories file '{categories_file_path}' is not a valid JSON file. Attempting to re-create it.")
-        _create_initial_json_file(categories_file_path) # Attempt to fix by re-creating
-        # After re-creation, the keywords will be empty. We should then recursively call
-        # the function to re-attempt classification with the now empty but valid file.
-        # This will result in an "unclassified" message for the current app.
-        return classify_app(app_name, categories_file_path)
+        matcher = load_matcher(categories_file_path)
     except Exception as e:
         return f"An unexpected error occurred while reading or processing '{categories_file_path}': {e}"
 
-    # Convert the input app name to lowercase for case-insensitive matching
-    app_name_lower = app_name.lower()
-
-    # Check if the app name contains any productive keywords
-    for keyword in productive_keywords:
-        if keyword in app_name_lower:
-            return "Productive"
-
-    # Check if the app name contains any entertainment keywords
-    for keyword in entertainment_keywords:
-        if keyword in app_name_lower:
-            return "Entertainment"
-
-    # If no match is found in either category
-    return f"Unclassified"
+    return matcher.classify(app_name, window_title)
 
 # --- Example Usage ---
 if __name__ == "__main__":
@@ -0,0 +1,135 @@
+import os
+import sys
+import time
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+
+_listener = None
+_queue_handler = None
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets the first of a run of identical warnings through and drops repeats
+    of it for `interval` seconds. The next one after the quiet period notes
+    how many were dropped. Only WARNING records are limited: errors and
+    routine messages always pass. Records are keyed by logger and the
+    formatted message, so "Could not read '%s'" for two different files
+    is two messages.
+    """
+
+    def __init__(self, interval=60.0, level=logging.WARNING):
+        super().__init__()
+        self.interval = interval
+        self.level = level
+        self._last = {}
+        self._suppressed = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno != self.level:
+            return True
+        message = record.getMessage()
+        key = (record.name, message)
+        now = time.monotonic()
+        with self._lock:
+            last = self._last.get(key)
+            if last is not None and now - last < self.interval:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return False
+            self._last[key] = now
+            suppressed = self._suppressed.pop(key, 0)
+            if len(self._last) > 10000:
+                # Keep the table bounded when many distinct warnings come in
+                self._last = {k: v for k, v in self._last.items() if now - v < self.interval}
+                self._suppressed = {k: v for k, v in self._suppressed.items() if k in self._last}
+        if suppressed:
+            record.msg = f"{message} (repeated {suppressed} more times)"
+            record.args = None
+        return True
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """A QueueHandler that drops records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(directory="logs", level=None, max_bytes=1024 * 1024, backup_count=5,
+                  rate_limit_interval=60.0, queue_size=10000):
+    """
+    Routes all logging through a bounded queue to a background thread that
+    writes rotating log files (and the console, when there is one), so
+    logging from the monitor loop never waits on disk or console I/O.
+
+    Args:
+        directory (str): Where app.log and its rotated copies go; None for console only.
+        level (str): The initial level. Defaults to the GBTW_LOG_LEVEL
+                     environment variable, or INFO.
+        max_bytes (int): Size at which app.log is rotated.
+        backup_count (int): Rotated files to keep.
+        rate_limit_interval (float): Seconds a repeated warning is suppressed for.
+        queue_size (int): Records buffered before new ones are dropped.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    handlers = []
+    formatter = logging.Formatter(LOG_FORMAT)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            os.path.join(directory, "app.log"), maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    # pythonw has no console: sys.stderr is None there
+    if sys.stderr is not None:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    _queue_handler = _NonBlockingQueueHandler(log_queue)
+    _queue_handler.addFilter(RateLimitFilter(rate_limit_interval))
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    set_level(level or os.environ.get("GBTW_LOG_LEVEL", "INFO"))
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def set_level(level):
+    """Changes the log level at runtime ('DEBUG', 'INFO', 'WARNING' or 'ERROR')."""
+    logging.getLogger().setLevel(level.upper() if isinstance(level, str) else level)
+
+def get_level():
+    return logging.getLevelName(logging.getLogger().getEffectiveLevel())
+
+def dropped_records():
+    """Returns how many records were dropped because the queue was full."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+def shutdown_logging():
+    """Writes out queued records and stops the background writer."""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    _listener.stop()
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener = _queue_handler = None
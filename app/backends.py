@@ -0,0 +1,275 @@
+import os
+import sys
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+BACKEND_KINDS = ("windows", "linux", "fake")
+
+
+class Backend:
+    """
+    Interface to the desktop: the foreground window, the visible windows and
+    the processes that own them. Window handles are opaque values.
+    """
+
+    name = "base"
+
+    def foreground_window(self):
+        """Returns (handle, pid) of the foreground window, or None."""
+        raise NotImplementedError
+
+    def window_title(self, handle):
+        """Returns the title of a window ('' if unknown)."""
+        raise NotImplementedError
+
+    def visible_windows(self):
+        """Returns (handle, pid) pairs for every visible top-level window."""
+        raise NotImplementedError
+
+    def process_name(self, pid):
+        """Returns the executable name of a process, or None if it is gone."""
+        raise NotImplementedError
+
+    def browser_url(self, pid):
+        """Returns the address bar contents of the browser owned by pid, or None."""
+        return None
+
+    def idle_seconds(self):
+        """Returns the seconds since the last keyboard or mouse input, or None if unknown."""
+        return None
+
+
+class WindowsBackend(Backend):
+    """Win32 windows, psutil process names and the Chrome address bar via UI Automation."""
+
+    name = "windows"
+
+    def __init__(self):
+        import win32api
+        import win32gui
+        import win32process
+        import psutil
+        self._win32api = win32api
+        self._win32gui = win32gui
+        self._win32process = win32process
+        self._psutil = psutil
+        self._application = None
+
+    def foreground_window(self):
+        handle = self._win32gui.GetForegroundWindow()
+        if not handle:
+            return None
+        _, pid = self._win32process.GetWindowThreadProcessId(handle)
+        return handle, pid
+
+    def window_title(self, handle):
+        return self._win32gui.GetWindowText(handle)
+
+    def visible_windows(self):
+        windows = []
+
+        def collect(handle, _):
+            if self._win32gui.IsWindowVisible(handle):
+                windows.append((handle, self._win32process.GetWindowThreadProcessId(handle)[1]))
+
+        self._win32gui.EnumWindows(collect, None)
+        return windows
+
+    def process_name(self, pid):
+        try:
+            return self._psutil.Process(pid).name()
+        except (self._psutil.NoSuchProcess, self._psutil.AccessDenied, ValueError):
+            return None
+
+    def browser_url(self, pid):
+        if self._application is None:
+            import pywinauto.application
+            self._application = pywinauto.application.Application
+        chromeApp = self._application(backend = "uia").connect(process = pid) # Connects to active Chrome
+        topWindow = chromeApp.top_window()
+        return topWindow.child_window(title = "Address and search bar", control_type = "Edit").get_value() # URL is here
+
+    def idle_seconds(self):
+        # Both are GetTickCount() milliseconds, which wrap around every 49.7 days
+        elapsed = (self._win32api.GetTickCount() - self._win32api.GetLastInputInfo()) & 0xFFFFFFFF
+        return elapsed / 1000
+
+
+class LinuxBackend(Backend):
+    """
+    Process names from /proc/<pid>/comm and windows from the EWMH properties
+    of the X root window (_NET_ACTIVE_WINDOW, _NET_CLIENT_LIST, _NET_WM_PID).
+    Needs python-xlib and an X display (XWayland works); without them only
+    process metadata is available and no foreground window is reported.
+    """
+
+    name = "linux"
+
+    def __init__(self, proc_root="/proc"):
+        self.proc_root = proc_root
+        self._display = None
+        self._atoms = {}
+        try:
+            from Xlib import display as xdisplay
+            self._display = xdisplay.Display()
+        except Exception as e:
+            logger.warning("No X display for window tracking (%s). Only process metadata is available.", e)
+            return
+        self._root = self._display.screen().root
+        for atom in ("_NET_ACTIVE_WINDOW", "_NET_CLIENT_LIST", "_NET_WM_PID", "_NET_WM_NAME", "UTF8_STRING"):
+            self._atoms[atom] = self._display.intern_atom(atom)
+        self._has_screensaver = self._display.has_extension("MIT-SCREEN-SAVER")
+
+    def _property(self, window, atom, property_type=0):
+        try:
+            prop = window.get_full_property(self._atoms[atom], property_type)
+        except Exception:
+            return None
+        return prop.value if prop is not None else None
+
+    def _window_pid(self, window):
+        value = self._property(window, "_NET_WM_PID")
+        return int(value[0]) if value is not None and len(value) else None
+
+    def foreground_window(self):
+        if self._display is None:
+            return None
+        value = self._property(self._root, "_NET_ACTIVE_WINDOW")
+        if value is None or not len(value) or not value[0]:
+            return None
+        window = self._display.create_resource_object("window", value[0])
+        pid = self._window_pid(window)
+        return (value[0], pid) if pid is not None else None
+
+    def window_title(self, handle):
+        if self._display is None:
+            return ""
+        window = self._display.create_resource_object("window", handle)
+        value = self._property(window, "_NET_WM_NAME", self._atoms["UTF8_STRING"])
+        if value is None:
+            return ""
+        return value.decode("utf-8", "replace") if isinstance(value, bytes) else str(value)
+
+    def visible_windows(self):
+        if self._display is None:
+            return []
+        value = self._property(self._root, "_NET_CLIENT_LIST")
+        windows = []
+        for handle in value if value is not None else ():
+            pid = self._window_pid(self._display.create_resource_object("window", handle))
+            if pid is not None:
+                windows.append((handle, pid))
+        return windows
+
+    def idle_seconds(self):
+        if self._display is None or not self._has_screensaver:
+            return None
+        try:
+            return self._display.screensaver_query_info(self._root).idle / 1000
+        except Exception:
+            return None
+
+    def process_name(self, pid):
+        try:
+            with open(os.path.join(self.proc_root, str(pid), "comm"), "r", encoding="utf-8", errors="replace") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+
+class FakeBackend(Backend):
+    """
+    A deterministic in-memory desktop for tests, benchmarks and soak runs:
+    processes, windows and browser URLs are plain dicts the caller fills in.
+    Idle time is measured on `clock` from the last input() call; before the
+    first one the user counts as active.
+    """
+
+    name = "fake"
+
+    def __init__(self, clock=time.time):
+        self.processes = {}
+        self.windows = {}
+        self.urls = {}
+        self.foreground = None
+        self.clock = clock
+        self.last_input = None
+
+    def add_process(self, pid, name, url=None):
+        self.processes[pid] = name
+        if url is not None:
+            self.urls[pid] = url
+
+    def add_window(self, handle, pid, title="", visible=True):
+        self.windows[handle] = (pid, title, visible)
+
+    def focus(self, handle):
+        self.foreground = handle
+
+    def input(self, now=None):
+        """Simulates keyboard or mouse input at now (default: the clock's current time)."""
+        self.last_input = self.clock() if now is None else now
+
+    def foreground_window(self):
+        window = self.windows.get(self.foreground)
+        return (self.foreground, window[0]) if window is not None else None
+
+    def window_title(self, handle):
+        window = self.windows.get(handle)
+        return window[1] if window is not None else ""
+
+    def visible_windows(self):
+        return [(handle, pid) for handle, (pid, _, visible) in self.windows.items() if visible]
+
+    def process_name(self, pid):
+        return self.processes.get(pid)
+
+    def browser_url(self, pid):
+        return self.urls.get(pid)
+
+    def idle_seconds(self):
+        if self.last_input is None:
+            return 0.0
+        return max(0.0, self.clock() - self.last_input)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def create_backend(kind=None):
+    """
+    Creates a desktop backend.
+
+    Args:
+        kind (str): 'windows', 'linux' or 'fake'. Defaults to the GBTW_BACKEND
+                    environment variable, or the one matching this platform.
+
+    Returns:
+        Backend: The new backend.
+    """
+    kind = (kind or os.environ.get("GBTW_BACKEND") or ("windows" if sys.platform == "win32" else "linux")).lower()
+    if kind == "windows":
+        return WindowsBackend()
+    if kind == "linux":
+        return LinuxBackend()
+    if kind == "fake":
+        return FakeBackend()
+    raise ValueError(f"Unknown desktop backend '{kind}'. Expected 'windows', 'linux' or 'fake'.")
+
+def get_backend():
+    """Returns the process-wide backend, creating it on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend()
+    return _backend
+
+def set_backend(backend):
+    """Replaces the process-wide backend (e.g. with a FakeBackend in tests)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,307 @@
+import os
+import json
+import time
+import random
+import logging
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import storage
+import backends
+
+DEFAULT_SIZES = (100, 1000, 10000, 100000)
+
+# Names people actually spend their day in, so the mix has realistic hits
+_COMMON_APPS = [
+    "Code.exe", "WINWORD.EXE", "EXCEL.EXE", "POWERPNT.EXE", "notion.exe", "slack.exe",
+    "Teams.exe", "OUTLOOK.EXE", "pycharm64.exe", "WindowsTerminal.exe", "Discord.exe",
+    "Spotify.exe", "steam.exe", "vlc.exe", "Netflix", "Youtube", "Reddit", "Github",
+    "Stackoverflow", "Google", "Twitch", "Wikipedia", "Figma.exe", "obs64.exe",
+]
+_PRODUCTIVE_KEYWORDS = ["code", "word", "excel", "powerpnt", "notion", "slack", "teams",
+                        "outlook", "pycharm", "terminal", "github", "stackoverflow", "wikipedia", "figma"]
+_ENTERTAINMENT_KEYWORDS = ["discord", "spotify", "steam", "vlc", "netflix", "youtube", "reddit", "twitch"]
+
+
+def _random_word(rng, low=5, high=12):
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(low, high)))
+
+def synthetic_rulebook(size, seed=0):
+    """
+    Returns a rulebook with size rules: the common keywords, a few typed rules
+    and random keywords split evenly between the two lists.
+    """
+    rng = random.Random(seed)
+    productivity = list(_PRODUCTIVE_KEYWORDS) + ["exact:explorer.exe", "glob:*ide*.exe", "domain:docs.python.org"]
+    entertainment = list(_ENTERTAINMENT_KEYWORDS) + ["regex:^game.*\\.exe", "domain:twitter.com"]
+    while len(productivity) + len(entertainment) < size:
+        target = productivity if rng.random() < 0.5 else entertainment
+        target.append(_random_word(rng))
+    return {"productivity_app": productivity, "entertainment_app": entertainment}
+
+def app_name_mix(count, seed=0, pool_size=500, unique_ratio=0.05):
+    """
+    Returns count app names drawn like a real day: a Zipf-like distribution
+    over a pool of names (the common apps first), plus a share of one-off
+    window titles that never repeat.
+    """
+    rng = random.Random(seed)
+    pool = list(_COMMON_APPS) + [f"{_random_word(rng)}.exe" for _ in range(pool_size - len(_COMMON_APPS))]
+    weights = [1 / (rank + 1) for rank in range(len(pool))]
+    names = rng.choices(pool, weights=weights, k=count)
+    for i in range(count):
+        if rng.random() < unique_ratio:
+            names[i] = f"{_random_word(rng, 3, 8)} {_random_word(rng, 3, 8)} - {rng.choice(_COMMON_APPS)}"
+    return names
+
+
+def fake_desktop(process_count=200, windows_per_process=3, visible_ratio=0.3, seed=0):
+    """
+    Returns a backends.FakeBackend with synthetic process and window tables,
+    so the tracker can be benchmarked on any OS.
+    """
+    rng = random.Random(seed)
+    desktop = backends.FakeBackend()
+    for i in range(process_count):
+        pid = 4 * (i + 1)
+        desktop.add_process(pid, rng.choice(_COMMON_APPS + ["svchost.exe", "chrome.exe"]),
+                            url="www.youtube.com/watch?v=benchmark")
+        for _ in range(windows_per_process):
+            handle = len(desktop.windows) + 1
+            desktop.add_window(handle, pid, f"Window {handle}", rng.random() < visible_ratio)
+    desktop.focus(1)
+    return desktop
+
+
+def _summarize(durations_ns):
+    """Returns latency statistics in microseconds for a list of durations."""
+    durations = sorted(durations_ns)
+    count = len(durations)
+    total = sum(durations)
+
+    def percentile(fraction):
+        return durations[min(count - 1, int(fraction * count))] / 1000
+
+    return {
+        "runs": count,
+        "mean_us": total / count / 1000,
+        "p50_us": percentile(0.50),
+        "p95_us": percentile(0.95),
+        "p99_us": percentile(0.99),
+        "min_us": durations[0] / 1000,
+        "max_us": durations[-1] / 1000,
+        "ops_per_sec": count / (total / 1e9) if total else None,
+    }
+
+def _measure(func, args_list):
+    durations = []
+    clock = time.perf_counter_ns
+    for args in args_list:
+        start = clock()
+        func(*args)
+        durations.append(clock() - start)
+    return _summarize(durations)
+
+# Loggers of the measured helpers, some of which log a status message per call
+_HELPER_LOGGERS = ("tracker", "points", "app_classifier", "scoring", "blocker")
+
+@contextlib.contextmanager
+def _quiet():
+    """Raises the helpers' loggers to WARNING so their per-call status messages are neither formatted nor written."""
+    loggers = [logging.getLogger(name) for name in _HELPER_LOGGERS]
+    levels = [logger.level for logger in loggers]
+    for logger in loggers:
+        logger.setLevel(logging.WARNING)
+    try:
+        yield
+    finally:
+        for logger, level in zip(loggers, levels):
+            logger.setLevel(level)
+
+@contextlib.contextmanager
+def _temporary_storage(kind):
+    directory = tempfile.mkdtemp(prefix="gbtw-bench-")
+    path = os.path.join(directory, "bench.db") if kind == "sqlite" else directory
+    state = storage.create_storage(kind, path)
+    previous = storage.get_storage()
+    storage.set_storage(state)
+    try:
+        state.ensure_defaults()
+        yield state
+    finally:
+        storage.set_storage(previous)
+        state.close()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_classify(sizes, samples, seed=0):
+    import app_classifier
+
+    results = []
+    names = [(name,) for name in app_name_mix(samples, seed)]
+    cold_names = [(f"{name} #{i}",) for i, (name,) in enumerate(names)]
+    for size in sizes:
+        with _temporary_storage("memory") as state:
+            state.write("productivity", synthetic_rulebook(size, seed))
+            app_classifier._matcher_cache.clear()
+
+            start = time.perf_counter_ns()
+            app_classifier.classify_app("warmup")
+            results.append({"name": "classify_app.compile", "params": {"rules": size},
+                            **_summarize([time.perf_counter_ns() - start])})
+            results.append({"name": "classify_app", "params": {"rules": size, "mix": "zipf"},
+                            **_measure(app_classifier.classify_app, names)})
+            # Every name unseen: measures the matcher itself rather than its result cache
+            results.append({"name": "classify_app", "params": {"rules": size, "mix": "unique"},
+                            **_measure(app_classifier.classify_app, cold_names)})
+
+            # A tenth of the rules as title rules, and a new window title every sample
+            rulebook = synthetic_rulebook(size, seed)
+            rng = random.Random(seed)
+            for i in range(size // 10):
+                target = rulebook["productivity_app" if i % 2 else "entertainment_app"]
+                target.append(f"title:{_random_word(rng)} {_random_word(rng)}")
+            state.write("productivity", rulebook)
+            titled = [(name, "productivity.json", f"{_random_word(rng, 3, 8)} {_random_word(rng, 3, 8)} - document {i}")
+                      for i, (name,) in enumerate(names)]
+            results.append({"name": "classify_app", "params": {"rules": size, "mix": "titles"},
+                            **_measure(app_classifier.classify_app, titled)})
+    return results
+
+def bench_tracker(samples, rules, processes, kind, seed=0):
+    import app_classifier
+
+    previous_backend = backends._backend
+    desktop = fake_desktop(process_count=processes, seed=seed)
+    backends.set_backend(desktop)
+    try:
+        import tracker
+        import blocker
+        show_popup = blocker.show_popup
+        blocker.show_popup = lambda title, message: None
+        results = []
+        try:
+            with _temporary_storage(kind) as state, _quiet():
+                state.write("productivity", synthetic_rulebook(rules, seed))
+                app_classifier._matcher_cache.clear()
+                names = [(name,) for name in app_name_mix(samples, seed)]
+                params = {"rules": rules, "storage": kind}
+                results.append({"name": "tracker.check_app", "params": params,
+                                **_measure(tracker.check_app, names)})
+
+                handles = list(desktop.windows)
+                rng = random.Random(seed)
+                focus = [rng.choice(handles) for _ in range(min(samples, 2000))]
+
+                def active_app(handle):
+                    desktop.focus(handle)
+                    tracker.get_active_app()
+
+                results.append({"name": "tracker.get_active_app", "params": {"processes": processes},
+                                **_measure(active_app, [(handle,) for handle in focus])})
+                results.append({"name": "tracker.get_all_app_list",
+                                "params": {"processes": processes, "windows": len(desktop.windows)},
+                                **_measure(tracker.get_all_app_list, [()] * max(1, min(samples // 1000, 20)))})
+        finally:
+            blocker.show_popup = show_popup
+        return results
+    finally:
+        backends.set_backend(previous_backend)
+
+def bench_points(samples, kinds, seed=0):
+    import points
+
+    rng = random.Random(seed)
+    values = [(rng.randint(0, 100000),) for _ in range(samples)]
+    results = []
+    for kind in kinds:
+        with _temporary_storage(kind), _quiet():
+            results.append({"name": "points.save_points_to_json", "params": {"storage": kind},
+                            **_measure(points.save_points_to_json, values)})
+            results.append({"name": "points.get_points_from_json", "params": {"storage": kind},
+                            **_measure(points.get_points_from_json, [()] * samples)})
+    return results
+
+def run(sizes=DEFAULT_SIZES, samples=20000, storage_kind="json", processes=200, seed=0):
+    """
+    Runs the whole suite and returns the report as a JSON-compatible dict.
+
+    Args:
+        sizes (tuple): Rulebook sizes (number of rules) for the classifier benchmarks.
+        samples (int): Calls per benchmark (fewer for the expensive ones).
+        storage_kind (str): The storage backend used by tracker.check_app.
+        processes (int): Size of the fake process table.
+        seed (int): Seed for all synthetic data, so runs are comparable.
+    """
+    results = []
+    results += bench_classify(sizes, samples, seed)
+    results += bench_tracker(min(samples, 5000), 1000, processes, storage_kind, seed)
+    results += bench_points(min(samples, 2000), ("json", "sqlite", "memory"), seed)
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": list(sizes),
+            "samples": samples,
+            "storage": storage_kind,
+            "processes": processes,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+def _result_key(result):
+    return result["name"], json.dumps(result["params"], sort_keys=True)
+
+def compare(before, after):
+    """Returns (name, params, p50 before, p50 after, ratio) rows for benchmarks present in both reports."""
+    previous = {_result_key(result): result for result in before["results"]}
+    rows = []
+    for result in after["results"]:
+        old = previous.get(_result_key(result))
+        if old is not None:
+            ratio = result["p50_us"] / old["p50_us"] if old["p50_us"] else None
+            rows.append((result["name"], result["params"], old["p50_us"], result["p50_us"], ratio))
+    return rows
+
+def _print_results(results):
+    for result in results:
+        params = ", ".join(f"{key}={value}" for key, value in result["params"].items())
+        print(f"{result['name']:<30} {params:<40} p50 {result['p50_us']:>10.1f}us  "
+              f"p95 {result['p95_us']:>10.1f}us  p99 {result['p99_us']:>10.1f}us")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the GetB@ck2Work monitor hot path.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="Rulebook sizes to benchmark the classifier with.")
+    parser.add_argument("--samples", type=int, default=20000, help="Calls per benchmark.")
+    parser.add_argument("--storage", choices=("json", "sqlite", "memory"), default="json",
+                        help="Storage backend used for tracker.check_app.")
+    parser.add_argument("--processes", type=int, default=200, help="Size of the fake process table.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quick", action="store_true", help="Small sizes and sample counts for a smoke run.")
+    parser.add_argument("--output", "-o", default=None, help="Write the results to this JSON file.")
+    parser.add_argument("--compare", default=None, help="A previous JSON result to compare p50 latencies with.")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.sizes, args.samples = [100, 1000], 2000
+    report = run(tuple(args.sizes), args.samples, args.storage, args.processes, args.seed)
+    _print_results(report["results"])
+
+    if args.output:
+        storage.write_json_atomic(args.output, report)
+        print(f"Results written to '{args.output}'.")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            before = json.load(f)
+        print("\nChange in p50 latency:")
+        for name, params, old, new, ratio in compare(before, report):
+            change = f"{(ratio - 1) * 100:+.1f}%" if ratio is not None else "n/a"
+            print(f"{name:<30} {json.dumps(params):<40} {old:>10.1f}us -> {new:>10.1f}us  {change}")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
+import logging
 import tkinter as tk
 import tkinter.font as tkFont
 from PIL import Image, ImageTk
 import os
 
+logger = logging.getLogger(__name__)
+
 CUSTOM_POPUP_IMAGE_PATH = "get-back-to-work.gif"
 
 def show_popup(title, message):
@@ -55,7 +58,7 @@ def show_popup(title, message):
         photo_image = ImageTk.PhotoImage(resized_image)
 
     except Exception as e:
-        print(f"Error loading image: {e}")
+        logger.error("Error loading image: %s", e)
         fallback_label = tk.Label(
             popup,
             text=message,
@@ -1,6 +1,7 @@
 import customtkinter as ctk
-import random
 from typing import Callable
+import casino_engine
+import ui_scheduler
 
 # --- Point System Class ---
 class PointSystem:
@@ -18,10 +19,13 @@ class PointSystem:
 
 # --- Casino Window Class ---
 class CasinoWindow(ctk.CTkToplevel):
-    def __init__(self, parent, point_system, on_points_update: Callable[[int], None]):
+    def __init__(self, parent, point_system, on_points_update: Callable[[int], None], engine=None, scheduler=None):
         super().__init__(parent)
         self.point_system = point_system
         self.on_points_update = on_points_update
+        self.engine = engine or casino_engine.SlotEngine()
+        # Animations run from the app's scheduler; a standalone window gets its own
+        self.scheduler = scheduler or getattr(parent, "scheduler", None) or ui_scheduler.FrameScheduler(self).start()
 
         # Window setup
         self.title("Gamble Your Points Casino")
@@ -60,7 +64,7 @@ class CasinoWindow(ctk.CTkToplevel):
         # Spin button
         self.spin_button = ctk.CTkButton(
             self,
-            text="SPIN! (Costs 10 points)",
+            text=f"SPIN! (Costs {self.engine.spin_cost} points)",
             command=self.spin,
             font=ctk.CTkFont(size=16, weight="bold"),
             fg_color="#1ABC9C",
@@ -79,57 +83,21 @@ class CasinoWindow(ctk.CTkToplevel):
         )
         self.result_label.pack(pady=20)
 
-        # Possible outcomes
-        self.outcomes = [
-            ("🎯", "Extra Focus Points!", self.give_points),
-            ("💡", "Productivity Tip!", self.show_tip),
-            ("😳", "Dare Time!", self.show_dare),
-            ("💀", "All Points Lost!", self.lose_all_points)
-        ]
-
-        # Productivity tips
-        self.tips = [
-            "Take a 5-minute break every 25 minutes (Pomodoro Technique)",
-            "Use the 2-minute rule: if a task takes less than 2 minutes, do it now",
-            "Start your day with the most important task",
-            "Use the Eisenhower Matrix to prioritize tasks",
-            "Practice deep work: focus on one task for 90 minutes",
-            "Use the 80/20 rule: focus on the 20% of tasks that yield 80% of results",
-            "Create a 'not-to-do' list to avoid distractions",
-            "Use the 'eat the frog' method: tackle your hardest task first",
-            "Batch similar tasks together",
-            "Use the 'touch it once' rule: handle each task only once"
-        ]
-
-        # Dares
-        self.dares = [
-            "Text your mom you love her. No context.",
-            "Post 'I love productivity!' on your social media",
-            "Send a voice message to a friend saying 'I'm being productive!'",
-            "Take a selfie with your most productive face and send it to a friend",
-            "Record yourself doing a productivity dance and send it to a friend",
-            "Call a friend and tell them about your productivity goals",
-            "Post a screenshot of your current task on social media",
-            "Send a motivational quote to 3 friends",
-            "Record yourself saying 'I am a productivity machine!' and send it to a friend",
-            "Take a video of yourself organizing your workspace and send it to a friend"
-        ]
-
         # Disable spin button if not enough points
         self.update_spin_button()
 
     def update_spin_button(self):
-        if self.point_system.get_points() < 10:
+        if not self.engine.can_spin(self.point_system.get_points()):
             self.spin_button.configure(state='disabled')
         else:
             self.spin_button.configure(state='normal')
 
     def spin(self):
-        if self.point_system.get_points() < 10:
+        if not self.engine.can_spin(self.point_system.get_points()):
             return
 
         # Deduct points
-        self.point_system.deduct_points(10)
+        self.point_system.deduct_points(self.engine.spin_cost)
         self.points_label.configure(text=f"Current Points: {self.point_system.get_points()}")
         self.update_spin_button()
 
@@ -139,56 +107,36 @@ class CasinoWindow(ctk.CTkToplevel):
         # Animate slots
         self.animate_slots()
 
-    def animate_slots(self, iteration=0):
-        if iteration < 20:  # Number of animation frames
-            for slot in self.slots:
-                outcome = random.choice(self.outcomes)
-                slot.configure(text=outcome[0])
-            self.after(100, lambda: self.animate_slots(iteration + 1))
-        else:
-            # Final result
-            outcome = random.choice(self.outcomes)
-            for slot in self.slots:
-                slot.configure(text=outcome[0])
-
-            # Show result
-            self.result_label.configure(text=outcome[1])
+    def animate_slots(self):
+        # 20 animation frames of 100 ms, then the final result
+        self.scheduler.animate(20, 0.1, self.show_reel_frame, self.finish_spin)
 
-            # Execute outcome
-            outcome[2]()
+    def show_reel_frame(self, index):
+        for slot in self.slots:
+            slot.configure(text=self.engine.reel_symbol())
 
-            # Re-enable spin button
-            self.update_spin_button()
+    def finish_spin(self):
+        # Final result
+        draw = self.engine.draw()
+        for slot in self.slots:
+            slot.configure(text=draw.outcome.symbol)
 
-    def give_points(self):
-        points = random.randint(20, 50)
-        self.point_system.add_points(points)
-        self.points_label.configure(text=f"Current Points: {self.point_system.get_points()}")
-        self.result_label.configure(
-            text=f"{self.result_label.cget('text')}\nYou won {points} points!"
-        )
-        self.on_points_update(self.point_system.get_points())
-
-    def show_tip(self):
-        tip = random.choice(self.tips)
-        self.result_label.configure(
-            text=f"{self.result_label.cget('text')}\n\nProductivity Tip:\n{tip}"
-        )
-
-    def show_dare(self):
-        dare = random.choice(self.dares)
-        self.result_label.configure(
-            text=f"{self.result_label.cget('text')}\n\nYour Dare:\n{dare}"
-        )
-
-    def lose_all_points(self):
+        # Execute outcome
         points = self.point_system.get_points()
-        self.point_system.deduct_points(points)
+        new_points = self.engine.apply(draw, points)
+        if new_points > points:
+            self.point_system.add_points(new_points - points)
+        elif new_points < points:
+            self.point_system.deduct_points(points - new_points)
+
+        # Show result
+        self.result_label.configure(text=casino_engine.describe(draw, points - new_points))
         self.points_label.configure(text=f"Current Points: {self.point_system.get_points()}")
-        self.result_label.configure(
-            text=f"{self.result_label.cget('text')}\n\nYou lost all {points} points!"
-        )
-        self.on_points_update(self.point_system.get_points())
+        if new_points != points:
+            self.on_points_update(self.point_system.get_points())
+
+        # Re-enable spin button
+        self.update_spin_button()
 
 if __name__ == "__main__":
     ctk.set_appearance_mode("dark")  # Optional: "light", "dark", or "system"
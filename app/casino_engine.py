@@ -0,0 +1,301 @@
+import json
+import random
+import argparse
+from collections import namedtuple
+import scoring
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; simulate() falls back to a pure-Python loop
+    np = None
+
+# One kind of slot result. effect is one of EFFECTS; give_points pays a
+# uniformly drawn amount between min_points and max_points (inclusive).
+# weight is the outcome's relative chance.
+Outcome = namedtuple("Outcome", "symbol label effect weight min_points max_points")
+
+# A drawn result: the outcome, the points won (give_points) and the tip or dare text
+Draw = namedtuple("Draw", "outcome points text")
+
+EFFECTS = ("give_points", "show_tip", "show_dare", "lose_all_points")
+
+SPIN_COST = 10
+
+DEFAULT_PAYOUT_TABLE = (
+    Outcome("🎯", "Extra Focus Points!", "give_points", 1, 20, 50),
+    Outcome("💡", "Productivity Tip!", "show_tip", 1, 0, 0),
+    Outcome("😳", "Dare Time!", "show_dare", 1, 0, 0),
+    Outcome("💀", "All Points Lost!", "lose_all_points", 1, 0, 0),
+)
+
+TIPS = (
+    "Take a 5-minute break every 25 minutes (Pomodoro Technique)",
+    "Use the 2-minute rule: if a task takes less than 2 minutes, do it now",
+    "Start your day with the most important task",
+    "Use the Eisenhower Matrix to prioritize tasks",
+    "Practice deep work: focus on one task for 90 minutes",
+    "Use the 80/20 rule: focus on the 20% of tasks that yield 80% of results",
+    "Create a 'not-to-do' list to avoid distractions",
+    "Use the 'eat the frog' method: tackle your hardest task first",
+    "Batch similar tasks together",
+    "Use the 'touch it once' rule: handle each task only once",
+)
+
+DARES = (
+    "Text your mom you love her. No context.",
+    "Post 'I love productivity!' on your social media",
+    "Send a voice message to a friend saying 'I'm being productive!'",
+    "Take a selfie with your most productive face and send it to a friend",
+    "Record yourself doing a productivity dance and send it to a friend",
+    "Call a friend and tell them about your productivity goals",
+    "Post a screenshot of your current task on social media",
+    "Send a motivational quote to 3 friends",
+    "Record yourself saying 'I am a productivity machine!' and send it to a friend",
+    "Take a video of yourself organizing your workspace and send it to a friend",
+)
+
+
+def load_payout_table(file_path):
+    """
+    Reads a payout table from a JSON list of outcome objects, e.g.
+    [{"symbol": "🎯", "label": "Extra Focus Points!", "effect": "give_points",
+      "weight": 2, "min_points": 20, "max_points": 50}, ...].
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    table = []
+    for entry in entries:
+        outcome = Outcome(entry["symbol"], entry.get("label", ""), entry["effect"], entry.get("weight", 1),
+                          entry.get("min_points", 0), entry.get("max_points", 0))
+        if outcome.effect not in EFFECTS:
+            raise ValueError(f"Unknown outcome effect '{outcome.effect}'. Expected one of {', '.join(EFFECTS)}.")
+        table.append(outcome)
+    return tuple(table)
+
+
+def describe(draw, points_lost=0):
+    """Returns the result text shown for a draw; points_lost is what a lose-all took."""
+    text = draw.outcome.label
+    effect = draw.outcome.effect
+    if effect == "give_points":
+        text += f"\nYou won {draw.points} points!"
+    elif effect == "show_tip":
+        text += f"\n\nProductivity Tip:\n{draw.text}"
+    elif effect == "show_dare":
+        text += f"\n\nYour Dare:\n{draw.text}"
+    elif effect == "lose_all_points":
+        text += f"\n\nYou lost all {points_lost} points!"
+    return text
+
+
+class SlotEngine:
+    """
+    The slot machine without any widgets: what a spin costs, which outcome it
+    lands on and what that does to the balance. Both casino windows animate
+    its draws; simulate() plays it millions of times for balancing.
+    """
+
+    def __init__(self, payout_table=DEFAULT_PAYOUT_TABLE, spin_cost=SPIN_COST, seed=None):
+        """
+        Args:
+            payout_table (tuple): The Outcomes a spin can land on.
+            spin_cost (int): Points paid per spin.
+            seed (int): Seeds the engine's own RNG, for reproducible spins.
+        """
+        if not payout_table or sum(outcome.weight for outcome in payout_table) <= 0:
+            raise ValueError("The payout table needs at least one outcome with a positive weight.")
+        self.payout_table = tuple(payout_table)
+        self.spin_cost = spin_cost
+        self.rng = random.Random(seed)
+        self._weights = [outcome.weight for outcome in self.payout_table]
+
+    def can_spin(self, balance):
+        return balance >= self.spin_cost
+
+    def pay(self, balance):
+        """Returns the balance after paying for a spin."""
+        if not self.can_spin(balance):
+            raise ValueError(f"A spin costs {self.spin_cost} points; only {balance} available.")
+        return balance - self.spin_cost
+
+    def reel_symbol(self):
+        """Returns a random symbol for an animation frame."""
+        return self.rng.choice(self.payout_table).symbol
+
+    def draw(self):
+        """Picks the outcome of a spin, with its payout or text."""
+        outcome = self.rng.choices(self.payout_table, weights=self._weights)[0]
+        points = self.rng.randint(outcome.min_points, outcome.max_points) if outcome.effect == "give_points" else 0
+        text = None
+        if outcome.effect == "show_tip":
+            text = self.rng.choice(TIPS)
+        elif outcome.effect == "show_dare":
+            text = self.rng.choice(DARES)
+        return Draw(outcome, points, text)
+
+    def apply(self, draw, balance):
+        """Returns the balance after a drawn outcome takes effect."""
+        if draw.outcome.effect == "give_points":
+            return balance + draw.points
+        if draw.outcome.effect == "lose_all_points":
+            return 0
+        return balance
+
+    def spin(self, balance):
+        """
+        Pays for a spin and applies its outcome in one step.
+
+        Returns:
+            tuple: (Draw, new balance)
+        """
+        balance = self.pay(balance)
+        draw = self.draw()
+        return draw, self.apply(draw, balance)
+
+    def expected_value(self, balance):
+        """The exact average points change of one spin made with balance points."""
+        total = sum(self._weights)
+        value = -self.spin_cost
+        for outcome in self.payout_table:
+            chance = outcome.weight / total
+            if outcome.effect == "give_points":
+                value += chance * (outcome.min_points + outcome.max_points) / 2
+            elif outcome.effect == "lose_all_points":
+                value -= chance * (balance - self.spin_cost)
+        return value
+
+    def simulate(self, n_spins, initial_balance=100, session_spins=100, seed=None, chunk_spins=2_000_000):
+        """
+        Monte Carlo simulation of players who each start with initial_balance
+        and keep spinning for up to session_spins spins or until they cannot
+        pay for another one. Sessions are played until n_spins spins have been
+        made in total.
+
+        Many sessions are simulated at once as an array, a block of spins at a
+        time; sessions that ended drop out, so work follows the spins played.
+
+        Returns:
+            dict: Spins played, the mean and variance of the points change per
+                  spin, the ruin probability (sessions that ended unable to
+                  pay), the mean final balance and mean spins per session.
+        """
+        if np is None:
+            return self._simulate_python(n_spins, initial_balance, session_spins, seed)
+
+        rng = np.random.default_rng(seed if seed is not None else self.rng.getrandbits(64))
+        weights = np.array(self._weights, dtype=np.float64)
+        chances = weights / weights.sum()
+        lose_codes = [i for i, outcome in enumerate(self.payout_table) if outcome.effect == "lose_all_points"]
+        payouts = [(code, outcome.min_points, outcome.max_points + 1)
+                   for code, outcome in enumerate(self.payout_table) if outcome.effect == "give_points"]
+        cost = self.spin_cost
+        block = min(16, session_spins)
+
+        spins = sessions = ruined = 0
+        delta_sum = delta_square_sum = final_sum = 0.0
+        while spins < n_spins and session_spins > 0:
+            # Size the batch from the spins per session seen so far
+            per_session = spins / sessions if sessions else session_spins
+            count = max(1, min(chunk_spins // block, -int(-(n_spins - spins) // max(per_session, 1))))
+            balance = np.full(count, initial_balance, dtype=np.int64)
+            alive = balance >= cost
+            for start in range(0, session_spins, block):
+                rows = np.flatnonzero(alive)
+                if not rows.size:
+                    break
+                codes = rng.choice(len(chances), size=(rows.size, min(block, session_spins - start)), p=chances)
+                net = np.full(codes.shape, -cost, dtype=np.int64)
+                for code, low, high in payouts:
+                    mask = codes == code
+                    net[mask] += rng.integers(low, high, size=int(mask.sum()))
+                lose = np.isin(codes, lose_codes)
+
+                # Balance before each spin of the block, ignoring lose-all (nothing after one is played)
+                before = np.empty(codes.shape, dtype=np.int64)
+                before[:, 0] = 0
+                np.cumsum(net[:, :-1], axis=1, out=before[:, 1:])
+                before += balance[rows, None]
+                lost_earlier = np.zeros(codes.shape, dtype=bool)
+                lost_earlier[:, 1:] = np.logical_or.accumulate(lose[:, :-1], axis=1)
+                played = np.logical_and.accumulate((before >= cost) & ~lost_earlier, axis=1)
+
+                deltas = np.where(lose, -before, net)
+                balance[rows] += np.where(played, deltas, 0).sum(axis=1)
+                alive[rows] = played[:, -1] & (balance[rows] >= cost)
+                deltas = deltas[played]
+                spins += deltas.size
+                delta_sum += float(deltas.sum())
+                delta_square_sum += float(np.square(deltas, dtype=np.float64).sum())
+            sessions += count
+            final_sum += float(balance.sum())
+            ruined += int((balance < cost).sum())
+
+        return self._report(spins, sessions, delta_sum, delta_square_sum, final_sum, ruined, session_spins)
+
+    def _simulate_python(self, n_spins, initial_balance, session_spins, seed):
+        saved, self.rng = self.rng, random.Random(seed if seed is not None else self.rng.getrandbits(64))
+        try:
+            spins = sessions = ruined = 0
+            delta_sum = delta_square_sum = final_sum = 0.0
+            while spins < n_spins and session_spins > 0:
+                balance = initial_balance
+                for _ in range(session_spins):
+                    if not self.can_spin(balance):
+                        break
+                    _, new_balance = self.spin(balance)
+                    delta = new_balance - balance
+                    balance = new_balance
+                    spins += 1
+                    delta_sum += delta
+                    delta_square_sum += delta * delta
+                sessions += 1
+                final_sum += balance
+                ruined += balance < self.spin_cost
+            return self._report(spins, sessions, delta_sum, delta_square_sum, final_sum, ruined, session_spins)
+        finally:
+            self.rng = saved
+
+    @staticmethod
+    def _report(spins, sessions, delta_sum, delta_square_sum, final_sum, ruined, session_spins):
+        mean = delta_sum / spins if spins else 0.0
+        return {
+            "spins": spins,
+            "sessions": sessions,
+            "session_spins": session_spins,
+            "expected_value": mean,
+            "variance": delta_square_sum / spins - mean * mean if spins else 0.0,
+            "ruin_probability": ruined / sessions if sessions else 0.0,
+            "mean_final_balance": final_sum / sessions if sessions else 0.0,
+            "mean_spins_per_session": spins / sessions if sessions else 0.0,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate the GetB@ck2Work casino to balance its payouts.")
+    parser.add_argument("--spins", type=int, default=1_000_000, help="Spins to simulate in total.")
+    parser.add_argument("--balance", type=int, default=100, help="Points each simulated player starts with.")
+    parser.add_argument("--session-spins", type=int, default=100, help="Most spins one player makes.")
+    parser.add_argument("--cost", type=int, default=SPIN_COST, help="Points per spin.")
+    parser.add_argument("--table", default=None, help="A JSON payout table (see load_payout_table).")
+    parser.add_argument("--difficulty", default="chill", help="Express costs in seconds of productive work at this level.")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    table = load_payout_table(args.table) if args.table else DEFAULT_PAYOUT_TABLE
+    engine = SlotEngine(table, args.cost, args.seed)
+    report = engine.simulate(args.spins, args.balance, args.session_spins, args.seed)
+
+    rules = scoring.difficulty_rules(args.difficulty)
+    points_per_second = rules["productive_points"] / rules["productive_interval"]
+    print(f"{report['spins']} spins in {report['sessions']} sessions of up to {args.session_spins} "
+          f"starting at {args.balance} points")
+    print(f"  points per spin:   {report['expected_value']:+.2f} (variance {report['variance']:.1f})")
+    print(f"  ruin probability:  {report['ruin_probability']:.1%}")
+    print(f"  final balance:     {report['mean_final_balance']:.1f} on average "
+          f"after {report['mean_spins_per_session']:.1f} spins")
+    if points_per_second > 0:
+        print(f"  one spin costs {-report['expected_value'] / points_per_second:.0f} seconds of productive "
+              f"work on average at '{args.difficulty}'")
+
+if __name__ == "__main__":
+    main()
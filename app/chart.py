@@ -0,0 +1,237 @@
+import itertools
+import tkinter as tk
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; downsampling falls back to pure Python
+    np = None
+
+
+def lttb(points, threshold):
+    """
+    Downsamples a time series with Largest-Triangle-Three-Buckets: keeps the
+    first and last points and, from each of threshold - 2 buckets, the point
+    forming the largest triangle with the previously kept point and the
+    average of the next bucket. This preserves the visual shape far better
+    than plain decimation.
+
+    Args:
+        points (list): (x, y) pairs sorted by x.
+        threshold (int): The number of points to keep.
+
+    Returns:
+        list: The kept (x, y) pairs.
+    """
+    length = len(points)
+    if threshold >= length or threshold < 3:
+        return list(points)
+    if np is not None:
+        return _lttb_numpy(points, threshold)
+
+    sampled = [points[0]]
+    bucket_size = (length - 2) / (threshold - 2)
+    previous = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+
+        # Average of the next bucket (the last point for the final bucket)
+        next_start = end
+        next_end = min(int((bucket + 2) * bucket_size) + 1, length)
+        if next_start >= next_end:
+            average_x, average_y = points[-1]
+        else:
+            count = next_end - next_start
+            average_x = sum(point[0] for point in points[next_start:next_end]) / count
+            average_y = sum(point[1] for point in points[next_start:next_end]) / count
+
+        previous_x, previous_y = points[previous]
+        best_area = -1
+        best = start
+        for index in range(start, end):
+            x, y = points[index]
+            area = abs((previous_x - average_x) * (y - previous_y) - (previous_x - x) * (average_y - previous_y))
+            if area > best_area:
+                best_area = area
+                best = index
+        sampled.append(points[best])
+        previous = best
+
+    sampled.append(points[-1])
+    return sampled
+
+def _lttb_numpy(points, threshold):
+    data = np.asarray(points, dtype=np.float64)
+    xs, ys = data[:, 0], data[:, 1]
+    length = len(data)
+    bucket_size = (length - 2) / (threshold - 2)
+    edges = (np.arange(threshold - 1) * bucket_size).astype(np.int64) + 1
+    edges[-1] = length - 1
+
+    # Bucket averages in one pass via cumulative sums
+    cumulative_x = np.concatenate(([0.0], np.cumsum(xs)))
+    cumulative_y = np.concatenate(([0.0], np.cumsum(ys)))
+    starts, ends = edges[:-1], edges[1:]
+    counts = np.maximum(ends - starts, 1)
+    average_x = (cumulative_x[ends] - cumulative_x[starts]) / counts
+    average_y = (cumulative_y[ends] - cumulative_y[starts]) / counts
+
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0] = 0
+    kept[-1] = length - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = starts[bucket], ends[bucket]
+        if bucket + 1 < threshold - 2:
+            next_x, next_y = average_x[bucket + 1], average_y[bucket + 1]
+        else:
+            next_x, next_y = xs[-1], ys[-1]
+        previous_x, previous_y = xs[previous], ys[previous]
+        areas = np.abs((previous_x - next_x) * (ys[start:end] - previous_y)
+                       - (previous_x - xs[start:end]) * (next_y - previous_y))
+        previous = start + int(np.argmax(areas)) if end > start else start
+        kept[bucket + 1] = previous
+
+    return [tuple(point) for point in data[kept].tolist()]
+
+
+def lttb_stream(points, length, threshold):
+    """
+    LTTB over an iterable of known length, e.g. rows streamed from the
+    history. Buckets are the same as lttb()'s, but only the current and the
+    next bucket are held in memory, so a long series never has to be loaded
+    as a whole.
+
+    Args:
+        points (iterable): (x, y) pairs sorted by x.
+        length (int): The number of pairs points yields. If it yields fewer,
+                      the missing buckets are skipped; extra pairs are ignored
+                      except that the last one read is kept.
+        threshold (int): The number of points to keep.
+
+    Returns:
+        list: The kept (x, y) pairs.
+    """
+    points = iter(points)
+    if threshold >= length or threshold < 3:
+        return list(itertools.islice(points, length))
+    first = next(points, None)
+    if first is None:
+        return []
+
+    bucket_size = (length - 2) / (threshold - 2)
+    bucket_end = lambda bucket: min(int(bucket * bucket_size) + 1, length)
+    sampled = [first]
+    previous = first
+    current = list(itertools.islice(points, bucket_end(1) - 1))
+    for bucket in range(1, threshold - 1):
+        # The next bucket; after the last one that is the final point
+        following = list(itertools.islice(points, bucket_end(bucket + 1) - bucket_end(bucket)))
+        if current:
+            if following:
+                average_x = sum(point[0] for point in following) / len(following)
+                average_y = sum(point[1] for point in following) / len(following)
+            else:
+                average_x, average_y = current[-1]
+            previous = _largest_triangle(previous, current, average_x, average_y)
+            sampled.append(previous)
+        current = following if following else current[-1:] if current else []
+        if not following:
+            break
+
+    last = current[-1] if current else None
+    if last is not None and last is not sampled[-1]:
+        sampled.append(last)
+    return sampled
+
+def _largest_triangle(previous, bucket, average_x, average_y):
+    previous_x, previous_y = previous
+    if np is not None and len(bucket) > 32:
+        data = np.asarray(bucket, dtype=np.float64)
+        areas = np.abs((previous_x - average_x) * (data[:, 1] - previous_y)
+                       - (previous_x - data[:, 0]) * (average_y - previous_y))
+        return bucket[int(np.argmax(areas))]
+    return max(bucket, key=lambda point: abs((previous_x - average_x) * (point[1] - previous_y)
+                                             - (previous_x - point[0]) * (average_y - previous_y)))
+
+
+class PointsChart(tk.Canvas):
+    """
+    A lightweight line chart of the points balance over time.
+
+    set_data() downsamples the full series with LTTB and draws it once.
+    append() only adds a short line segment for each new point; the chart is
+    redrawn from scratch only when a point falls outside the current axes
+    (which keep some headroom) or too many live segments have piled up.
+    """
+
+    def __init__(self, master, max_points=1000, padding=10, line_color="#4a9eff", **kwargs):
+        kwargs.setdefault("highlightthickness", 0)
+        super().__init__(master, **kwargs)
+        self.max_points = max_points
+        self.padding = padding
+        self.line_color = line_color
+        self._points = []
+        self._live_segments = 0
+        self._bounds = None
+        self.bind("<Configure>", lambda event: self.redraw())
+
+    def set_data(self, points):
+        """
+        Replaces the series with (timestamp, balance) pairs sorted by time.
+        Points appended after the last of them (e.g. while the history was
+        still loading) are kept.
+        """
+        last = points[-1][0] if points else None
+        live = [point for point in self._points if last is None or point[0] > last]
+        self._points = lttb(points, self.max_points) + live
+        self.redraw()
+
+    def append(self, timestamp, balance):
+        """Adds one point, drawing just the new segment when it fits the axes."""
+        point = (timestamp, balance)
+        previous = self._points[-1] if self._points else None
+        self._points.append(point)
+        self._live_segments += 1
+
+        if (previous is None or self._bounds is None or not self._fits(point)
+                or self._live_segments > self.max_points // 10):
+            self.redraw()
+            return
+        self.create_line(*self._to_canvas(previous), *self._to_canvas(point),
+                         fill=self.line_color, width=2, tags="series")
+
+    def redraw(self):
+        """Re-downsamples the series and draws it with fresh axes."""
+        self.delete("series")
+        self._live_segments = 0
+        if len(self._points) > self.max_points:
+            self._points = lttb(self._points, self.max_points)
+        if len(self._points) < 2:
+            self._bounds = None
+            return
+
+        xs = [point[0] for point in self._points]
+        ys = [point[1] for point in self._points]
+        x_span = max(xs[-1] - xs[0], 60)
+        y_low, y_high = min(ys), max(ys)
+        y_margin = max((y_high - y_low) * 0.1, 10)
+        # Leave headroom to the right and above so live points rarely force a redraw
+        self._bounds = (xs[0], xs[0] + x_span * 1.1, max(0, y_low - y_margin), y_high + y_margin)
+
+        coordinates = []
+        for point in self._points:
+            coordinates.extend(self._to_canvas(point))
+        self.create_line(*coordinates, fill=self.line_color, width=2, tags="series")
+
+    def _fits(self, point):
+        x_min, x_max, y_min, y_max = self._bounds
+        return x_min <= point[0] <= x_max and y_min <= point[1] <= y_max
+
+    def _to_canvas(self, point):
+        x_min, x_max, y_min, y_max = self._bounds
+        width = max(self.winfo_width(), 2 * self.padding + 1)
+        height = max(self.winfo_height(), 2 * self.padding + 1)
+        x = self.padding + (point[0] - x_min) / (x_max - x_min) * (width - 2 * self.padding)
+        y = height - self.padding - (point[1] - y_min) / (y_max - y_min) * (height - 2 * self.padding)
+        return x, y
@@ -0,0 +1,155 @@
+import os
+import time
+import threading
+import storage
+
+# Stages of one monitor tick, in the order they run. "persist" (writing the
+# balance) is part of "score", and "tick" covers the whole iteration.
+STAGES = ("foreground", "chrome_scrape", "classify", "score", "persist", "record", "ui_dispatch", "tick")
+
+_SUB_BUCKET_BITS = 3
+_SUB_BUCKETS = 1 << _SUB_BUCKET_BITS
+_BUCKET_COUNT = _SUB_BUCKETS * 62
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of durations in nanoseconds. Every power of two is
+    split into 8 buckets, so recording is a couple of integer operations and
+    percentiles are accurate to about 6% with a fixed, small set of counters.
+    """
+
+    def __init__(self):
+        self.counts = [0] * _BUCKET_COUNT
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, duration_ns):
+        if duration_ns < 2 * _SUB_BUCKETS:
+            index = max(duration_ns, 0)
+        else:
+            shift = duration_ns.bit_length() - _SUB_BUCKET_BITS - 1
+            index = min(_SUB_BUCKETS * shift + (duration_ns >> shift), _BUCKET_COUNT - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += duration_ns
+        if duration_ns > self.max:
+            self.max = duration_ns
+
+    @staticmethod
+    def _bucket_middle(index):
+        if index < 2 * _SUB_BUCKETS:
+            return index
+        shift = index // _SUB_BUCKETS - 1
+        lower = (index - _SUB_BUCKETS * shift) << shift
+        return lower + (1 << shift) // 2
+
+    def percentile(self, fraction):
+        """Returns the approximate duration in nanoseconds below which fraction of the samples fall."""
+        if not self.count:
+            return 0
+        rank = max(1, int(fraction * self.count + 0.5))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(self._bucket_middle(index), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_us": self.total / self.count / 1000 if self.count else 0,
+            "p50_us": self.percentile(0.50) / 1000,
+            "p95_us": self.percentile(0.95) / 1000,
+            "p99_us": self.percentile(0.99) / 1000,
+            "max_us": self.max / 1000,
+        }
+
+
+class Diagnostics:
+    """
+    Per-stage latency histograms and event counters for the monitor loop.
+    When disabled every call returns immediately.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counter_sources = []
+        self._baseline = {}
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self._counters = {}
+            self._started = time.time()
+        self._baseline = self._source_counters()
+
+    def add_counter_source(self, source):
+        """
+        Registers a function returning {name: count} that is read on snapshot().
+        Hot paths keep their own plain counters this way instead of calling count().
+        """
+        self._counter_sources.append(source)
+        self._baseline.update(source())
+
+    def _source_counters(self):
+        counters = {}
+        for source in self._counter_sources:
+            counters.update(source())
+        return counters
+
+    def record(self, stage, duration_ns):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = LatencyHistogram()
+            histogram.record(duration_ns)
+
+    def record_since(self, stage, start_ns):
+        """Records the time elapsed since start_ns (a time.perf_counter_ns() value)."""
+        if self.enabled:
+            self.record(stage, time.perf_counter_ns() - start_ns)
+
+    def count(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def snapshot(self):
+        """Returns the current statistics as a JSON-compatible dict."""
+        counters = {name: value - self._baseline.get(name, 0) for name, value in self._source_counters().items()}
+        with self._lock:
+            counters.update(self._counters)
+            ordered = sorted(self._histograms, key=lambda stage: (STAGES.index(stage) if stage in STAGES else len(STAGES), stage))
+            return {
+                "enabled": self.enabled,
+                "since": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self._started)),
+                "stages": {stage: self._histograms[stage].summary() for stage in ordered},
+                "counters": dict(sorted(counters.items())),
+            }
+
+    def dump(self, file_path):
+        """Writes snapshot() to a JSON file."""
+        storage.write_json_atomic(file_path, self.snapshot())
+
+
+# Process-wide instance; instrumentation can be turned off with GBTW_DIAGNOSTICS=0
+_diagnostics = Diagnostics(enabled=os.environ.get("GBTW_DIAGNOSTICS", "1") != "0")
+
+def get_diagnostics():
+    return _diagnostics
+
+record = _diagnostics.record
+record_since = _diagnostics.record_since
+count = _diagnostics.count
+add_counter_source = _diagnostics.add_counter_source
+snapshot = _diagnostics.snapshot
+dump = _diagnostics.dump
+reset = _diagnostics.reset
@@ -0,0 +1,133 @@
+import collections
+import datetime
+import threading
+import time
+from eventlog import ADJUSTMENT_CATEGORIES
+
+
+def _next_midnight(timestamp):
+    day = datetime.date.fromtimestamp(timestamp) + datetime.timedelta(days=1)
+    return time.mktime(day.timetuple())
+
+
+class DwellAccumulator:
+    """
+    Live per-day totals of seconds spent per app and per category.
+
+    Each sample is an O(1) dictionary update plus an O(top_n) check of whether
+    the top-N ranking changed, so the dashboard only re-renders when needed.
+    At local midnight the day's dictionaries are moved into `snapshots` (the
+    references are swapped, nothing is copied) and counting starts over.
+    """
+
+    def __init__(self, top_n=5, keep_days=7):
+        self.top_n = top_n
+        self.day = None
+        self.app_seconds = {}
+        self.category_seconds = {}
+        self.snapshots = collections.deque(maxlen=keep_days)
+        self._ranking = []
+        self._next_midnight = 0
+        self._lock = threading.Lock()
+
+    def seed(self, app_seconds, category_seconds, timestamp=None):
+        """Starts the current day from existing totals (e.g. the history's daily rollup)."""
+        with self._lock:
+            self._roll_over(time.time() if timestamp is None else timestamp)
+            self.app_seconds = dict(app_seconds)
+            self.category_seconds = dict(category_seconds)
+            self._ranking = sorted(self.app_seconds, key=self.app_seconds.get, reverse=True)[:self.top_n]
+
+    def add(self, app, category, seconds=1, timestamp=None):
+        """
+        Adds seconds of use for app/category.
+
+        Returns:
+            bool: True if the top-N ranking changed (including at midnight).
+        """
+        if category in ADJUSTMENT_CATEGORIES:
+            return False
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            changed = timestamp >= self._next_midnight and self._roll_over(timestamp)
+            self.category_seconds[category] = self.category_seconds.get(category, 0) + seconds
+            if not app:
+                return changed
+            total = self.app_seconds.get(app, 0) + seconds
+            self.app_seconds[app] = total
+            return self._update_ranking(app, total) or changed
+
+    def remove(self, app, category, seconds, timestamp):
+        """
+        Takes back seconds added for app/category at timestamp (e.g. time
+        that turned out to be spent away). Earlier days are left alone.
+
+        Returns:
+            bool: True if the top-N ranking changed.
+        """
+        if category in ADJUSTMENT_CATEGORIES:
+            return False
+        with self._lock:
+            if datetime.date.fromtimestamp(timestamp).isoformat() != self.day:
+                return False
+            remaining = self.category_seconds.get(category, 0) - seconds
+            if remaining > 0:
+                self.category_seconds[category] = remaining
+            else:
+                self.category_seconds.pop(category, None)
+            if not app or app not in self.app_seconds:
+                return False
+            remaining = self.app_seconds[app] - seconds
+            if remaining > 0:
+                self.app_seconds[app] = remaining
+            else:
+                del self.app_seconds[app]
+            # Rare, so the ranking is simply rebuilt
+            ranking = sorted(self.app_seconds, key=self.app_seconds.get, reverse=True)[:self.top_n]
+            changed = ranking != self._ranking
+            self._ranking = ranking
+            return changed
+
+    def _roll_over(self, timestamp):
+        if timestamp < self._next_midnight:
+            return False
+        if self.day is not None:
+            self.snapshots.append((self.day, self.app_seconds, self.category_seconds))
+        self.day = datetime.date.fromtimestamp(timestamp).isoformat()
+        self.app_seconds = {}
+        self.category_seconds = {}
+        self._ranking = []
+        self._next_midnight = _next_midnight(timestamp)
+        return True
+
+    def _update_ranking(self, app, total):
+        ranking = self._ranking
+        seconds = self.app_seconds
+        if app in ranking:
+            index = ranking.index(app)
+            if index == 0 or seconds[ranking[index - 1]] >= total:
+                return False
+            ranking.pop(index)
+        elif len(ranking) >= self.top_n and seconds[ranking[-1]] >= total:
+            return False
+        else:
+            index = len(ranking)
+            if index >= self.top_n:
+                ranking.pop()
+                index -= 1
+
+        # Move the app up past every entry it now exceeds
+        while index > 0 and seconds[ranking[index - 1]] < total:
+            index -= 1
+        ranking.insert(index, app)
+        return True
+
+    def top(self, n=None):
+        """Returns the top apps of the current day as [(app, seconds)]."""
+        with self._lock:
+            return [(app, self.app_seconds[app]) for app in self._ranking[:n or self.top_n]]
+
+    def snapshot(self):
+        """Returns (day, app_seconds, category_seconds) copies for the current day."""
+        with self._lock:
+            return self.day, dict(self.app_seconds), dict(self.category_seconds)
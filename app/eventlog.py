@@ -0,0 +1,183 @@
+import os
+import re
+import threading
+import time
+
+# Raw segments hold one tab-separated line per event:
+#     <unix seconds>\t<app>\t<category>\t<points delta>
+# Compacted summaries hold one line per (minute, app, category):
+#     <minute start>\t<app>\t<category>\t<seconds>\t<points delta>
+#
+# Besides the activity categories from the classifier, points changes that do
+# not come from a monitored second are logged under ADJUSTMENT_CATEGORIES.
+ADJUSTMENT_CATEGORIES = ("Baseline", "Bonus", "Casino", "Rescore", "Reset")
+
+SEGMENT_PREFIX = "segment-"
+SUMMARY_PREFIX = "summary-"
+FILE_SUFFIX = ".log"
+
+_FILE_PATTERN = re.compile(r"^(segment|summary)-(\d{6})\.log$")
+_UNSAFE_CHARS = str.maketrans({"\t": " ", "\n": " ", "\r": " "})
+
+
+class EventLog:
+    """
+    Append-only log of activity events (timestamp, app, category, points delta).
+
+    Events are buffered in memory and written in batches, so appending from the
+    monitor loop on every tick is just a list append. The active segment is
+    rotated once it grows past max_segment_bytes; all but the newest
+    keep_raw_segments closed segments are then compacted into per-minute
+    summaries. Replaying the log (raw and compacted) gives back every points
+    change, so summing the deltas rebuilds the balance.
+    """
+
+    def __init__(self, directory="activity_log", batch_size=60, flush_interval=30,
+                 max_segment_bytes=1024 * 1024, keep_raw_segments=4):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_segment_bytes = max_segment_bytes
+        self.keep_raw_segments = keep_raw_segments
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        files = self._files()
+        self._active = max(files) if files else 1
+        if "summary" in files.get(self._active, {}):
+            self._active += 1
+
+    # --- Files ---
+
+    def _path(self, prefix, number):
+        return os.path.join(self.directory, f"{prefix}{number:06d}{FILE_SUFFIX}")
+
+    def _files(self):
+        """Returns {number: {'segment'|'summary': path}} for every file in the log directory."""
+        files = {}
+        for name in os.listdir(self.directory):
+            match = _FILE_PATTERN.match(name)
+            if match:
+                kind, number = match.group(1), int(match.group(2))
+                files.setdefault(number, {})[kind] = os.path.join(self.directory, name)
+        return files
+
+    # --- Writing ---
+
+    def append(self, timestamp, app, category, delta):
+        """
+        Buffers one event. The buffer is written out once it holds batch_size
+        events or flush_interval seconds have passed since the last write.
+        """
+        line = f"{int(timestamp)}\t{str(app).translate(_UNSAFE_CHARS)}\t{category}\t{int(delta)}\n"
+        with self._lock:
+            self._buffer.append(line)
+            if (len(self._buffer) >= self.batch_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_locked()
+
+    def flush(self):
+        """Writes all buffered events to the active segment."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        path = self._path(SEGMENT_PREFIX, self._active)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.writelines(self._buffer)
+            size = f.tell()
+        self._buffer.clear()
+        if size >= self.max_segment_bytes:
+            self._active += 1
+            self._compact_locked()
+
+    def compact(self):
+        """Compacts closed segments beyond the newest keep_raw_segments into summaries."""
+        with self._lock:
+            self._compact_locked()
+
+    def _compact_locked(self):
+        files = self._files()
+        closed = [number for number in sorted(files)
+                  if number < self._active and "segment" in files[number]]
+        for number in closed[:max(0, len(closed) - self.keep_raw_segments)]:
+            segment_path = files[number]["segment"]
+            summary_path = self._path(SUMMARY_PREFIX, number)
+            temp_path = summary_path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for minute, app, category, seconds, delta in _summarize(_read_segment(segment_path)):
+                    f.write(f"{minute}\t{app}\t{category}\t{seconds}\t{delta}\n")
+            os.replace(temp_path, summary_path)
+            os.remove(segment_path)
+
+    # --- Reading ---
+
+    def records(self):
+        """
+        Yields every logged event in order as (timestamp, app, category, seconds, delta).
+        Raw events count as one second; summary rows carry their minute's totals.
+        Events still in the write buffer are included last.
+        """
+        with self._lock:
+            files = self._files()
+            pending = list(self._buffer)
+        for number in sorted(files):
+            if "summary" in files[number]:
+                yield from _read_summary(files[number]["summary"])
+            elif "segment" in files[number]:
+                for timestamp, app, category, delta in _read_segment(files[number]["segment"]):
+                    yield timestamp, app, category, 1, delta
+        for timestamp, app, category, delta in _parse_segment_lines(pending):
+            yield timestamp, app, category, 1, delta
+
+    def replay_balance(self):
+        """Rebuilds the points balance by summing every logged delta."""
+        return sum(record[4] for record in self.records())
+
+    def is_empty(self):
+        with self._lock:
+            return not self._buffer and not self._files()
+
+
+def _parse_segment_lines(lines):
+    for line in lines:
+        parts = line.rstrip("\n").split("\t")
+        if len(parts) != 4:
+            continue  # Skip a torn final line from an interrupted write
+        try:
+            yield int(parts[0]), parts[1], parts[2], int(parts[3])
+        except ValueError:
+            continue
+
+def _read_segment(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from _parse_segment_lines(f)
+
+def _read_summary(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) != 5:
+                continue
+            try:
+                yield int(parts[0]), parts[1], parts[2], int(parts[3]), int(parts[4])
+            except ValueError:
+                continue
+
+def _summarize(events):
+    """Aggregates raw events into sorted per-minute (minute, app, category, seconds, delta) rows."""
+    totals = {}
+    for timestamp, app, category, delta in events:
+        key = (timestamp - timestamp % 60, app, category)
+        entry = totals.get(key)
+        if entry is None:
+            totals[key] = [1, delta]
+        else:
+            entry[0] += 1
+            entry[1] += delta
+    for key in sorted(totals):
+        yield key + tuple(totals[key])
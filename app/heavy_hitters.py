@@ -0,0 +1,72 @@
+import threading
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitters summary: tracks the most frequent items of an
+    unbounded stream with at most `capacity` counters.
+
+    When a new item arrives and every counter is taken, the item with the
+    smallest count is evicted and the newcomer inherits its count (recorded as
+    the newcomer's error). Any item seen more than total/capacity times is
+    guaranteed to be tracked, and each count overestimates by at most its error.
+    """
+
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.total = 0
+        self._counts = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def add(self, item, count=1):
+        with self._lock:
+            self.total += count
+            counts = self._counts
+            if item in counts:
+                counts[item] += count
+                return
+            if len(counts) < self.capacity:
+                counts[item] = count
+                self._errors[item] = 0
+                return
+            evicted = min(counts, key=counts.get)
+            floor = counts.pop(evicted)
+            del self._errors[evicted]
+            counts[item] = floor + count
+            self._errors[item] = floor
+
+    def discard(self, item):
+        """Stops tracking an item (e.g. once a rule has been added for it)."""
+        with self._lock:
+            if self._counts.pop(item, None) is not None:
+                del self._errors[item]
+
+    def top(self, n=10):
+        """Returns up to n (item, count, error) tuples, most frequent first."""
+        with self._lock:
+            items = sorted(self._counts.items(), key=lambda entry: entry[1], reverse=True)[:n]
+            return [(item, count, self._errors[item]) for item, count in items]
+
+    def __len__(self):
+        return len(self._counts)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "total": self.total,
+                "items": [[item, count, self._errors[item]] for item, count in self._counts.items()],
+            }
+
+    @classmethod
+    def from_dict(cls, data, capacity=64):
+        """Rebuilds a summary saved with to_dict(); invalid entries are skipped."""
+        summary = cls(data.get("capacity", capacity) if isinstance(data.get("capacity"), int) else capacity)
+        summary.total = data.get("total", 0) if isinstance(data.get("total"), int) else 0
+        for entry in data.get("items", []):
+            if (isinstance(entry, list) and len(entry) == 3 and isinstance(entry[0], str)
+                    and len(summary._counts) < summary.capacity):
+                summary._counts[entry[0]] = int(entry[1])
+                summary._errors[entry[0]] = int(entry[2])
+        return summary
@@ -0,0 +1,373 @@
+import sqlite3
+import threading
+import time
+import storage
+from eventlog import ADJUSTMENT_CATEGORIES
+
+DEFAULT_RETENTION_DAYS = 90
+IDLE_CATEGORY = "Idle"
+
+_SCHEMA = (
+    # One row per monitored second (or points adjustment). balance is the
+    # points balance right after the sample was applied.
+    "CREATE TABLE IF NOT EXISTS samples ("
+    " ts INTEGER NOT NULL,"
+    " app TEXT NOT NULL,"
+    " category TEXT NOT NULL,"
+    " delta INTEGER NOT NULL,"
+    " balance INTEGER)",
+    "CREATE INDEX IF NOT EXISTS samples_ts ON samples (ts)",
+    "CREATE INDEX IF NOT EXISTS samples_app_ts ON samples (app, ts)",
+    # Rollups are keyed by the start of the hour (unix seconds) and by the
+    # local calendar day ('YYYY-MM-DD'). Adjustments add points but no seconds.
+    "CREATE TABLE IF NOT EXISTS rollup_hourly ("
+    " bucket INTEGER NOT NULL,"
+    " app TEXT NOT NULL,"
+    " category TEXT NOT NULL,"
+    " seconds INTEGER NOT NULL,"
+    " earned INTEGER NOT NULL,"
+    " lost INTEGER NOT NULL,"
+    " PRIMARY KEY (bucket, app, category)) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS rollup_daily ("
+    " day TEXT NOT NULL,"
+    " app TEXT NOT NULL,"
+    " category TEXT NOT NULL,"
+    " seconds INTEGER NOT NULL,"
+    " earned INTEGER NOT NULL,"
+    " lost INTEGER NOT NULL,"
+    " PRIMARY KEY (day, app, category)) WITHOUT ROWID",
+    # Time away from the computer (start <= t < end). It has no samples; its
+    # seconds go straight into the rollups under IDLE_CATEGORY with app ''.
+    "CREATE TABLE IF NOT EXISTS idle_spans ("
+    " start INTEGER NOT NULL,"
+    " end INTEGER NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idle_spans_start ON idle_spans (start)",
+)
+
+_UPSERT = (
+    "INSERT INTO {table} ({bucket}, app, category, seconds, earned, lost) VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT({bucket}, app, category) DO UPDATE SET "
+    "seconds = seconds + excluded.seconds, "
+    "earned = earned + excluded.earned, "
+    "lost = lost + excluded.lost"
+)
+
+
+def local_day(timestamp):
+    """Returns the local calendar day of a unix timestamp as 'YYYY-MM-DD'."""
+    return time.strftime("%Y-%m-%d", time.localtime(timestamp))
+
+
+def _rollups(samples, sign=1):
+    """
+    Aggregates (ts, app, category, delta, ...) samples into hourly and daily
+    rollup rows {(bucket, app, category): [seconds, earned, lost]}, multiplied
+    by sign (-1 to take samples back out of the rollups).
+    """
+    hourly = {}
+    daily = {}
+    days = {}
+    for timestamp, app, category, delta, *_ in samples:
+        seconds = (0 if category in ADJUSTMENT_CATEGORIES else 1) * sign
+        earned = max(delta, 0) * sign
+        lost = max(-delta, 0) * sign
+        hour = timestamp - timestamp % 3600
+        # Local days start on a quarter hour in every time zone
+        quarter = timestamp - timestamp % 900
+        day = days.get(quarter)
+        if day is None:
+            day = days[quarter] = local_day(timestamp)
+        for totals, bucket in ((hourly, hour), (daily, day)):
+            key = (bucket, app, category)
+            entry = totals.get(key)
+            if entry is None:
+                totals[key] = [seconds, earned, lost]
+            else:
+                entry[0] += seconds
+                entry[1] += earned
+                entry[2] += lost
+    return hourly, daily
+
+
+class ActivityHistory:
+    """
+    SQLite time-series of activity samples with hourly and daily rollups.
+
+    Samples are buffered and written in one transaction per batch; the rollup
+    rows for the batch are aggregated in Python and upserted in the same
+    transaction, so dashboard queries over long ranges only read rollups.
+    Raw samples older than the retention period are deleted in bulk.
+    """
+
+    def __init__(self, connection, lock=None, batch_size=60, flush_interval=30,
+                 retention_days=DEFAULT_RETENTION_DAYS):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self._lock = lock or threading.RLock()
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._last_purge = 0
+        with self._lock:
+            for statement in _SCHEMA:
+                self.connection.execute(statement)
+
+    @property
+    def lock(self):
+        """The lock guarding the connection; hold it when querying it directly."""
+        return self._lock
+
+    # --- Writing ---
+
+    def add(self, timestamp, app, category, delta, balance=None):
+        """Buffers one sample; the buffer is written once it is full or old enough."""
+        with self._lock:
+            self._buffer.append((int(timestamp), app, category, int(delta), balance))
+            if (len(self._buffer) >= self.batch_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_locked()
+
+    def flush(self):
+        """Writes all buffered samples and their rollups in one transaction."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+
+        hourly, daily = _rollups(self._buffer)
+
+        connection = self.connection
+        connection.execute("BEGIN")
+        try:
+            connection.executemany(
+                "INSERT INTO samples (ts, app, category, delta, balance) VALUES (?, ?, ?, ?, ?)",
+                self._buffer
+            )
+            connection.executemany(_UPSERT.format(table="rollup_hourly", bucket="bucket"),
+                                   [key + tuple(values) for key, values in hourly.items()])
+            connection.executemany(_UPSERT.format(table="rollup_daily", bucket="day"),
+                                   [key + tuple(values) for key, values in daily.items()])
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        self._buffer.clear()
+
+        # Apply retention at most once an hour
+        if self.retention_days and time.time() - self._last_purge >= 3600:
+            self._purge_locked(self.retention_days * 86400)
+
+    def add_idle_span(self, start, end):
+        """
+        Records a span of time away from the computer. It is written at once,
+        with its seconds split over the hourly and daily rollup buckets it covers.
+        """
+        start, end = int(start), int(end)
+        if end <= start:
+            return
+        hourly = {}
+        daily = {}
+        timestamp = start
+        while timestamp < end:
+            hour = timestamp - timestamp % 3600
+            seconds = min(end, hour + 3600) - timestamp
+            hourly[hour] = hourly.get(hour, 0) + seconds
+            day = local_day(timestamp)
+            daily[day] = daily.get(day, 0) + seconds
+            timestamp += seconds
+
+        with self._lock:
+            connection = self.connection
+            connection.execute("BEGIN")
+            try:
+                connection.execute("INSERT INTO idle_spans (start, end) VALUES (?, ?)", (start, end))
+                connection.executemany(_UPSERT.format(table="rollup_hourly", bucket="bucket"),
+                                       [(hour, "", IDLE_CATEGORY, seconds, 0, 0) for hour, seconds in hourly.items()])
+                connection.executemany(_UPSERT.format(table="rollup_daily", bucket="day"),
+                                       [(day, "", IDLE_CATEGORY, seconds, 0, 0) for day, seconds in daily.items()])
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def remove_samples(self, start, end, keep_categories=("Baseline", "Casino", "Reset", "Rescore")):
+        """
+        Deletes the samples start <= ts < end, except those of keep_categories,
+        and takes them back out of the rollups in the same transaction. Used
+        for time that turns out to have been spent away from the computer.
+
+        Returns:
+            list: The deleted (ts, app, category, delta) samples.
+        """
+        start, end = int(start), int(end)
+        placeholders = ", ".join("?" * len(keep_categories))
+        where = f"ts >= ? AND ts < ? AND category NOT IN ({placeholders})"
+        params = (start, end) + tuple(keep_categories)
+        with self._lock:
+            self._flush_locked()
+            connection = self.connection
+            connection.execute("BEGIN")
+            try:
+                removed = connection.execute(f"SELECT ts, app, category, delta FROM samples WHERE {where}",
+                                             params).fetchall()
+                hourly, daily = _rollups(removed, sign=-1)
+                connection.execute(f"DELETE FROM samples WHERE {where}", params)
+                for table, bucket, rows in (("rollup_hourly", "bucket", hourly), ("rollup_daily", "day", daily)):
+                    connection.executemany(_UPSERT.format(table=table, bucket=bucket),
+                                           [key + tuple(values) for key, values in rows.items()])
+                    connection.executemany(
+                        f"DELETE FROM {table} WHERE {bucket} = ? AND app = ? AND category = ? "
+                        "AND seconds = 0 AND earned = 0 AND lost = 0", list(rows))
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        return removed
+
+    def purge(self, max_age_seconds, now=None):
+        """
+        Deletes raw samples older than max_age_seconds in one statement.
+        Rollups are kept, so long-range totals stay available.
+
+        Returns:
+            int: The number of samples deleted.
+        """
+        with self._lock:
+            return self._purge_locked(max_age_seconds, now)
+
+    def _purge_locked(self, max_age_seconds, now=None):
+        now = time.time() if now is None else now
+        self._last_purge = now
+        cutoff = int(now - max_age_seconds)
+        cursor = self.connection.execute("DELETE FROM samples WHERE ts < ?", (cutoff,))
+        self.connection.execute("DELETE FROM idle_spans WHERE end <= ?", (cutoff,))
+        return cursor.rowcount
+
+    # --- Reading ---
+
+    def iter_samples(self, start=None, end=None, batch_size=1000):
+        """
+        Streams raw samples (ts, app, category, delta, balance) in time order
+        for start <= ts < end, fetching batch_size rows at a time.
+        Buffered samples are flushed first so the stream is complete.
+        """
+        self.flush()
+        start = 0 if start is None else int(start)
+        end = 2 ** 62 if end is None else int(end)
+        # No rowid is above the largest one, so rows from the second before start are skipped
+        last_ts, last_rowid = start - 1, 2 ** 63 - 1
+        while True:
+            # Keyset pagination so no cursor stays open between batches
+            with self._lock:
+                rows = self.connection.execute(
+                    "SELECT rowid, ts, app, category, delta, balance FROM samples "
+                    "WHERE ts < ? AND (ts > ? OR (ts = ? AND rowid > ?)) "
+                    "ORDER BY ts, rowid LIMIT ?",
+                    (end, last_ts, last_ts, last_rowid, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row[1:]
+            last_rowid, last_ts = rows[-1][0], rows[-1][1]
+
+    def idle_spans(self, start=None, end=None):
+        """Returns the idle spans [(start, end)] overlapping start..end, clipped to it, in time order."""
+        start = 0 if start is None else int(start)
+        end = 2 ** 62 if end is None else int(end)
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT start, end FROM idle_spans WHERE start < ? AND end > ? ORDER BY start",
+                (end, start)
+            ).fetchall()
+        return [(max(span_start, start), min(span_end, end)) for span_start, span_end in rows]
+
+    def balance_series(self, start=None, end=None, batch_size=5000):
+        """
+        Streams (ts, balance) for every sample that changed the balance,
+        in time order, fetching batch_size rows at a time.
+        """
+        for timestamp, _, _, delta, balance in self.iter_samples(start, end, batch_size):
+            if delta and balance is not None:
+                yield timestamp, balance
+
+    def balance_count(self, start=None, end=None):
+        """Returns the number of pairs balance_series(start, end) yields."""
+        self.flush()
+        start = 0 if start is None else int(start)
+        end = 2 ** 62 if end is None else int(end)
+        with self._lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM samples WHERE ts >= ? AND ts < ? AND delta != 0 AND balance IS NOT NULL",
+                (start, end)
+            ).fetchone()[0]
+
+    def category_totals(self, start_day, end_day):
+        """
+        Returns {category: (seconds, earned, lost)} for the local days
+        start_day..end_day inclusive ('YYYY-MM-DD'), read from the daily rollup.
+        """
+        self.flush()
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT category, SUM(seconds), SUM(earned), SUM(lost) FROM rollup_daily "
+                "WHERE day BETWEEN ? AND ? GROUP BY category",
+                (start_day, end_day)
+            ).fetchall()
+        return {category: (seconds, earned, lost) for category, seconds, earned, lost in rows}
+
+    def app_totals(self, start_day, end_day, limit=20):
+        """Returns [(app, category, seconds)] for the most-used apps between two local days."""
+        self.flush()
+        with self._lock:
+            return self.connection.execute(
+                "SELECT app, category, SUM(seconds) AS total FROM rollup_daily "
+                "WHERE day BETWEEN ? AND ? AND app != '' GROUP BY app, category "
+                "ORDER BY total DESC LIMIT ?",
+                (start_day, end_day, limit)
+            ).fetchall()
+
+    def hourly_totals(self, start, end, category=None):
+        """Returns [(hour_start, seconds, earned, lost)] from the hourly rollup for start <= hour < end."""
+        self.flush()
+        query = ("SELECT bucket, SUM(seconds), SUM(earned), SUM(lost) FROM rollup_hourly "
+                 "WHERE bucket >= ? AND bucket < ?")
+        params = [int(start), int(end)]
+        if category is not None:
+            query += " AND category = ?"
+            params.append(category)
+        with self._lock:
+            return self.connection.execute(query + " GROUP BY bucket ORDER BY bucket", params).fetchall()
+
+    def close(self):
+        self.flush()
+
+
+def open_history(db_path="history.db", retention_days=None):
+    """
+    Opens the activity history. When the SQLite storage backend is in use the
+    history shares its connection; otherwise it lives in its own database file.
+
+    Args:
+        db_path (str): The database file used when storage is not SQLite.
+        retention_days (int): Days of raw samples to keep. Defaults to the
+                              'history_retention_days' setting, or 90.
+    """
+    state = storage.get_storage()
+    if retention_days is None:
+        retention_days = state.read("settings").get("history_retention_days", DEFAULT_RETENTION_DAYS)
+
+    if isinstance(state, storage.SQLiteStorage):
+        return ActivityHistory(state.connection, lock=state.lock, retention_days=retention_days)
+    if isinstance(state, storage.MemoryStorage):
+        db_path = ":memory:"
+
+    connection = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+    if db_path != ":memory:":
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+    return ActivityHistory(connection, retention_days=retention_days)
@@ -0,0 +1,66 @@
+import time
+from collections import namedtuple
+import backends
+
+DEFAULT_THRESHOLD_SECONDS = 5 * 60
+
+# A change of state: idle is True when the user went away, False when they
+# came back. timestamp is when the last input before going away (or the
+# first input after coming back) happened, not when it was noticed.
+IdleTransition = namedtuple("IdleTransition", "idle timestamp")
+
+
+class IdleDetector:
+    """
+    Decides when the user has walked away, from the time since their last
+    keyboard or mouse input. Polled once per monitor tick while active and
+    every poll_interval seconds while idle.
+    """
+
+    def __init__(self, idle_seconds=None, threshold_seconds=DEFAULT_THRESHOLD_SECONDS, poll_interval=5,
+                 clock=time.time):
+        """
+        Args:
+            idle_seconds (callable): Returns the seconds since the last input, or
+                                     None if unknown. Defaults to the desktop
+                                     backend's idle_seconds().
+            threshold_seconds (float): Seconds without input after which the user
+                                       is idle; 0 turns detection off.
+            poll_interval (float): Seconds the monitor loop sleeps between polls while idle.
+            clock (callable): Returns the current unix time.
+        """
+        self._idle_seconds = idle_seconds
+        self.threshold_seconds = threshold_seconds
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.idle = False
+        self.idle_since = None
+
+    def poll(self, now=None):
+        """
+        Checks for input since the last poll.
+
+        Returns:
+            IdleTransition: The change of state, or None if there was none.
+        """
+        now = self.clock() if now is None else now
+        source = self._idle_seconds or backends.get_backend().idle_seconds
+        seconds = source()
+        if seconds is None or not self.threshold_seconds:
+            if self.idle:
+                # The source went away while idle: count the user as back now
+                return self._resume(now)
+            return None
+
+        if not self.idle and seconds >= self.threshold_seconds:
+            self.idle = True
+            self.idle_since = now - seconds
+            return IdleTransition(True, self.idle_since)
+        if self.idle and seconds < self.threshold_seconds:
+            return self._resume(now - seconds)
+        return None
+
+    def _resume(self, timestamp):
+        self.idle = False
+        self.idle_since = None
+        return IdleTransition(False, timestamp)
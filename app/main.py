@@ -1,19 +1,42 @@
+import logging
 import customtkinter as ctk
-from tkinter import messagebox
+from tkinter import messagebox, filedialog
 import tracker
 import time
+import os
 import threading
-import json
 import save_app
-import random
-import os
+import casino_engine
+import app_classifier
+import storage
+import eventlog
+import history
+import reports
+import rescoring
+import chart
+import search_index
+import rule_analysis
+import diagnostics
+import monitor
+import idle
+import activity_trace
+import app_logging
+import ui_scheduler
+import team_sync
+
+logger = logging.getLogger(__name__)
 
 class App(ctk.CTk):
     def __init__(self):
         super().__init__()
 
-        # Initialize required JSON files
-        self._initialize_json_files()
+        # Every UI timer, animation and update from the monitor thread runs from this one loop
+        self.scheduler = ui_scheduler.FrameScheduler(self).start()
+        diagnostics.add_counter_source(self.scheduler.stats)
+
+        # Initialize required state (JSON files by default, see storage.py)
+        self.storage = storage.get_storage()
+        self.storage.ensure_defaults()
 
         # Configure window
         self.title("GetB@ck2Work")
@@ -28,14 +51,40 @@ class App(ctk.CTk):
         self._load_difficulty_settings()
 
         # --- Initialize dummy data ---
-        with open("productivity.json", 'r') as file:
-            data = json.load(file) # Use json.load() for file objects
-            self.productivity_apps = data.get("productivity_app", [])
-            self.entertainment_apps = data.get("entertainment_app", [])
-
-        with open("points.json", 'r') as file:
-            points_data = json.load(file)
-            self.current_points = points_data.get("points", "")
+        data = self.storage.read("productivity")
+        self.productivity_apps = data.get("productivity_app", [])
+        self.entertainment_apps = data.get("entertainment_app", [])
+
+        self.current_points = self.storage.read("points").get("points", 0)
+
+        # Optional team leaderboard: batched uploads of per-day totals ("team_sync" setting)
+        self.sync_client = team_sync.create_client(self.storage.read("settings"))
+        if self.sync_client is not None:
+            self.sync_client.start()
+            diagnostics.add_counter_source(lambda: dict(self.sync_client.stats))
+
+        # Append-only record of every points change; seeded with the balance
+        # that existed before logging started so replaying it is exact.
+        self.event_log = eventlog.EventLog()
+        self.history = history.open_history()
+
+        # Classification, scoring, recording and the live aggregates (dwell
+        # times, sessions, focus bonus, unclassified inbox) run headless in the monitor
+        self.monitor = monitor.Monitor(self.event_log, self.history, self.storage,
+                                       on_record=self._on_points_recorded, on_blocked=tracker.show_blocker)
+        self.monitor.seed_dwell()
+        self.dwell = self.monitor.dwell
+        self.unclassified_apps = self.monitor.unclassified_apps
+        self.sessionizer = self.monitor.sessionizer
+
+        # Sampling and scoring pause while there is no keyboard or mouse input
+        idle_minutes = self.storage.read("settings").get("idle_threshold_minutes", idle.DEFAULT_THRESHOLD_SECONDS // 60)
+        self.idle_detector = idle.IdleDetector(threshold_seconds=idle_minutes * 60)
+
+        # Optional recording of the raw foreground stream for replay (Diagnostics tab)
+        self.trace_recorder = None
+        if self.event_log.is_empty() and self.current_points:
+            self._record_points_event("", "Baseline", self.current_points, self.current_points)
 
         self.points_per_minute_entertainment = 2
         self.productive_points_per_minute = 1
@@ -48,41 +97,20 @@ class App(ctk.CTk):
 
         # Initialize detected app variables
         self.detected_app = ""
-        self.detected_app_list = []
+        self.detected_app_list = self.monitor.recent_apps
+        # Only the first entries of each rule list get a widget; large imported
+        # blocklists would otherwise freeze the App Management tab.
+        self.max_listed_apps = 200
         self.all_app_list = tracker.get_all_app_list()
 
-        self.outcomes = [
-            ("🎯", "Extra Focus Points!", "give_points"),
-            ("💡", "Productivity Tip!", "show_tip"),
-            ("😳", "Dare Time!", "show_dare"),
-            ("💀", "All Points Lost!", "lose_all_points")
-        ]
+        # Slot machine outcomes and payouts for the Mini Game casino
+        self.slot_engine = casino_engine.SlotEngine()
 
-        self.tips = [
-            "Take a 5-minute break every 25 minutes (Pomodoro Technique)",
-            "Use the 2-minute rule: if a task takes less than 2 minutes, do it now",
-            "Start your day with the most important task",
-            "Use the Eisenhower Matrix to prioritize tasks",
-            "Practice deep work: focus on one task for 90 minutes",
-            "Use the 80/20 rule: focus on the 20% of tasks that yield 80% of results",
-            "Create a 'not-to-do' list to avoid distractions",
-            "Use the 'eat the frog' method: tackle your hardest task first",
-            "Batch similar tasks together",
-            "Use the 'touch it once' rule: handle each task only once"
-        ]
-
-        self.dares = [
-            "Text your mom you love her. No context.",
-            "Post 'I love productivity!' on your social media",
-            "Send a voice message to a friend saying 'I'm being productive!'",
-            "Take a selfie with your most productive face and send it to a friend",
-            "Record yourself doing a productivity dance and send it to a friend",
-            "Call a friend and tell them about your productivity goals",
-            "Post a screenshot of your current task on social media",
-            "Send a motivational quote to 3 friends",
-            "Record yourself saying 'I am a productivity machine!' and send it to a friend",
-            "Take a video of yourself organizing your workspace and send it to a friend"
-        ]
+        # Fuzzy search over the rulebook and recently seen app names
+        self.search_index = search_index.TrigramIndex()
+        self._search_after_id = None
+        self._rebuild_search_index()
+        self._rule_check_generation = 0
 
         # Set initial appearance
         ctk.set_appearance_mode(self.appearance_mode)
@@ -97,6 +125,7 @@ class App(ctk.CTk):
         self.app_management_tab = self.tabview.add("App Management")
         self.mini_game_tab = self.tabview.add("Mini Game")
         self.settings_tab = self.tabview.add("Settings")  # New settings tab
+        self.diagnostics_tab = self.tabview.add("Diagnostics")
 
         # Set default tab
         self.tabview.set("Dashboard")
@@ -106,46 +135,51 @@ class App(ctk.CTk):
         self.create_app_management_tab()
         self.create_mini_game_tab()
         self.create_settings_tab()  # Create settings tab
+        self.create_diagnostics_tab()
+
+        # Flush buffered activity events when the window is closed
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # Start background thread
         threading.Thread(target=self.update_active_app_TB, daemon=True).start()
 
-    def _initialize_json_files(self):
-        """Initialize required JSON files if they don't exist."""
-        # Initialize productivity.json
-        if not os.path.exists("productivity.json"):
-            initial_productivity_data = {
-                "productivity_app": [],
-                "entertainment_app": []
-            }
-            with open("productivity.json", 'w') as f:
-                json.dump(initial_productivity_data, f, indent=4)
-
-        # Initialize points.json
-        if not os.path.exists("points.json"):
-            initial_points_data = {
-                "points": 0
-            }
-            with open("points.json", 'w') as f:
-                json.dump(initial_points_data, f, indent=4)
+    def on_close(self):
+        """Flushes pending activity events and closes the app."""
+        self.monitor.close()
+        if self.trace_recorder is not None:
+            self.trace_recorder.close()
+        if self.sync_client is not None:
+            self.sync_client.close()
+        self.scheduler.stop()
+        self.destroy()
+
+    def _record_points_event(self, app_name, category, points_delta, balance):
+        """Records one activity sample or points adjustment in the event log and history."""
+        self.monitor.record(app_name, category, points_delta, balance)
+
+    def _on_points_recorded(self, timestamp, category, points_delta, balance):
+        """Adds changed balances to the dashboard chart and counts the sample for team sync."""
+        if self.sync_client is not None:
+            self.sync_client.add(timestamp, category, points_delta)
+        if points_delta:
+            self.scheduler.call_soon(lambda: self.points_chart.append(timestamp, balance))
 
     def _load_difficulty_settings(self):
-        """Load difficulty settings from settings.json"""
-        try:
-            with open("settings.json", 'r') as f:
-                settings = json.load(f)
-                self.difficulty_level = settings.get("difficulty_level", "chill")
-        except (FileNotFoundError, json.JSONDecodeError):
-            # If file doesn't exist or is invalid, create it with default settings
+        """Load difficulty settings from the settings state"""
+        settings = self.storage.read("settings")
+        if "difficulty_level" in settings:
+            self.difficulty_level = settings["difficulty_level"]
+        else:
+            # If the settings don't exist or are invalid, create them with default settings
             self._save_difficulty_settings()
 
     def _save_difficulty_settings(self):
-        """Save difficulty settings to settings.json"""
-        settings = {
-            "difficulty_level": self.difficulty_level
-        }
-        with open("settings.json", 'w') as f:
-            json.dump(settings, f, indent=4)
+        """Save difficulty settings to the settings state"""
+        def set_difficulty(settings):
+            settings["difficulty_level"] = self.difficulty_level
+            return settings
+
+        self.storage.update("settings", set_difficulty)
 
     def create_settings_tab(self):
         """Create the settings tab with difficulty level options"""
@@ -178,7 +212,7 @@ class App(ctk.CTk):
             # Show confirmation popup
             confirm_window = ctk.CTkToplevel(self)
             confirm_window.title("Confirm Difficulty Change")
-            confirm_window.geometry("400x200")
+            confirm_window.geometry("400x240")
             confirm_window.transient(self)
             confirm_window.grab_set()
             
@@ -186,26 +220,32 @@ class App(ctk.CTk):
             confirm_window.attributes('-topmost', True)
             
             # Add message
+            new_difficulty = self.difficulty_var.get()
+            question = f"Are you sure you want to change the difficulty to {new_difficulty.title()}?"
             message = ctk.CTkLabel(
                 confirm_window,
-                text=f"Are you sure you want to change the difficulty to {self.difficulty_var.get().title()}?\n\nThis will reset your current points to 0.",
+                text=f"{question}\n\nRecalculating your points from your recorded activity...",
                 font=ctk.CTkFont(size=14),
                 wraplength=350
             )
             message.pack(pady=20)
+            rescored = {}
             
             # Add buttons
             button_frame = ctk.CTkFrame(confirm_window)
             button_frame.pack(pady=20)
             
             def apply_changes():
-                self.difficulty_level = self.difficulty_var.get()
-                self._save_difficulty_settings()
-                # Reset points when changing difficulty
-                self._dummy_current_points = 0
-                with open("points.json", 'w') as file:
-                    json.dump({"points": 0}, file, indent=4)
-                self.points_label.configure(text="0")
+                self.difficulty_level = new_difficulty
+                # Replace the balance with the one the recorded activity earns under the new difficulty.
+                # The event is recorded under the same lock, so no tick lands between the two.
+                with self.storage.lock:
+                    new_points, points_delta = rescoring.apply(rescored["activity"], new_difficulty,
+                                                               self.storage, self.history)
+                    if points_delta:
+                        self._record_points_event("", "Rescore", points_delta, new_points)
+                self.current_points = new_points
+                self.points_label.configure(text=str(new_points))
                 confirm_window.destroy()
             
             def cancel_changes():
@@ -230,6 +270,23 @@ class App(ctk.CTk):
                 hover_color="#33FF33"
             )
             confirm_button.pack(side="left", padx=10)
+            confirm_button.configure(state="disabled")
+
+            def show_preview(balance):
+                if not confirm_window.winfo_exists():
+                    return
+                message.configure(text=f"{question}\n\nYour points will be recalculated from your recorded "
+                                       f"activity: {balance} under {new_difficulty.title()} "
+                                       f"(currently {self.current_points}).")
+                confirm_button.configure(state="normal")
+
+            def load_preview():
+                # Loading a long history can take a moment, so keep it off the UI thread
+                rescored["activity"] = rescoring.load_activity(self.history)
+                balance = rescoring.rescore(rescored["activity"], new_difficulty)
+                self.scheduler.call_soon(lambda: show_preview(balance))
+
+            threading.Thread(target=load_preview, daemon=True).start()
             
             # Center the window
             confirm_window.update_idletasks()
@@ -270,10 +327,36 @@ class App(ctk.CTk):
             )
             desc_label.pack(side="left", padx=10, fill="x", expand=True)
 
+        # Idle detection
+        idle_frame = ctk.CTkFrame(settings_frame)
+        idle_frame.pack(padx=20, pady=10, fill="x")
+
+        ctk.CTkLabel(
+            idle_frame,
+            text="Pause tracking after no keyboard or mouse input for:",
+            font=ctk.CTkFont(size=16)
+        ).pack(side="left", padx=10, pady=10)
+
+        def on_idle_threshold_change(choice):
+            minutes = 0 if choice == "Never" else int(choice.split()[0])
+            self.idle_detector.threshold_seconds = minutes * 60
+
+            def set_idle_threshold(settings):
+                settings["idle_threshold_minutes"] = minutes
+                return settings
+
+            self.storage.update("settings", set_idle_threshold)
+
+        idle_minutes = int(self.idle_detector.threshold_seconds // 60)
+        idle_choices = ["Never", "2 minutes", "5 minutes", "10 minutes", "15 minutes", "30 minutes"]
+        idle_optionmenu = ctk.CTkOptionMenu(idle_frame, values=idle_choices, command=on_idle_threshold_change)
+        idle_optionmenu.set(f"{idle_minutes} minutes" if idle_minutes else "Never")
+        idle_optionmenu.pack(side="left", padx=10)
+
     def switch_tab_to_redeem_points(self):
         """Helper function to switch the tab to 'Point Redemption'."""
         self.tabview.set("Point Redemption")
-        print("Switched to Point Redemption tab.")
+        logger.debug("Switched to Point Redemption tab.")
         if hasattr(self, 'points_label'):
             self.points_label.configure(text=str(self.current_points))
 
@@ -299,6 +382,13 @@ class App(ctk.CTk):
                                     text_color=("#1f538d", "#4a9eff"))
         self.points_label.grid(row=1, column=0, pady=(0, 30))
 
+        # Points over the last 30 days, downsampled for drawing
+        self.points_frame.columnconfigure(1, weight=2)
+        chart_bg = "gray17" if ctk.get_appearance_mode() == "Dark" else "gray86"
+        self.points_chart = chart.PointsChart(self.points_frame, max_points=1000, height=120, bg=chart_bg)
+        self.points_chart.grid(row=0, column=1, rowspan=2, padx=(0, 25), pady=20, sticky="nsew")
+        threading.Thread(target=self._load_points_chart, daemon=True).start()
+
         # App Detection Frame - Card Style
         self.detected_app_frame = ctk.CTkFrame(self.dashboard_tab, 
                                             fg_color=("gray92", "gray13"), 
@@ -326,6 +416,23 @@ class App(ctk.CTk):
                                             font=ctk.CTkFont(size=13))
         self.detected_apps_TB.grid(row=1, column=0, padx=25, pady=(0, 20), sticky="nsew")
 
+        # Top apps today - re-rendered only when the ranking changes
+        self.top_apps_header = ctk.CTkLabel(self.detected_app_frame,
+                                            text="🏆 Top Apps Today",
+                                            font=ctk.CTkFont(size=20, weight="bold"),
+                                            text_color=("gray20", "gray80"))
+        self.top_apps_header.grid(row=0, column=1, pady=(25, 15), padx=25, sticky="w")
+
+        self.top_apps_label = ctk.CTkLabel(self.detected_app_frame, text="", justify="left", anchor="nw",
+                                           font=ctk.CTkFont(size=13))
+        self.top_apps_label.grid(row=1, column=1, padx=25, pady=(0, 20), sticky="nw")
+        self.update_top_apps_panel()
+
+        # Current focus session and the most recent sessions
+        self.session_label = ctk.CTkLabel(self.detected_app_frame, text="", justify="left", anchor="w",
+                                          font=ctk.CTkFont(size=13))
+        self.session_label.grid(row=2, column=0, columnspan=2, padx=25, pady=(0, 20), sticky="w")
+
         # Category Label - Status Badge Style
         self.category_label = ctk.CTkLabel(self.dashboard_tab, 
                                         text="📊 Detected App Category: Unclassified",
@@ -334,37 +441,147 @@ class App(ctk.CTk):
                                         corner_radius=25,
                                         height=50,
                                         text_color="white")
-        self.category_label.grid(row=2, column=0, pady=(0, 40), padx=40, sticky="ew")
+        self.category_label.grid(row=2, column=0, pady=(0, 25), padx=40, sticky="ew")
+
+        # Report export
+        report_frame = ctk.CTkFrame(self.dashboard_tab, fg_color="transparent")
+        report_frame.grid(row=3, column=0, pady=(0, 40), padx=40, sticky="ew")
+
+        self.report_period_optionmenu = ctk.CTkOptionMenu(report_frame, values=["Daily", "Weekly", "Monthly"])
+        self.report_period_optionmenu.set("Daily")
+        self.report_period_optionmenu.pack(side="left", padx=(0, 10))
+
+        self.report_button = ctk.CTkButton(report_frame, text="Export Report", command=self.export_report_gui)
+        self.report_button.pack(side="left")
+
+    def _load_points_chart(self):
+        """Streams and downsamples the balance history off the UI thread."""
+        end = time.time()
+        start = end - 30 * 86400
+        count = self.history.balance_count(start, end)
+        points = chart.lttb_stream(self.history.balance_series(start, end), count, self.points_chart.max_points)
+        self.scheduler.call_soon(lambda: self.points_chart.set_data(points))
+
+    def export_report_gui(self):
+        """Generates the selected report on a background thread and saves it to a file."""
+        period = self.report_period_optionmenu.get().lower()
+        dest_path = filedialog.asksaveasfilename(
+            title="Export Report",
+            defaultextension=".csv",
+            initialfile=f"{period}-report.csv",
+            filetypes=[("CSV", "*.csv"), ("JSON", "*.json")]
+        )
+        if not dest_path:
+            return
+
+        self.report_button.configure(state="disabled")
+
+        def run_report():
+            try:
+                report = reports.build_report(period, activity_history=self.history)
+                reports.export_report(report, dest_path)
+            except Exception as e:
+                self.scheduler.call_soon(lambda: self._finish_report(dest_path, e))
+            else:
+                self.scheduler.call_soon(lambda: self._finish_report(dest_path, None))
+
+        threading.Thread(target=run_report, daemon=True).start()
+
+    def _finish_report(self, dest_path, error):
+        """Reports the export result - called from main thread."""
+        self.report_button.configure(state="normal")
+        if error is not None:
+            messagebox.showerror("Report Error", f"Could not generate the report: {error}")
+        else:
+            messagebox.showinfo("Report Exported", f"Report saved to '{dest_path}'.")
 
     def update_active_app_TB(self):
         """Updates the detected apps textbox with current active app."""
         while True:
-            time.sleep(1)
-            self.detected_app = tracker.get_active_app()
+            time.sleep(self.idle_detector.poll_interval if self.idle_detector.idle else 1)
+            tick_start = time.perf_counter_ns()
+            if self._check_idle():
+                continue
+            sample = tracker.get_foreground_sample()
+            self.detected_app = monitor.app_name_from_sample(*sample) if sample else None
+            recorder = self.trace_recorder
+            if sample and recorder is not None:
+                recorder.append(time.time(), *sample)
             if (self.detected_app) and (self.detected_app != "python.exe") and  (self.detected_app != "python3.12.exe") :
-                self.detected_app_list.append(self.detected_app)
                 # Update the textbox from the main thread
-                self.after(0, self.update_active_app)
-                self.category = tracker.check_app(self.detected_app)
+                self._dispatch(self.update_active_app, key="active_app")
+                result = self.monitor.tick(self.detected_app, window_title=sample[1])
+                self.category = result.category
+                self.current_points = result.points
+                if result.ranking_changed:
+                    self._dispatch(self.update_top_apps_panel, key="top_apps")
                 
                 # Check if we should show popup based on difficulty level
                 if self.difficulty_level == "productive_guru" and self.category == "Entertainment":
-                    self.show_productivity_popup()
-                
-                with open("points.json", 'r') as file:
-                    points_data = json.load(file)
-                    self.current_points = points_data.get("points", "")
-                    self.points_label.configure(text=self.current_points)
+                    self._dispatch(self.show_productivity_popup, key="productivity_popup")
                 
+                self._dispatch(lambda: self.points_label.configure(text=self.current_points), key="points")
+            diagnostics.record_since("tick", tick_start)
+
+    def _check_idle(self):
+        """Polls the idle detector, starts or ends idle spans and returns whether the user is away."""
+        transition = self.idle_detector.poll()
+        if transition is not None:
+            if transition.idle:
+                logger.info("No input for %d minutes; pausing until it resumes.", self.idle_detector.threshold_seconds // 60)
+                self.current_points = self.monitor.begin_idle(transition.timestamp)
+                self.category = history.IDLE_CATEGORY
+                self._dispatch(self.update_active_app, key="active_app")
+                self._dispatch(self.update_top_apps_panel, key="top_apps")
+                self._dispatch(lambda: self.points_label.configure(text=self.current_points), key="points")
+            else:
+                self.monitor.end_idle(transition.timestamp)
+                logger.info("Input resumed; monitoring again.")
+        return self.idle_detector.idle
+
+    def _dispatch(self, callback, key=None):
+        """
+        Runs callback on the main thread, timing the wait in the scheduler plus
+        the callback itself. A callback still waiting under the same key is
+        replaced rather than run twice.
+        """
+        scheduled = time.perf_counter_ns()
+
+        def run():
+            callback()
+            diagnostics.record_since("ui_dispatch", scheduled)
+
+        self.scheduler.call_soon(run, key)
+
+    def _format_session(self, session):
+        minutes = (session.end - session.start) // 60
+        label = {"focus": "🎯 Focus", "distraction": "🎮 Distraction"}.get(session.kind, "💤 Other")
+        return f"{label} {minutes}m ({session.dominant_app or '-'})"
+
+    def update_top_apps_panel(self):
+        """Renders today's top apps - called from main thread."""
+        top_apps = self.dwell.top()
+        if not top_apps:
+            self.top_apps_label.configure(text="Nothing tracked yet today.")
+            return
+        lines = [f"{rank}. {app_name}  {seconds // 3600}h {seconds % 3600 // 60:02d}m"
+                 for rank, (app_name, seconds) in enumerate(top_apps, start=1)]
+        self.top_apps_label.configure(text="\n".join(lines))
 
     def update_active_app(self):
         """Updates the textbox content - called from main thread."""
         if hasattr(self, 'detected_apps_TB'):
             self.detected_apps_TB.configure(state="normal")
             self.detected_apps_TB.delete("1.0", "end")
-            self.detected_apps_TB.insert("1.0", "\n".join(self.detected_app_list))
+            self.detected_apps_TB.insert("1.0", "\n".join(list(self.detected_app_list)))
             self.detected_apps_TB.configure(state="disabled")
             self.category_label.configure(text=f"Detected App Category: {self.category}")
+            current = self.sessionizer.current
+            text = f"Now: {self._format_session(current)}" if current else "Now: no active session"
+            recent = [self._format_session(session) for session in list(self.sessionizer.recent)[-3:]]
+            if recent:
+                text += "   |   Recent: " + ", ".join(reversed(recent))
+            self.session_label.configure(text=text)
 
     def refresh_app_lists(self):
         """Clears existing app list displays and repopulates them from dummy data."""
@@ -374,39 +591,122 @@ class App(ctk.CTk):
             widget.destroy()
 
         if self.productivity_apps:
-            for app_name in self.productivity_apps:
+            for app_name in self.productivity_apps[:self.max_listed_apps]:
                 app_label_frame = ctk.CTkFrame(self.productivity_app_list_frame, fg_color="transparent")
                 app_label_frame.pack(fill="x", pady=2, padx=5)
                 app_label_frame.columnconfigure(0, weight=1)
 
-                app_label = ctk.CTkLabel(app_label_frame, text=app_name, anchor="w", fg_color="transparent")
+                app_label = ctk.CTkLabel(app_label_frame, text=app_classifier.rule_label(app_name), anchor="w", fg_color="transparent")
                 app_label.grid(row=0, column=0, sticky="ew")
 
                 remove_btn = ctk.CTkButton(app_label_frame, text="X", width=30, height=20,
                                           command=lambda name=app_name: self.remove_app_gui(name, "productivity"))
                 remove_btn.grid(row=0, column=1, padx=(5,0))
+            self._add_overflow_label(self.productivity_app_list_frame, len(self.productivity_apps))
         else:
             ctk.CTkLabel(self.productivity_app_list_frame, text="No productivity apps added yet.").pack(pady=10)
 
         if self.entertainment_apps:
-            for app_name in self.entertainment_apps:
+            for app_name in self.entertainment_apps[:self.max_listed_apps]:
                 app_label_frame = ctk.CTkFrame(self.entertainment_app_list_frame, fg_color="transparent")
                 app_label_frame.pack(fill="x", pady=2, padx=5)
                 app_label_frame.columnconfigure(0, weight=1)
 
-                app_label = ctk.CTkLabel(app_label_frame, text=app_name, anchor="w", fg_color="transparent")
+                app_label = ctk.CTkLabel(app_label_frame, text=app_classifier.rule_label(app_name), anchor="w", fg_color="transparent")
                 app_label.grid(row=0, column=0, sticky="ew")
 
                 remove_btn = ctk.CTkButton(app_label_frame, text="X", width=30, height=20,
                                           command=lambda name=app_name: self.remove_app_gui(name, "entertainment"))
                 remove_btn.grid(row=0, column=1, padx=(5,0))
+            self._add_overflow_label(self.entertainment_app_list_frame, len(self.entertainment_apps))
         else:
             ctk.CTkLabel(self.entertainment_app_list_frame, text="No entertainment apps added yet.").pack(pady=10)
 
+        self.check_rules()
+
+    def check_rules(self):
+        """Analyzes the saved rulebook for conflicts on a background thread."""
+        self._rule_check_generation += 1
+        generation = self._rule_check_generation
+        rulebook = {"productivity_app": list(self.productivity_apps),
+                    "entertainment_app": list(self.entertainment_apps)}
+
+        def run_check():
+            findings = rule_analysis.analyze_rules(rulebook)
+            self.scheduler.call_soon(lambda: self._show_rule_findings(findings, generation))
+
+        threading.Thread(target=run_check, daemon=True).start()
+
+    def _show_rule_findings(self, findings, generation):
+        """Shows the rule check result - called from main thread. Stale results are dropped."""
+        if generation != self._rule_check_generation:
+            return
+        if not findings:
+            self.rule_check_label.configure(text="✅ No conflicting or redundant rules.", text_color="gray")
+            return
+
+        counts = {kind: 0 for kind in rule_analysis.FINDING_KINDS}
+        for finding in findings:
+            counts[finding.kind] += 1
+        summary = ", ".join(f"{count} {kind}" for kind, count in counts.items() if count)
+        lines = [f"⚠️ Rule check: {summary}"] + [f"• {finding.message}" for finding in findings[:5]]
+        if len(findings) > 5:
+            lines.append(f"... and {len(findings) - 5} more")
+        self.rule_check_label.configure(text="\n".join(lines), text_color="orange")
+
+    def _add_overflow_label(self, list_frame, total):
+        """Notes how many entries were left out of a list display."""
+        if total > self.max_listed_apps:
+            ctk.CTkLabel(list_frame, text=f"... and {total - self.max_listed_apps} more (use Export to see all)",
+                         text_color="gray").pack(pady=5)
+
     def refresh_dropdown(self):
         self.all_app_list = tracker.get_all_app_list()
+        for app_name in self.all_app_list:
+            if app_name not in self.search_index:
+                self.search_index.add(app_name, "seen")
         self.choose_app_dropdown.configure(values=self.all_app_list)
 
+    def _rebuild_search_index(self):
+        """Indexes every rule and the currently running apps for fuzzy search."""
+        self.search_index = search_index.TrigramIndex()
+        for app_name in self.all_app_list:
+            self.search_index.add(app_name, "seen")
+        for app_name, _, _ in self.unclassified_apps.top(64):
+            self.search_index.add(app_name, "seen")
+        for entry in self.productivity_apps:
+            self.search_index.add(app_classifier.rule_text(entry), "productivity")
+        for entry in self.entertainment_apps:
+            self.search_index.add(app_classifier.rule_text(entry), "entertainment")
+
+    def _reindex_rule(self, entry):
+        """Updates the search index after a rule was added to or removed from a list."""
+        text = app_classifier.rule_text(entry)
+        self.search_index.remove(text)
+        if entry in self.productivity_apps:
+            self.search_index.add(text, "productivity")
+        elif entry in self.entertainment_apps:
+            self.search_index.add(text, "entertainment")
+
+    def _on_app_name_typed(self, event=None):
+        """Debounces search-as-you-type in the app name entry."""
+        self.scheduler.cancel(self._search_after_id)
+        self._search_after_id = self.scheduler.call_later(0.15, self._show_app_name_suggestions)
+
+    def _show_app_name_suggestions(self):
+        """Offers fuzzy matches for the typed name in the dropdown."""
+        self._search_after_id = None
+        query = self.app_name_entry.get().strip()
+        if not query:
+            self.suggestion_label.configure(text="")
+            self.choose_app_dropdown.configure(values=self.all_app_list)
+            return
+
+        matches = self.search_index.search(query, limit=10)
+        self.choose_app_dropdown.configure(values=[entry for entry, _, _ in matches] or self.all_app_list)
+        existing = [f"{entry} ({kind})" for entry, kind, _ in matches[:3] if kind != "seen"]
+        self.suggestion_label.configure(text=("Existing rules: " + ", ".join(existing)) if existing else "")
+
     def add_app_gui(self):
         """Handles adding a new app from the GUI input fields using dummy data."""
         if self.app_name_entry.get().strip():
@@ -419,10 +719,22 @@ class App(ctk.CTk):
             messagebox.showwarning("Input Error", "Please enter an application name.")
             return
 
+        # Warn about near-duplicate rules ("youtube" vs "youtube.com" vs "YouTube"), in either
+        # list; the rule itself already being in the chosen list is reported below instead
+        similar = [(entry, kind, score)
+                   for entry, kind, score in self.search_index.similar(app_name, kinds=("productivity", "entertainment"))
+                   if (entry, kind) != (app_name, app_type)]
+        if similar:
+            listed = "\n".join(f"• {entry} ({kind})" for entry, kind, _ in similar)
+            if not messagebox.askyesno("Similar Rules Exist",
+                                       f"'{app_name}' looks similar to existing rules:\n{listed}\n\nAdd it anyway?"):
+                return
+
         if app_type == "productivity":
             if app_name not in self.productivity_apps:
                 self.productivity_apps.append(app_name)
                 save_app.save_app_to_productivity(app_name)
+                self._reindex_rule(app_name)
                 self.refresh_app_lists()
                 self.app_name_entry.delete(0, "end")
                 messagebox.showinfo("Success", f"'{app_name}' added to Productivity apps (dummy).")
@@ -432,6 +744,7 @@ class App(ctk.CTk):
             if app_name not in self.entertainment_apps:
                 self.entertainment_apps.append(app_name)
                 save_app.save_app_to_entertainment(app_name)
+                self._reindex_rule(app_name)
                 self.refresh_app_lists()
                 self.app_name_entry.delete(0, "end")
                 messagebox.showinfo("Success", f"'{app_name}' added to Entertainment apps (dummy).")
@@ -447,6 +760,7 @@ class App(ctk.CTk):
             if app_name in self.productivity_apps:
                 self.productivity_apps.remove(app_name)
                 save_app.remove_app_from_productivity(app_name)  # Simulate saving removal
+                self._reindex_rule(app_name)
                 self.refresh_app_lists()
                 messagebox.showinfo("Success", f"'{app_name}' removed from Productivity apps (dummy).")
                 
@@ -456,15 +770,79 @@ class App(ctk.CTk):
             if app_name in self.entertainment_apps:
                 self.entertainment_apps.remove(app_name)
                 save_app.remove_app_from_entertainment(app_name)
+                self._reindex_rule(app_name)
                 self.refresh_app_lists()
                 messagebox.showinfo("Success", f"'{app_name}' removed from Entertainment apps (dummy).")
             else:
                 messagebox.showerror("Error", f"Could not remove '{app_name}'. It might not be in the list (dummy).")
 
+    def import_apps_gui(self):
+        """Imports a rule list into the selected category on a background thread."""
+        source_path = filedialog.askopenfilename(
+            title="Import App List",
+            filetypes=[("App lists", "*.txt *.csv *.json"), ("All files", "*.*")]
+        )
+        if not source_path:
+            return
+
+        key = "productivity_app" if self.app_type_optionmenu.get().lower() == "productivity" else "entertainment_app"
+        self.import_button.configure(state="disabled")
+        self.import_status_label.configure(text="Importing...")
+
+        def report_progress(count):
+            self.scheduler.call_soon(lambda: self.import_status_label.configure(text=f"Importing... {count} entries read"),
+                                     key="import_progress")
+
+        def run_import():
+            try:
+                summary = save_app.import_apps(source_path, key, progress_callback=report_progress)
+            except Exception as e:
+                self.scheduler.call_soon(lambda: self._finish_import(None, e))
+            else:
+                self.scheduler.call_soon(lambda: self._finish_import(summary, None))
+
+        threading.Thread(target=run_import, daemon=True).start()
+
+    def _finish_import(self, summary, error):
+        """Shows the import result and reloads the lists - called from main thread."""
+        self.import_button.configure(state="normal")
+        if error is not None:
+            self.import_status_label.configure(text="Import failed.")
+            messagebox.showerror("Import Error", f"Could not import the list: {error}")
+            return
+
+        data = self.storage.read("productivity")
+        self.productivity_apps = data.get("productivity_app", [])
+        self.entertainment_apps = data.get("entertainment_app", [])
+        self._rebuild_search_index()
+        self.refresh_app_lists()
+
+        message = (f"{summary['added']} added, {summary['duplicates']} duplicates, "
+                   f"{summary['invalid']} invalid ({summary['read']} read)")
+        self.import_status_label.configure(text=message)
+        messagebox.showinfo("Import Complete", message)
+
+    def export_apps_gui(self):
+        """Exports both rule lists to a file chosen by the user."""
+        dest_path = filedialog.asksaveasfilename(
+            title="Export App Lists",
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("CSV", "*.csv")]
+        )
+        if not dest_path:
+            return
+        try:
+            count = save_app.export_apps(dest_path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Export Error", f"Could not export the lists: {e}")
+            return
+        messagebox.showinfo("Export Complete", f"Exported {count} entries to '{dest_path}'.")
+
     def create_app_management_tab(self):
         """Populates the App Management tab with GUI elements."""
         self.app_management_tab.columnconfigure(0, weight=1)
         self.app_management_tab.columnconfigure(1, weight=1)
+        self.app_management_tab.columnconfigure(2, weight=1)
 
         # Add New App Section
         add_app_frame = ctk.CTkFrame(self.app_management_tab)
@@ -476,7 +854,11 @@ class App(ctk.CTk):
 
         ctk.CTkLabel(add_app_frame, text="Application Name/Window Title:").pack(pady=(10, 0), padx=20, anchor="w")
         self.app_name_entry = ctk.CTkEntry(add_app_frame)
-        self.app_name_entry.pack(pady=(0, 10), padx=20, fill="x")
+        self.app_name_entry.pack(pady=(0, 0), padx=20, fill="x")
+        self.app_name_entry.bind("<KeyRelease>", self._on_app_name_typed)
+
+        self.suggestion_label = ctk.CTkLabel(add_app_frame, text="", text_color="gray", wraplength=300, justify="left")
+        self.suggestion_label.pack(pady=(0, 10), padx=20, anchor="w")
 
         self.choose_app_dropdown = ctk.CTkComboBox(add_app_frame, values=self.all_app_list)
         self.choose_app_dropdown.pack(pady=(0, 10), padx=20, fill="x")
@@ -492,6 +874,17 @@ class App(ctk.CTk):
         add_button = ctk.CTkButton(add_app_frame, text="Add Application", command=self.add_app_gui)
         add_button.pack(pady=(0, 20), padx=20, fill="x")
 
+        # Bulk import/export of rule lists
+        self.import_button = ctk.CTkButton(add_app_frame, text="Import List (.txt/.csv/.json)",
+                                           command=self.import_apps_gui)
+        self.import_button.pack(pady=(0, 10), padx=20, fill="x")
+
+        export_button = ctk.CTkButton(add_app_frame, text="Export Lists", command=self.export_apps_gui)
+        export_button.pack(pady=(0, 10), padx=20, fill="x")
+
+        self.import_status_label = ctk.CTkLabel(add_app_frame, text="", text_color="gray")
+        self.import_status_label.pack(pady=(0, 10), padx=20, anchor="w")
+
         # App Lists Section
         lists_frame = ctk.CTkFrame(self.app_management_tab)
         lists_frame.grid(row=0, column=1, padx=(0, 20), pady=20, sticky="nsew")
@@ -511,7 +904,153 @@ class App(ctk.CTk):
         self.entertainment_app_list_frame = ctk.CTkScrollableFrame(lists_frame, height=200)
         self.entertainment_app_list_frame.pack(pady=(0, 10), padx=10, fill="both", expand=True)
 
+        # Rule conflict check, refreshed whenever the lists change
+        self.rule_check_label = ctk.CTkLabel(lists_frame, text="", text_color="gray", wraplength=350, justify="left")
+        self.rule_check_label.pack(pady=(0, 10), padx=10, anchor="w")
+
+        # Unclassified Inbox Section
+        inbox_frame = ctk.CTkFrame(self.app_management_tab)
+        inbox_frame.grid(row=0, column=2, padx=(0, 20), pady=20, sticky="nsew")
+
+        ctk.CTkLabel(inbox_frame, text="📥 Most-Used Unclassified Apps",
+                    font=ctk.CTkFont(size=14, weight="bold")).pack(pady=(10, 5))
+        self.unclassified_inbox_frame = ctk.CTkScrollableFrame(inbox_frame, height=400)
+        self.unclassified_inbox_frame.pack(pady=(0, 10), padx=10, fill="both", expand=True)
+
+        ctk.CTkButton(inbox_frame, text="Refresh Inbox",
+                      command=self.refresh_unclassified_inbox).pack(pady=(0, 10), padx=10, fill="x")
+
         self.refresh_app_lists()
+        self.refresh_unclassified_inbox()
+
+    def refresh_unclassified_inbox(self):
+        """Lists the most-used unclassified apps with one-click classify buttons."""
+        for widget in self.unclassified_inbox_frame.winfo_children():
+            widget.destroy()
+
+        top_apps = self.unclassified_apps.top(20)
+        if not top_apps:
+            ctk.CTkLabel(self.unclassified_inbox_frame, text="No unclassified apps seen yet.").pack(pady=10)
+            return
+
+        for app_name, seconds, _ in top_apps:
+            row = ctk.CTkFrame(self.unclassified_inbox_frame, fg_color="transparent")
+            row.pack(fill="x", pady=2, padx=5)
+            row.columnconfigure(0, weight=1)
+
+            ctk.CTkLabel(row, text=f"{app_name} (~{seconds // 60}m)", anchor="w").grid(row=0, column=0, sticky="ew")
+            ctk.CTkButton(row, text="Productive", width=80, height=20,
+                          command=lambda name=app_name: self.classify_unclassified_app(name, "productivity")
+                          ).grid(row=0, column=1, padx=(5, 0))
+            ctk.CTkButton(row, text="Entertainment", width=80, height=20,
+                          command=lambda name=app_name: self.classify_unclassified_app(name, "entertainment")
+                          ).grid(row=0, column=2, padx=(5, 0))
+
+    def classify_unclassified_app(self, app_name, app_type):
+        """Adds an inbox app to a rule list and removes it from the inbox."""
+        if app_type == "productivity":
+            if app_name not in self.productivity_apps:
+                self.productivity_apps.append(app_name)
+                save_app.save_app_to_productivity(app_name)
+        elif app_name not in self.entertainment_apps:
+            self.entertainment_apps.append(app_name)
+            save_app.save_app_to_entertainment(app_name)
+
+        self.unclassified_apps.discard(app_name)
+        self._reindex_rule(app_name)
+        self.monitor.save_unclassified()
+        self.refresh_app_lists()
+        self.refresh_unclassified_inbox()
+
+    def create_diagnostics_tab(self):
+        """Populates the Diagnostics tab with per-stage latencies of the monitor loop."""
+        self.diagnostics_tab.columnconfigure(0, weight=1)
+        self.diagnostics_tab.rowconfigure(1, weight=1)
+
+        controls = ctk.CTkFrame(self.diagnostics_tab, fg_color="transparent")
+        controls.grid(row=0, column=0, padx=20, pady=(20, 10), sticky="ew")
+
+        self.diagnostics_switch = ctk.CTkSwitch(controls, text="Record timings",
+                                                command=self.toggle_diagnostics)
+        if diagnostics.get_diagnostics().enabled:
+            self.diagnostics_switch.select()
+        self.diagnostics_switch.pack(side="left")
+
+        self.trace_switch = ctk.CTkSwitch(controls, text="Record activity trace",
+                                          command=self.toggle_trace_recording)
+        self.trace_switch.pack(side="left", padx=(20, 0))
+
+        ctk.CTkButton(controls, text="Export JSON", width=120,
+                      command=self.export_diagnostics).pack(side="right")
+
+        self.log_level_optionmenu = ctk.CTkOptionMenu(controls, values=list(app_logging.LEVELS), width=110,
+                                                      command=app_logging.set_level)
+        self.log_level_optionmenu.set(app_logging.get_level())
+        self.log_level_optionmenu.pack(side="right", padx=(0, 10))
+        ctk.CTkLabel(controls, text="Log level:").pack(side="right", padx=(0, 5))
+        ctk.CTkButton(controls, text="Reset", width=80,
+                      command=self.reset_diagnostics).pack(side="right", padx=(0, 10))
+
+        self.diagnostics_textbox = ctk.CTkTextbox(self.diagnostics_tab, font=ctk.CTkFont(family="Courier", size=12))
+        self.diagnostics_textbox.grid(row=1, column=0, padx=20, pady=(0, 20), sticky="nsew")
+        self.diagnostics_textbox.configure(state="disabled")
+
+        self.refresh_diagnostics()
+        self.scheduler.every(2.0, self.refresh_diagnostics)
+
+    def refresh_diagnostics(self):
+        """Renders the diagnostics snapshot."""
+        report = diagnostics.snapshot()
+        lines = [f"{'Stage':<15}{'Count':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'Max ms':>10}"]
+        for stage, stats in report["stages"].items():
+            lines.append(f"{stage:<15}{stats['count']:>9}{stats['p50_us'] / 1000:>10.3f}{stats['p95_us'] / 1000:>10.3f}"
+                         f"{stats['p99_us'] / 1000:>10.3f}{stats['max_us'] / 1000:>10.3f}")
+        if not report["stages"]:
+            lines.append("No timings recorded yet.")
+        lines.append("")
+        lines.append(f"{'Counter':<30}{'Value':>10}")
+        for name, value in report["counters"].items():
+            lines.append(f"{name:<30}{value:>10}")
+        lines.append("")
+        lines.append(f"Since {report['since']}")
+
+        self.diagnostics_textbox.configure(state="normal")
+        self.diagnostics_textbox.delete("1.0", "end")
+        self.diagnostics_textbox.insert("1.0", "\n".join(lines))
+        self.diagnostics_textbox.configure(state="disabled")
+
+    def toggle_diagnostics(self):
+        diagnostics.get_diagnostics().enabled = bool(self.diagnostics_switch.get())
+
+    def toggle_trace_recording(self):
+        """Starts or stops recording the foreground stream to traces/ for activity_trace.py replay."""
+        if self.trace_switch.get():
+            path = os.path.join("traces", time.strftime("trace-%Y%m%d-%H%M%S.tsv.gz"))
+            self.trace_recorder = activity_trace.TraceRecorder(path)
+        elif self.trace_recorder is not None:
+            recorder, self.trace_recorder = self.trace_recorder, None
+            recorder.close()
+            messagebox.showinfo("Trace Saved", f"Activity trace saved to '{recorder.path}'.")
+
+    def reset_diagnostics(self):
+        diagnostics.reset()
+
+    def export_diagnostics(self):
+        """Saves the current diagnostics snapshot as JSON."""
+        dest_path = filedialog.asksaveasfilename(
+            title="Export Diagnostics",
+            defaultextension=".json",
+            initialfile="diagnostics.json",
+            filetypes=[("JSON", "*.json")]
+        )
+        if not dest_path:
+            return
+        try:
+            diagnostics.dump(dest_path)
+        except Exception as e:
+            messagebox.showerror("Export Error", f"Could not export diagnostics: {e}")
+            return
+        messagebox.showinfo("Export Complete", f"Diagnostics written to '{dest_path}'.")
 
     def create_mini_game_tab(self):
         frame = ctk.CTkFrame(self.mini_game_tab)
@@ -553,7 +1092,7 @@ class App(ctk.CTk):
             self.slots.append(slot)
 
         self.spin_button = ctk.CTkButton(
-            self.casino_window, text="SPIN! (Costs 10 points)", command=self.spin,
+            self.casino_window, text=f"SPIN! (Costs {self.slot_engine.spin_cost} points)", command=self.spin,
             font=ctk.CTkFont(size=16, weight="bold"),
             fg_color="#1ABC9C", hover_color="#16A085"
         )
@@ -566,60 +1105,48 @@ class App(ctk.CTk):
         self.update_spin_button()
 
     def spin(self):
-        if self.current_points >= 10:
-            # Deduct points immediately
-            self.deduct_points(10)
+        if self.slot_engine.can_spin(self.current_points):
+            # Deduct points immediately, from the stored balance ticks may have moved since
+            try:
+                self._apply_casino(self.slot_engine.pay)
+            except ValueError:
+                self.update_points_display()
+                self.update_spin_button()
+                return
             self.update_points_display()
 
             # Disable spin button while spinning
             self.spin_button.configure(state='disabled')
             self.animate_slots()
 
-    def animate_slots(self, iteration=0):
-        if iteration < 20:
-            for slot in self.slots:
-                outcome = random.choice(self.outcomes)
-                slot.configure(text=outcome[0])
-            self.after(100, lambda: self.animate_slots(iteration + 1))
-        else:
-            # Select final outcome
-            final_outcome = random.choice(self.outcomes)
-            for slot in self.slots:
-                slot.configure(text=final_outcome[0])
-            self.result_label.configure(text=final_outcome[1])
+    def animate_slots(self):
+        """Spins the reels for 20 frames of 100 ms, then shows the outcome."""
+        self.scheduler.animate(20, 0.1, self._show_reel_frame, self._finish_spin)
 
-            # Apply the outcome effect
-            getattr(self, final_outcome[2])()
+    def _show_reel_frame(self, index):
+        for slot in self.slots:
+            slot.configure(text=self.slot_engine.reel_symbol())
 
-            # Update points display and spin button state after outcome is applied
-            self.update_points_display()
-            self.update_spin_button()
+    def _finish_spin(self):
+        # Select final outcome
+        draw = self.slot_engine.draw()
+        for slot in self.slots:
+            slot.configure(text=draw.outcome.symbol)
+
+        # Apply the outcome effect
+        points_before, points_after = self._apply_casino(lambda balance: self.slot_engine.apply(draw, balance))
+        self.result_label.configure(text=casino_engine.describe(draw, points_before - points_after))
+
+        # Update points display and spin button state after outcome is applied
+        self.update_points_display()
+        self.update_spin_button()
 
     def update_spin_button(self):
-        if self.current_points < 10:
+        if not self.slot_engine.can_spin(self.current_points):
             self.spin_button.configure(state='disabled')
         else:
             self.spin_button.configure(state='normal')
 
-    # Outcome handlers (cleaned, no button state management inside these)
-    def give_points(self):
-        points = random.randint(20, 50)
-        self.add_points(points)
-        self.result_label.configure(text=f"{self.result_label.cget('text')}\nYou won {points} points!")
-
-    def show_tip(self):
-        tip = random.choice(self.tips)
-        self.result_label.configure(text=f"{self.result_label.cget('text')}\n\nProductivity Tip:\n{tip}")
-
-    def show_dare(self):
-        dare = random.choice(self.dares)
-        self.result_label.configure(text=f"{self.result_label.cget('text')}\n\nYour Dare:\n{dare}")
-
-    def lose_all_points(self):
-        points_lost = self.current_points
-        self.current_points = 0
-        self.result_label.configure(text=f"{self.result_label.cget('text')}\n\nYou lost all {points_lost} points!")
-
     # Points utility functions
     def add_points(self, amount):
         self.current_points += amount
@@ -628,13 +1155,36 @@ class App(ctk.CTk):
     def deduct_points(self, amount):
         self.current_points = max(0, self.current_points - amount)
 
+    def _apply_casino(self, change):
+        """
+        Applies a casino change to the stored balance and records exactly that
+        change as a "Casino" event, both under the storage lock so a monitor
+        tick can neither be overwritten nor counted as part of the spin.
+
+        Args:
+            change (callable): Returns the new balance for the current one.
+
+        Returns:
+            tuple: (balance before, balance after)
+        """
+        previous = []
+
+        def apply_change(points_data):
+            previous.append(points_data.get("points", 0))
+            points_data["points"] = max(0, change(previous[-1]))
+            return points_data
+
+        with self.storage.lock:
+            balance = self.storage.update("points", apply_change)["points"]
+            if balance != previous[-1]:
+                self._record_points_event("", "Casino", balance - previous[-1], balance)
+        self.current_points = balance
+        return previous[-1], balance
+
     def update_points_display(self):
         self.points_label.configure(text=self.current_points)
         if hasattr(self, 'casino_points_label'):
             self.casino_points_label.configure(text=f"Current Points: {self.current_points}")
-        new_data = {"points": self.current_points}
-        with open("points.json", 'w') as file:
-            json.dump(new_data, file, indent=4)
 
     def show_productivity_popup(self):
         """Show a productivity reminder popup"""
@@ -659,7 +1209,8 @@ class App(ctk.CTk):
         button_frame.pack(pady=20)
         
         def close_popup():
-            popup.destroy()
+            if popup.winfo_exists():
+                popup.destroy()
         
         continue_button = ctk.CTkButton(
             button_frame,
@@ -680,8 +1231,10 @@ class App(ctk.CTk):
         switch_button.pack(side="left", padx=10)
         
         # Schedule popup to close after 10 seconds
-        popup.after(10000, close_popup)
+        self.scheduler.call_later(10, close_popup)
 
 if __name__ == "__main__":
+    app_logging.setup_logging()
+    diagnostics.add_counter_source(lambda: {"log.dropped": app_logging.dropped_records()})
     app = App()
     app.mainloop()
\ No newline at end of file
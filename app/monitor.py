@@ -0,0 +1,211 @@
+import time
+from collections import deque, namedtuple
+import app_classifier
+import scoring
+import storage
+import history
+import dwell
+import sessions
+import heavy_hitters
+import diagnostics
+
+# The outcome of one monitored second
+TickResult = namedtuple("TickResult", "category delta points bonus ranking_changed")
+
+
+def tab_name_from_url(url):
+    """
+    Returns the site name shown for a Chrome tab, e.g. "www.youtube.com/watch" -> "Youtube".
+    """
+    try:
+        return url.split("/")[0].split(".")[-2].capitalize()
+    except Exception:
+        return "URL not detected"
+
+def app_name_from_sample(process_name, window_title=None, url=None):
+    """Returns the name an app is tracked under: the site for Chrome, the process name otherwise."""
+    if process_name == "chrome.exe":
+        return tab_name_from_url(url)
+    return process_name
+
+
+class Monitor:
+    """
+    The platform-independent part of the monitor loop: classifies the
+    foreground app, scores the second, records it and updates the live
+    aggregates (dwell times, sessions, focus bonus, unclassified inbox).
+    While the user is away (see idle.py) it is told so and does nothing.
+
+    It never looks at the desktop or the wall clock by itself, so recorded
+    traces can be fed through it at any speed; see activity_trace.py.
+    """
+
+    def __init__(self, event_log, activity_history, state=None, clock=time.time,
+                 categories_file_path="productivity.json", on_record=None, on_blocked=None,
+                 recent_size=100):
+        """
+        Args:
+            event_log (EventLog): Where every points change is appended.
+            activity_history (ActivityHistory): Where every sample is stored.
+            state (Storage): Holds points, settings and the unclassified summary.
+                             Defaults to the process-wide storage.
+            clock (callable): Returns the current unix time; used when tick() gets no timestamp.
+            categories_file_path (str): The rulebook to classify with.
+            on_record (callable): Called with (timestamp, category, delta, balance) after each record().
+            on_blocked (callable): Called when entertainment is used with no points left.
+            recent_size (int): How many of the latest detected apps recent_apps keeps.
+        """
+        self.state = state or storage.get_storage()
+        self.event_log = event_log
+        self.history = activity_history
+        self.clock = clock
+        self.categories_file_path = categories_file_path
+        self.on_record = on_record
+        self.on_blocked = on_blocked
+
+        # The latest detected apps for the dashboard; bounded because the app runs for days
+        self.recent_apps = deque(maxlen=recent_size)
+
+        # The start of the current idle span
+        self.idle_since = None
+
+        # Live per-day dwell time
+        self.dwell = dwell.DwellAccumulator(top_n=5)
+
+        # Most-seen unclassified apps, kept in a fixed-size summary across restarts
+        self.unclassified_apps = heavy_hitters.SpaceSaving.from_dict(self.state.read("unclassified"), capacity=64)
+        self._unclassified_since_save = 0
+
+        # Focus/distraction sessions and the sustained-focus bonus
+        self.sessionizer = sessions.Sessionizer(merge_threshold=60)
+        self.focus_bonus = sessions.FocusBonus(threshold_seconds=25 * 60, points=25)
+
+    def seed_dwell(self):
+        """Starts today's dwell totals from the history's rollup so a restart keeps them."""
+        now = self.clock()
+        today = history.local_day(now)
+        app_seconds = {}
+        for app_name, _, seconds in self.history.app_totals(today, today, limit=1000):
+            app_seconds[app_name] = app_seconds.get(app_name, 0) + seconds
+        category_seconds = {category: totals[0] for category, totals in self.history.category_totals(today, today).items()}
+        self.dwell.seed(app_seconds, category_seconds, timestamp=now)
+
+    def record(self, app_name, category, points_delta, balance, now=None):
+        """Records one activity sample or points adjustment in the event log and history."""
+        now = self.clock() if now is None else now
+        start = time.perf_counter_ns()
+        self.event_log.append(now, app_name, category, points_delta)
+        self.history.add(now, app_name, category, points_delta, balance)
+        diagnostics.record_since("record", start)
+        if self.on_record is not None:
+            self.on_record(now, category, points_delta, balance)
+
+    def tick(self, app_name, now=None, window_title=None):
+        """
+        Processes one second of use of app_name, classified by its window title too when given.
+
+        Returns:
+            TickResult: The category, the points change actually applied, the
+                        balance afterwards, any focus bonus paid out and whether
+                        the top-apps ranking changed.
+        """
+        now = self.clock() if now is None else now
+        self.recent_apps.append(app_name)
+
+        start = time.perf_counter_ns()
+        category = app_classifier.classify_app(app_name, self.categories_file_path, window_title)
+        diagnostics.record_since("classify", start)
+
+        # The sample reaches the history under the same lock as its points, so
+        # rescoring.apply() never sees a balance without the sample behind it
+        with self.state.lock:
+            start = time.perf_counter_ns()
+            points_delta, points, previous_points = scoring.score_sample(category, now, self.state)
+            diagnostics.record_since("score", start)
+            self.record(app_name, category, points_delta, points, now)
+        if category == "Entertainment" and previous_points <= 0 and self.on_blocked is not None:
+            self.on_blocked()
+        ranking_changed = self.dwell.add(app_name, category, timestamp=now)
+
+        bonus = self._update_sessions(app_name, category, now)
+        if bonus:
+            points += bonus
+        if category == "Unclassified":
+            self._track_unclassified(app_name)
+
+        return TickResult(category, points_delta, points, bonus, ranking_changed)
+
+    def begin_idle(self, since, now=None):
+        """
+        Starts an idle span at since, the last input, idleness having been
+        noticed at now. The ticks (and focus bonuses) recorded in between were
+        time away: they are deleted from the history, taken out of the dwell
+        totals and the open session, and the points they earned or cost are
+        taken back with a "Rescore" adjustment.
+
+        Returns:
+            int: The points balance afterwards.
+        """
+        now = self.clock() if now is None else now
+        self.idle_since = since
+        previous = []
+
+        def apply_refund(points_data):
+            previous.append(points_data.get("points", 0))
+            points_data["points"] = max(0, previous[-1] + refund)
+            return points_data
+
+        # Under the lock so a rescoring can't see the samples gone but not the
+        # refund. The refund comes from the deleted rows themselves, however
+        # long the idle threshold is.
+        with self.state.lock:
+            away = self.history.remove_samples(since, int(now) + 1)
+            refund = -sum(delta for _, _, _, delta in away)
+            balance = self.state.read("points").get("points", 0)
+            if refund:
+                balance = self.state.update("points", apply_refund)["points"]
+                if balance != previous[-1]:
+                    self.record("", "Rescore", balance - previous[-1], balance, now)
+
+        for timestamp, app_name, category, _ in away:
+            self.dwell.remove(app_name, category, 1, timestamp)
+        self.sessionizer.end_at(int(since))
+        return balance
+
+    def end_idle(self, until):
+        """Ends the current idle span at until and records it in the history."""
+        if self.idle_since is None:
+            return
+        self.history.add_idle_span(self.idle_since, until)
+        self.idle_since = None
+
+    def _update_sessions(self, app_name, category, now):
+        """Feeds the sessionizer and pays out the focus bonus."""
+        self.sessionizer.feed(int(now), app_name, category)
+        bonus = self.focus_bonus.check(self.sessionizer.current)
+        if bonus:
+            def add_bonus(points_data):
+                points_data["points"] = points_data.get("points", 0) + bonus
+                return points_data
+
+            balance = self.state.update("points", add_bonus)["points"]
+            self.record(app_name, "Bonus", bonus, balance, now)
+        return bonus
+
+    def _track_unclassified(self, app_name):
+        """Counts an unclassified app and saves the summary every minute of unclassified use."""
+        self.unclassified_apps.add(app_name)
+        self._unclassified_since_save += 1
+        if self._unclassified_since_save >= 60:
+            self._unclassified_since_save = 0
+            self.save_unclassified()
+
+    def save_unclassified(self):
+        self.state.write("unclassified", self.unclassified_apps.to_dict())
+
+    def close(self):
+        """Ends any idle span, flushes buffered events and samples and saves the unclassified summary."""
+        self.end_idle(self.clock())
+        self.event_log.flush()
+        self.history.close()
+        self.save_unclassified()
@@ -0,0 +1,168 @@
+import argparse
+import csv
+import datetime
+import heapq
+import json
+import time
+import storage
+import history
+from eventlog import ADJUSTMENT_CATEGORIES
+
+PERIODS = ("daily", "weekly", "monthly")
+
+# Productive samples further apart than this (in seconds) end a focus streak
+STREAK_MAX_GAP = 2
+
+
+def period_bounds(period, day=None):
+    """
+    Returns the (start, end) unix timestamps of the local day, week (Monday
+    to Sunday) or month containing day.
+
+    Args:
+        period (str): 'daily', 'weekly' or 'monthly'.
+        day (datetime.date): Any day in the period. Defaults to today.
+    """
+    day = day or datetime.date.today()
+    if period == "daily":
+        first, last = day, day
+    elif period == "weekly":
+        first = day - datetime.timedelta(days=day.weekday())
+        last = first + datetime.timedelta(days=6)
+    elif period == "monthly":
+        first = day.replace(day=1)
+        next_month = (first + datetime.timedelta(days=32)).replace(day=1)
+        last = next_month - datetime.timedelta(days=1)
+    else:
+        raise ValueError(f"Unknown report period '{period}'. Expected one of {', '.join(PERIODS)}.")
+
+    start = time.mktime(first.timetuple())
+    end = time.mktime((last + datetime.timedelta(days=1)).timetuple())
+    return int(start), int(end)
+
+# --- Sources: each yields (timestamp, app, category, seconds, delta) ---
+
+def history_records(activity_history, start, end):
+    """Streams records from an ActivityHistory's raw samples, with its idle spans merged in."""
+    samples = ((timestamp, app, category, 0 if category in ADJUSTMENT_CATEGORIES else 1, delta)
+               for timestamp, app, category, delta, _ in activity_history.iter_samples(start, end))
+    idle = ((span_start, "", history.IDLE_CATEGORY, span_end - span_start, 0)
+            for span_start, span_end in activity_history.idle_spans(start, end))
+    yield from heapq.merge(samples, idle, key=lambda record: record[0])
+
+def event_log_records(event_log, start, end):
+    """Streams records from an EventLog (raw and compacted segments)."""
+    for record in event_log.records():
+        if start <= record[0] < end:
+            yield record
+
+# --- Aggregation ---
+
+def aggregate(records):
+    """
+    Builds a report from a record stream in a single pass. Memory use depends
+    only on the number of distinct apps and categories, not on the stream length.
+
+    Returns:
+        dict: Totals with 'app_seconds', 'category_seconds', 'points_earned',
+              'points_lost', 'longest_focus_streak' (seconds, start, end) and 'samples'.
+    """
+    app_seconds = {}
+    category_seconds = {}
+    earned = lost = samples = 0
+    streak_start = streak_end = None
+    best = (0, None, None)
+
+    for timestamp, app, category, seconds, delta in records:
+        samples += 1
+        if delta > 0:
+            earned += delta
+        else:
+            lost -= delta
+        if category in ADJUSTMENT_CATEGORIES:
+            continue
+
+        if app:
+            app_seconds[app] = app_seconds.get(app, 0) + seconds
+        category_seconds[category] = category_seconds.get(category, 0) + seconds
+
+        if category == "Productive":
+            if streak_end is None or timestamp > streak_end + STREAK_MAX_GAP:
+                streak_start = timestamp
+            streak_end = timestamp + seconds
+            if streak_end - streak_start > best[0]:
+                best = (streak_end - streak_start, streak_start, streak_end)
+        else:
+            streak_start = streak_end = None
+
+    return {
+        "app_seconds": dict(sorted(app_seconds.items(), key=lambda item: item[1], reverse=True)),
+        "category_seconds": category_seconds,
+        "points_earned": earned,
+        "points_lost": lost,
+        "longest_focus_streak": {"seconds": best[0], "start": best[1], "end": best[2]},
+        "samples": samples,
+    }
+
+def build_report(period, day=None, activity_history=None):
+    """
+    Generates the report for the period containing day from the activity history.
+    """
+    if activity_history is None:
+        activity_history = history.open_history()
+    start, end = period_bounds(period, day)
+    report = aggregate(history_records(activity_history, start, end))
+    report["period"] = period
+    report["start"] = start
+    report["end"] = end
+    return report
+
+# --- Export ---
+
+def write_json(report, file_path):
+    storage.write_json_atomic(file_path, report)
+
+def write_csv(report, file_path):
+    """Writes a report as 'section,name,value' rows."""
+    with open(file_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["section", "name", "value"])
+        writer.writerow(["period", report.get("period", ""), ""])
+        writer.writerow(["period", "start", report.get("start", "")])
+        writer.writerow(["period", "end", report.get("end", "")])
+        for category, seconds in report["category_seconds"].items():
+            writer.writerow(["category_seconds", category, seconds])
+        for app, seconds in report["app_seconds"].items():
+            writer.writerow(["app_seconds", app, seconds])
+        writer.writerow(["points", "earned", report["points_earned"]])
+        writer.writerow(["points", "lost", report["points_lost"]])
+        streak = report["longest_focus_streak"]
+        writer.writerow(["longest_focus_streak", "seconds", streak["seconds"]])
+        writer.writerow(["longest_focus_streak", "start", streak["start"] or ""])
+        writer.writerow(["longest_focus_streak", "end", streak["end"] or ""])
+
+def export_report(report, file_path):
+    """Writes a report as CSV or JSON depending on the file extension."""
+    if file_path.lower().endswith(".csv"):
+        write_csv(report, file_path)
+    else:
+        write_json(report, file_path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a GetB@ck2Work productivity report.")
+    parser.add_argument("period", choices=PERIODS)
+    parser.add_argument("--date", type=datetime.date.fromisoformat, default=None,
+                        help="Any day in the period (YYYY-MM-DD). Defaults to today.")
+    parser.add_argument("--output", "-o", default=None,
+                        help="Write the report to this .csv or .json file instead of printing it.")
+    args = parser.parse_args(argv)
+
+    report = build_report(args.period, args.date)
+    if args.output:
+        export_report(report, args.output)
+        print(f"Report written to '{args.output}'.")
+    else:
+        print(json.dumps(report, indent=4, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+from array import array
+import scoring
+import storage
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; rescoring falls back to a pure-Python loop
+    np = None
+
+# Category codes used in the sample arrays
+UNCLASSIFIED, PRODUCTIVE, ENTERTAINMENT, FIXED, IGNORED = 0, 1, 2, 3, 4
+
+# Casino results, focus bonuses and the initial balance do not depend on the
+# difficulty and are replayed as recorded. Resets and earlier rescores are
+# artifacts of past difficulty changes, which rescoring replaces.
+_CATEGORY_CODE_SQL = (
+    "CASE category"
+    " WHEN 'Productive' THEN 1"
+    " WHEN 'Entertainment' THEN 2"
+    " WHEN 'Baseline' THEN 3 WHEN 'Bonus' THEN 3 WHEN 'Casino' THEN 3"
+    " WHEN 'Reset' THEN 4 WHEN 'Rescore' THEN 4"
+    " ELSE 0 END"
+)
+
+
+class ActivityArrays:
+    """
+    Recorded samples as flat arrays: timestamps, category codes and the
+    recorded deltas (only used for FIXED samples), plus the balance the
+    user had before the first sample. last_key is the (ts, rowid) of the
+    last sample loaded, so later samples can be added with extend_activity().
+    """
+
+    def __init__(self, timestamps, categories, deltas, initial_balance, last_key=None):
+        self.timestamps = timestamps
+        self.categories = categories
+        self.deltas = deltas
+        self.initial_balance = initial_balance
+        self.last_key = last_key
+
+    def __len__(self):
+        return len(self.timestamps)
+
+
+def _load_rows(activity, activity_history, where, params, batch_size):
+    """Appends the samples matching where to activity, in (ts, rowid) order."""
+    query = (f"SELECT ts, rowid, {_CATEGORY_CODE_SQL}, delta, balance FROM samples "
+             f"WHERE {where} ORDER BY ts, rowid")
+    with activity_history.lock:
+        cursor = activity_history.connection.execute(query, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                if not len(activity):
+                    _, _, _, delta, balance = rows[0]
+                    activity.initial_balance = max(0, balance - delta if balance is not None else 0)
+                for timestamp, _, category, delta, _ in rows:
+                    activity.timestamps.append(timestamp)
+                    activity.categories.append(category)
+                    activity.deltas.append(delta)
+                activity.last_key = rows[-1][:2]
+        finally:
+            cursor.close()
+    return activity
+
+def load_activity(activity_history, start=None, end=None, batch_size=50000):
+    """
+    Loads the recorded samples between start and end from an ActivityHistory.
+    The balance before the first sample is derived from its stored balance,
+    so history that was already purged by retention is accounted for.
+    """
+    activity_history.flush()
+    activity = ActivityArrays(array('q'), array('b'), array('q'), 0)
+    params = (0 if start is None else int(start), 2 ** 62 if end is None else int(end))
+    return _load_rows(activity, activity_history, "ts >= ? AND ts < ?", params, batch_size)
+
+def extend_activity(activity, activity_history, batch_size=50000):
+    """Adds the samples recorded after the last one in activity (e.g. while a preview was shown)."""
+    activity_history.flush()
+    if activity.last_key is None:
+        return _load_rows(activity, activity_history, "1", (), batch_size)
+    last_ts, last_rowid = activity.last_key
+    return _load_rows(activity, activity_history, "ts > ? OR (ts = ? AND rowid > ?)",
+                      (last_ts, last_ts, last_rowid), batch_size)
+
+def rescore(activity, difficulty):
+    """
+    Recomputes the final points balance for the recorded activity under a
+    difficulty level, applying the same clamp-at-zero rule as live scoring.
+
+    Returns:
+        int: The balance the user would have now.
+    """
+    rules = scoring.difficulty_rules(difficulty)
+    if np is None:
+        return _rescore_python(activity, rules)
+
+    timestamps = np.frombuffer(activity.timestamps, dtype=np.int64)
+    categories = np.frombuffer(activity.categories, dtype=np.int8)
+    recorded = np.frombuffer(activity.deltas, dtype=np.int64)
+
+    deltas = np.zeros(len(timestamps), dtype=np.int64)
+    productive = categories == PRODUCTIVE
+    earning = productive & (timestamps % rules["productive_interval"] < 1)
+    deltas[earning] = rules["productive_points"]
+    deltas[categories == ENTERTAINMENT] = rules["entertainment_points"]
+    fixed = categories == FIXED
+    deltas[fixed] = recorded[fixed]
+
+    # A running sum clamped at 0 equals the plain prefix sum minus the lowest
+    # (negative) prefix sum seen so far.
+    prefix = np.cumsum(deltas) + activity.initial_balance
+    if len(prefix) == 0:
+        return int(activity.initial_balance)
+    floor = min(int(np.minimum.accumulate(prefix)[-1]), 0)
+    return int(prefix[-1] - floor)
+
+def _rescore_python(activity, rules):
+    balance = activity.initial_balance
+    interval = rules["productive_interval"]
+    productive_points = rules["productive_points"]
+    entertainment_points = rules["entertainment_points"]
+    for timestamp, category, delta in zip(activity.timestamps, activity.categories, activity.deltas):
+        if category == PRODUCTIVE:
+            if timestamp % interval < 1:
+                balance += productive_points
+        elif category == ENTERTAINMENT:
+            balance = max(0, balance + entertainment_points)
+        elif category == FIXED:
+            balance = max(0, balance + delta)
+    return balance
+
+def preview(activity, difficulties=None):
+    """Returns {difficulty: balance} for each difficulty level (all levels by default)."""
+    return {difficulty: rescore(activity, difficulty) for difficulty in difficulties or scoring.DIFFICULTY_LEVELS}
+
+def apply(activity, difficulty, state=None, activity_history=None):
+    """
+    Switches to a difficulty level and replaces the stored balance with the
+    rescored one.
+
+    Args:
+        activity (ActivityArrays): The activity loaded for the preview.
+        difficulty (str): The new difficulty level.
+        state (Storage): Defaults to the process-wide storage.
+        activity_history (ActivityHistory): When given, the samples recorded
+            since activity was loaded are added to it under the storage lock
+            first, so none recorded while the preview was shown are lost.
+
+    Returns:
+        tuple: (new_points, points_delta) so the caller can record the change
+               under the 'Rescore' adjustment category; it should hold
+               state.lock around the call and the record.
+    """
+    state = state or storage.get_storage()
+
+    def set_difficulty(settings):
+        settings["difficulty_level"] = difficulty
+        return settings
+
+    with state.lock:
+        if activity_history is not None:
+            extend_activity(activity, activity_history)
+        new_points = rescore(activity, difficulty)
+        previous_points = state.read("points").get("points", 0)
+        state.update("settings", set_difficulty)
+        state.write("points", {"points": new_points})
+    return new_points, new_points - previous_points
@@ -0,0 +1,174 @@
+from collections import deque, namedtuple
+import app_classifier
+import storage
+
+# A problem found in the rulebook. rule/other are the rule entries involved,
+# category/other_category the categories they belong to ("Productive"/"Entertainment").
+Finding = namedtuple("Finding", "kind rule category other other_category message")
+
+FINDING_KINDS = ("duplicate", "shadowed", "redundant")
+
+# Rule types whose matches always contain the pattern as a substring, so a
+# keyword found inside the pattern matches every name the rule can match.
+_LITERAL_TYPES = ("keyword", "exact", "domain")
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over keyword patterns.
+
+    find_all(text) reports every keyword occurring in text in a single pass,
+    so checking all rules against all keywords costs the total pattern length
+    plus the number of hits instead of one comparison per pair of rules.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self._built = False
+
+    def add(self, keyword, value):
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(value)
+        self._built = False
+
+    def build(self):
+        """Computes the failure links breadth-first."""
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                # Inherit the matches of the longest proper suffix
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+        self._built = True
+
+    def find_all(self, text):
+        """Yields the value of every keyword occurring in text (once per occurrence)."""
+        if not self._built:
+            self.build()
+        state = 0
+        goto, fail, output = self._goto, self._fail, self._output
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            yield from output[state]
+
+
+def _beats(category, priority, other_category, other_priority):
+    """Whether a rule wins over another one that matches the same name."""
+    if priority != other_priority:
+        return priority > other_priority
+    # Within a priority level productive rules are checked first
+    return category == "Productive" and other_category != "Productive"
+
+def _normalized(rule_type, pattern):
+    pattern = pattern.strip()
+    if rule_type == "domain":
+        return pattern.lower().lstrip("*.").rstrip("/")
+    if rule_type == "regex":
+        return pattern
+    if rule_type == "title":
+        return " ".join(sorted(set(app_classifier.title_tokens(pattern))))
+    return pattern.lower()
+
+def analyze_rules(data):
+    """
+    Finds rules that can never decide a classification.
+
+    - duplicate: the same rule is in both lists; only the winning one applies.
+    - shadowed: every name the rule matches also contains a keyword of the
+      other list that wins over it (e.g. productive "code" shadows
+      entertainment "vscode-games").
+    - redundant: the rule is covered by another rule of the same list with at
+      least the same priority, or is listed twice.
+
+    Args:
+        data (dict): The rulebook as stored in productivity.json.
+
+    Returns:
+        list: Finding tuples grouped by kind, in rulebook order within each kind.
+    """
+    rules = []
+    for category, key in app_classifier.CATEGORY_KEYS:
+        entries = data.get(key, [])
+        if not isinstance(entries, list):
+            entries = [entries]
+        for entry in entries:
+            rule = app_classifier.parse_rule(entry)
+            if rule is None or not rule[1].strip():
+                continue
+            rule_type, pattern, priority = rule
+            rules.append((entry, category, rule_type, _normalized(rule_type, pattern), priority))
+
+    findings = []
+    reported = set()
+    first_seen = {}
+    for index, (entry, category, rule_type, pattern, priority) in enumerate(rules):
+        other_index = first_seen.setdefault((rule_type, pattern), index)
+        if other_index == index:
+            continue
+        other_entry, other_category, _, _, other_priority = rules[other_index]
+        reported.add(index)
+        if other_category == category:
+            findings.append(Finding("redundant", entry, category, other_entry, other_category,
+                                    f"'{app_classifier.rule_text(entry)}' is listed more than once."))
+            continue
+        if _beats(category, priority, other_category, other_priority):
+            loser, winner = other_index, index
+        else:
+            loser, winner = index, other_index
+        reported.add(loser)
+        findings.append(Finding("duplicate", rules[loser][0], rules[loser][1], rules[winner][0], rules[winner][1],
+                                f"'{app_classifier.rule_text(rules[loser][0])}' is in both lists; "
+                                f"it always counts as {rules[winner][1]}."))
+
+    automaton = KeywordAutomaton()
+    for index, (_, _, rule_type, pattern, _) in enumerate(rules):
+        if rule_type == "keyword" and index not in reported:
+            automaton.add(pattern, index)
+
+    for index, (entry, category, rule_type, pattern, priority) in enumerate(rules):
+        if rule_type not in _LITERAL_TYPES or index in reported:
+            continue
+        for other_index in automaton.find_all(pattern):
+            if other_index == index:
+                continue
+            other_entry, other_category, _, _, other_priority = rules[other_index]
+            if other_category != category and _beats(other_category, other_priority, category, priority):
+                findings.append(Finding("shadowed", entry, category, other_entry, other_category,
+                                        f"'{app_classifier.rule_text(entry)}' never applies: every match also "
+                                        f"contains {other_category.lower()} keyword '{app_classifier.rule_text(other_entry)}'."))
+            elif other_category == category and other_priority >= priority:
+                findings.append(Finding("redundant", entry, category, other_entry, other_category,
+                                        f"'{app_classifier.rule_text(entry)}' is already covered by "
+                                        f"'{app_classifier.rule_text(other_entry)}'."))
+            else:
+                continue
+            reported.add(index)
+            break
+
+    findings.sort(key=lambda finding: FINDING_KINDS.index(finding.kind))
+    return findings
+
+def analyze_rulebook(categories_file_path="productivity.json"):
+    """Loads the rulebook from storage and returns analyze_rules() findings for it."""
+    state, key = storage.resolve(categories_file_path)
+    return analyze_rules(state.read(key))
@@ -1,26 +1,29 @@
+import logging
 import json
 import os
+import re
+import csv
+import storage
+import app_classifier
+
+logger = logging.getLogger(__name__)
 
 def _read_json_file(file_path):
     """
-    Helper function to read JSON data from a file.
-    Returns an empty dictionary if the file doesn't exist or is invalid.
+    Helper function to read the state document behind a file path (see storage.resolve).
+    Returns an empty dictionary if it doesn't exist or is invalid.
     """
-    if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                print(f"Warning: '{file_path}' is empty or corrupted. Starting with an empty JSON object.")
-                return {}
-    return {}
+    state, key = storage.resolve(file_path)
+    return state.read(key)
 
-def _write_json_file(file_path, data):
+def _update_json_file(file_path, func):
     """
-    Helper function to write JSON data to a file.
+    Helper function for a read-modify-write of the state document behind a
+    file path under the storage lock, so concurrent edits (e.g. an import
+    running while a rule is added in the GUI) are not lost.
     """
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+    state, key = storage.resolve(file_path)
+    return state.update(key, func)
 
 def _update_app_list(existing_data: dict, key: str, app_name: str) -> dict:
     """
@@ -35,14 +38,14 @@ def _update_app_list(existing_data: dict, key: str, app_name: str) -> dict:
             app_list = [app_list]
         else:
             app_list = []
-            print(f"Warning: '{key}' in data was not a list or string. Re-initializing.")
+            logger.warning("'%s' in data was not a list or string. Re-initializing.", key)
 
     # Add the new app_name if it's not already in the list
     if app_name not in app_list:
         app_list.append(app_name)
-        print(f"'{app_name}' added to {key} list.")
+        logger.info("'%s' added to %s list.", app_name, key)
     else:
-        print(f"'{app_name}' is already in the {key} list. No new entry added.")
+        logger.info("'%s' is already in the %s list. No new entry added.", app_name, key)
 
     existing_data[key] = app_list
     return existing_data
@@ -54,16 +57,14 @@ def save_app_to_productivity(app_name: str):
     it will be initialized/converted to a list.
     """
     file_path = "productivity.json"
-    existing_data = _read_json_file(file_path)
 
     try:
-        updated_data = _update_app_list(existing_data, 'productivity_app', app_name)
-        _write_json_file(file_path, updated_data)
-        print(f"Productivity apps successfully updated in '{file_path}'.")
+        _update_json_file(file_path, lambda existing_data: _update_app_list(existing_data, 'productivity_app', app_name))
+        logger.debug("Productivity apps successfully updated in '%s'.", file_path)
     except IOError as e:
-        print(f"Error saving data to file: {e}")
+        logger.error("Error saving data to file: %s", e)
     except Exception as e:
-        print(f"An unexpected error occurred: {e}")
+        logger.exception("An unexpected error occurred: %s", e)
 
 def save_app_to_entertainment(app_name: str):
     """
@@ -72,16 +73,14 @@ def save_app_to_entertainment(app_name: str):
     it will be initialized/converted to a list.
     """
     file_path = "productivity.json"
-    existing_data = _read_json_file(file_path)
 
     try:
-        updated_data = _update_app_list(existing_data, 'entertainment_app', app_name)
-        _write_json_file(file_path, updated_data)
-        print(f"Entertainment apps successfully updated in '{file_path}'.")
+        _update_json_file(file_path, lambda existing_data: _update_app_list(existing_data, 'entertainment_app', app_name))
+        logger.debug("Entertainment apps successfully updated in '%s'.", file_path)
     except IOError as e:
-        print(f"Error saving data to file: {e}")
+        logger.error("Error saving data to file: %s", e)
     except Exception as e:
-        print(f"An unexpected error occurred: {e}")
+        logger.exception("An unexpected error occurred: %s", e)
 
 def remove_app_from_productivity(app_name: str):
     """
@@ -89,19 +88,21 @@ def remove_app_from_productivity(app_name: str):
     If the key does not exist or the app is not found, it will do nothing.
     """
     file_path = "productivity.json"
-    existing_data = _read_json_file(file_path)
 
-    if 'productivity_app' in existing_data:
-        app_list = existing_data['productivity_app']
-        if app_name in app_list:
-            app_list.remove(app_name)
-            existing_data['productivity_app'] = app_list
-            _write_json_file(file_path, existing_data)
-            print(f"'{app_name}' removed from productivity apps.")
+    def remove(existing_data):
+        if 'productivity_app' in existing_data:
+            app_list = existing_data['productivity_app']
+            if app_name in app_list:
+                app_list.remove(app_name)
+                existing_data['productivity_app'] = app_list
+                logger.info("'%s' removed from productivity apps.", app_name)
+            else:
+                logger.info("'%s' not found in productivity apps.", app_name)
         else:
-            print(f"'{app_name}' not found in productivity apps.")
-    else:
-        print("No productivity apps found to remove.")
+            logger.info("No productivity apps found to remove.")
+        return existing_data
+
+    _update_json_file(file_path, remove)
 
 def remove_app_from_entertainment(app_name: str):
     """
@@ -109,17 +110,260 @@ def remove_app_from_entertainment(app_name: str):
     If the key does not exist or the app is not found, it will do nothing.
     """
     file_path = "productivity.json"
-    existing_data = _read_json_file(file_path)
 
-    if 'entertainment_app' in existing_data:
-        app_list = existing_data['entertainment_app']
-        if app_name in app_list:
-            app_list.remove(app_name)
-            existing_data['entertainment_app'] = app_list
-            _write_json_file(file_path, existing_data)
-            print(f"'{app_name}' removed from entertainment apps.")
+    def remove(existing_data):
+        if 'entertainment_app' in existing_data:
+            app_list = existing_data['entertainment_app']
+            if app_name in app_list:
+                app_list.remove(app_name)
+                existing_data['entertainment_app'] = app_list
+                logger.info("'%s' removed from entertainment apps.", app_name)
+            else:
+                logger.info("'%s' not found in entertainment apps.", app_name)
+        else:
+            logger.info("No entertainment apps found to remove.")
+        return existing_data
+
+    _update_json_file(file_path, remove)
+
+
+# --- Bulk import/export ---
+
+APP_LIST_KEYS = ("productivity_app", "entertainment_app")
+
+# Column names recognised as the rule column in CSV files with a header row.
+_CSV_NAME_COLUMNS = ("app", "name", "app_name", "domain", "pattern", "rule")
+# Values of a CSV "category" column, mapped to the list they belong to
+_CSV_CATEGORIES = {key: key for key in APP_LIST_KEYS}
+_CSV_CATEGORIES.update({category.lower(): key for category, key in app_classifier.CATEGORY_KEYS})
+_CSV_CATEGORIES.update({"productivity": "productivity_app", "entertainment": "entertainment_app"})
+# In text lists, a '#' starting a line or following whitespace begins a comment
+_COMMENT = re.compile(r"(?:^|\s)#")
+
+def _entry_key(entry):
+    """
+    Returns a hashable key for a rule entry so lists can be deduplicated with sets.
+    Rules are keyed by their parsed (type, pattern, priority) form, so "regex:x"
+    and {"type": "regex", "pattern": "x"} count as the same rule.
+    """
+    rule = app_classifier.parse_rule(entry)
+    if rule is not None:
+        return rule
+    if isinstance(entry, dict):
+        return json.dumps(entry, sort_keys=True)
+    return entry
+
+def _rule_entry(text, priority):
+    """Builds a rule entry from its "type:pattern" text and priority (plain text when there is none)."""
+    if not priority:
+        return text
+    rule_type, pattern, _ = app_classifier.parse_rule(text)
+    return {"type": rule_type, "pattern": pattern, "priority": priority}
+
+def _iter_text_names(f):
+    """
+    Yields names from a plain-text list, one per line. Blank lines and '#'
+    comments (at the start of a line or after whitespace, so names such as
+    'site.com/#inbox' are kept whole) are skipped, and hosts-file lines
+    ("0.0.0.0 example.com") yield the host.
+    """
+    for line in f:
+        line = _COMMENT.split(line, 1)[0].strip()
+        if not line:
+            continue
+        parts = line.split()
+        yield parts[1] if len(parts) > 1 and parts[0] in ("0.0.0.0", "127.0.0.1", "::1") else line
+
+def _iter_csv_rows(f, key):
+    """
+    Yields (key, entry) pairs from a CSV file. If the first row is a header
+    containing a known column name (see _CSV_NAME_COLUMNS) that column is used,
+    otherwise the first one. A "category" column puts each row in its own list
+    (key is then only used for rows without one) and a "priority" column turns
+    rows into prioritised rule objects, as written by export_apps.
+    """
+    reader = csv.reader(f)
+    column = 0
+    category_column = priority_column = None
+    for row_number, row in enumerate(reader):
+        if not row:
+            continue
+        if row_number == 0:
+            header = [cell.strip().lower() for cell in row]
+            matches = [name for name in _CSV_NAME_COLUMNS if name in header]
+            if matches:
+                column = header.index(matches[0])
+                category_column = header.index("category") if "category" in header else None
+                priority_column = header.index("priority") if "priority" in header else None
+                continue
+        if column >= len(row) or not row[column].strip():
+            continue
+
+        row_key = key
+        if category_column is not None and category_column < len(row) and row[category_column].strip():
+            row_key = _CSV_CATEGORIES.get(row[category_column].strip().lower())
+            if row_key is None:
+                yield None, None  # Counted as invalid
+                continue
+        if row_key is None:
+            raise ValueError("A target list is required for CSV rows without a category.")
+        priority = 0
+        if priority_column is not None and priority_column < len(row) and row[priority_column].strip():
+            try:
+                priority = int(row[priority_column])
+            except ValueError:
+                yield row_key, None
+                continue
+        yield row_key, _rule_entry(row[column].strip(), priority)
+
+def iter_import_file(source_path: str, key: str = None):
+    """
+    Streams (key, entry) pairs from a .txt, .csv or .json list without holding
+    the whole file in memory (JSON files are parsed in one go).
+
+    Args:
+        source_path (str): The file to import.
+        key (str): The list ('productivity_app' or 'entertainment_app') entries from
+                   plain lists belong to. Entries whose file names their list
+                   (the productivity.json layout, or a CSV "category" column)
+                   keep their own list.
+
+    Yields:
+        tuple: (key, entry) for every entry found in the file.
+    """
+    extension = os.path.splitext(source_path)[1].lower()
+    with open(source_path, 'r', encoding='utf-8-sig', newline='') as f:
+        if extension == ".json":
+            data = json.load(f)
+            if isinstance(data, dict):
+                for list_key in APP_LIST_KEYS:
+                    entries = data.get(list_key, [])
+                    for entry in entries if isinstance(entries, list) else [entries]:
+                        yield list_key, entry
+                return
+            names = data if isinstance(data, list) else []
+        elif extension == ".csv":
+            yield from _iter_csv_rows(f, key)
+            return
         else:
-            print(f"'{app_name}' not found in entertainment apps.")
+            names = _iter_text_names(f)
+
+        if key is None:
+            raise ValueError(f"A target list is required to import '{source_path}'.")
+        for name in names:
+            yield key, name
+
+def _update_app_list_container(existing_data: dict, key: str) -> list:
+    """
+    Helper function returning the list stored under key, normalised the same
+    way _update_app_list does (strings become one-item lists, anything else is dropped).
+    """
+    app_list = existing_data.get(key, [])
+    if isinstance(app_list, list):
+        return list(app_list)
+    if isinstance(app_list, str):
+        return [app_list]
+    return []
+
+def import_apps(source_path: str, key: str = None, file_path: str = "productivity.json",
+                progress_callback=None) -> dict:
+    """
+    Imports a list of apps/domains into 'productivity.json' in a single write.
+    The file is read and deduplicated first; the new entries are then merged
+    into the current lists under the storage lock, so rules added elsewhere
+    while the file was being read are kept.
+
+    Args:
+        source_path (str): The .txt, .csv or .json file to import.
+        key (str): 'productivity_app' or 'entertainment_app'. Optional for files
+                   that name each entry's list (see iter_import_file).
+        file_path (str): The rule file to update. Defaults to 'productivity.json'.
+        progress_callback (callable): Optional, called with the number of entries
+                                      read so far every 1000 entries.
+
+    Returns:
+        dict: A summary with 'read', 'added', 'duplicates' and 'invalid' counts.
+    """
+    summary = {"read": 0, "added": 0, "duplicates": 0, "invalid": 0}
+    imported = {}
+
+    for list_key, entry in iter_import_file(source_path, key):
+        summary["read"] += 1
+        if progress_callback is not None and summary["read"] % 1000 == 0:
+            progress_callback(summary["read"])
+
+        if isinstance(entry, str):
+            entry = entry.strip()
+        if not entry or not isinstance(entry, (str, dict)):
+            summary["invalid"] += 1
+            continue
+
+        entries = imported.setdefault(list_key, {})
+        entry_key = _entry_key(entry)
+        if entry_key in entries:
+            summary["duplicates"] += 1
+            continue
+        entries[entry_key] = entry
+
+    state, state_key = storage.resolve(file_path)
+    with state.lock:
+        existing_data = state.read(state_key)
+        for list_key, entries in imported.items():
+            app_list = _update_app_list_container(existing_data, list_key)
+            existing = {_entry_key(entry) for entry in app_list}
+            for entry_key, entry in entries.items():
+                if entry_key in existing:
+                    summary["duplicates"] += 1
+                else:
+                    app_list.append(entry)
+                    summary["added"] += 1
+            existing_data[list_key] = app_list
+        if summary["added"]:
+            state.write(state_key, existing_data)
+    logger.info("Imported '%s': %d added, %d duplicates, %d invalid out of %d entries.",
+                source_path, summary['added'], summary['duplicates'], summary['invalid'], summary['read'])
+    return summary
+
+def export_apps(dest_path: str, key: str = None, file_path: str = "productivity.json") -> int:
+    """
+    Exports the app lists from 'productivity.json' to a .txt, .csv or .json file.
+    JSON and CSV exports keep each rule's list and priority and can be imported
+    back as they are. A .txt file holds bare rules, so it can only take one
+    list without priorities.
+
+    Args:
+        dest_path (str): The file to write. The format is chosen from its extension.
+        key (str): Export only this list. Exports both lists when omitted
+                   (not possible for .txt files).
+        file_path (str): The rule file to read. Defaults to 'productivity.json'.
+
+    Returns:
+        int: The number of entries exported.
+    """
+    existing_data = _read_json_file(file_path)
+    keys = [key] if key is not None else list(APP_LIST_KEYS)
+    lists = {list_key: _update_app_list_container(existing_data, list_key) for list_key in keys}
+    extension = os.path.splitext(dest_path)[1].lower()
+
+    if extension == ".json":
+        storage.write_json_atomic(dest_path, lists)
+    elif extension == ".csv":
+        with open(dest_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["category", "rule", "priority"])
+            for list_key, entries in lists.items():
+                for entry in entries:
+                    rule = app_classifier.parse_rule(entry)
+                    writer.writerow([list_key, app_classifier.rule_text(entry), rule[2] if rule else 0])
     else:
-        print("No entertainment apps found to remove.")
+        if key is None:
+            raise ValueError("A text file holds one list; export both lists as .json or .csv.")
+        if any((app_classifier.parse_rule(entry) or (None, None, 0))[2] for entry in lists[key]):
+            raise ValueError("A text file cannot hold rule priorities; export as .json or .csv.")
+        with open(dest_path, 'w', encoding='utf-8', newline='') as f:
+            for entry in lists[key]:
+                f.write(app_classifier.rule_text(entry) + "\n")
 
+    count = sum(len(entries) for entries in lists.values())
+    logger.info("Exported %d entries to '%s'.", count, dest_path)
+    return count
@@ -0,0 +1,63 @@
+import time
+import storage
+import diagnostics
+
+# Points rules per difficulty level. Productive time earns productive_points
+# once every productive_interval seconds; every second of entertainment
+# changes the balance by entertainment_points. The balance never drops below 0.
+DIFFICULTY_TABLE = {
+    "chill": {"productive_points": 1, "productive_interval": 1, "entertainment_points": -1},
+    "medium": {"productive_points": 1, "productive_interval": 5, "entertainment_points": -5},
+    "productive_guru": {"productive_points": 1, "productive_interval": 10, "entertainment_points": -10},
+}
+
+DIFFICULTY_LEVELS = tuple(DIFFICULTY_TABLE)
+
+def difficulty_rules(difficulty):
+    """Returns the rules for a difficulty level; unknown levels use the strictest one."""
+    return DIFFICULTY_TABLE.get(difficulty, DIFFICULTY_TABLE["productive_guru"])
+
+def points_change(category, difficulty, now=None):
+    """
+    Returns the points change for one second of use of an app in category.
+
+    Args:
+        category (str): 'Productive', 'Entertainment' or anything else (no change).
+        difficulty (str): The difficulty level, see DIFFICULTY_TABLE.
+        now (float): The time of the sample. Defaults to time.time().
+    """
+    rules = difficulty_rules(difficulty)
+    if category == "Productive":
+        now = time.time() if now is None else now
+        # Only the first second of each interval earns points
+        if now % rules["productive_interval"] < 1:
+            return rules["productive_points"]
+        return 0
+    if category == "Entertainment":
+        return rules["entertainment_points"]
+    return 0
+
+def score_sample(category, now=None, state=None):
+    """
+    Applies one second of use in category to the stored points balance under
+    the stored difficulty level.
+
+    Returns:
+        tuple: (points_delta, new_points, previous_points), where points_delta
+               is the change actually applied after clamping at 0.
+    """
+    state = state or storage.get_storage()
+
+    # Load current difficulty level (defaults to chill mode if settings not found)
+    difficulty = state.read('settings').get('difficulty_level', 'chill')
+
+    # Load current points
+    previous_points = state.read('points').get('points', 0)
+
+    current_points = max(0, previous_points + points_change(category, difficulty, now))
+    if current_points != previous_points:
+        start = time.perf_counter_ns()
+        state.write('points', {"points": current_points})
+        diagnostics.record_since("persist", start)
+
+    return current_points - previous_points, current_points, previous_points
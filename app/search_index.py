@@ -0,0 +1,105 @@
+import math
+import app_classifier
+
+
+def normalize(text):
+    """Lowercases a rule or app name and strips any 'type:' prefix."""
+    rule = app_classifier.parse_rule(text)
+    pattern = rule[1] if rule is not None else str(text)
+    return pattern.strip().lower()
+
+def trigrams(text):
+    """
+    Returns the set of character trigrams of a normalized string, padded so
+    that short strings and word starts get trigrams too ("ab" -> "  a", " ab", "ab ").
+    """
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Inverted index from trigrams to entries for fuzzy search.
+
+    A query only collects candidates from the postings of its rarest
+    trigrams and scores them with the Dice coefficient of their trigram sets,
+    so cost grows with the number of near matches rather than with the index size.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, entry):
+        return entry in self._entries
+
+    def add(self, entry, kind=""):
+        """Indexes entry (a rule or app name). kind is returned with search results."""
+        if entry in self._entries:
+            self._entries[entry] = (self._entries[entry][0], kind)
+            return
+        grams = trigrams(normalize(entry))
+        self._entries[entry] = (grams, kind)
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(entry)
+
+    def remove(self, entry):
+        indexed = self._entries.pop(entry, None)
+        if indexed is None:
+            return
+        for gram in indexed[0]:
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(entry)
+                if not postings:
+                    del self._postings[gram]
+
+    def search(self, query, limit=10, min_score=0.3, kinds=None):
+        """
+        Returns up to limit (entry, kind, score) tuples sorted by score, where
+        score is the Dice similarity (0-1) between the query and the entry.
+        kinds, when given, keeps only entries of those kinds (before the limit).
+        """
+        if not query.strip():
+            return []
+        query_grams = sorted(trigrams(normalize(query)), key=lambda g: len(self._postings.get(g, ())))
+
+        # Prefix filtering: an entry with Dice >= min_score shares at least
+        # min_overlap trigrams with the query, so it must contain one of the
+        # rarest len - min_overlap + 1 query trigrams. Only those postings
+        # generate candidates; the common trigrams are just checked per candidate.
+        min_overlap = max(1, math.ceil(min_score * len(query_grams) / (2 - min_score)))
+        prefix_length = len(query_grams) - min_overlap + 1
+        overlaps = {}
+        for gram in query_grams[:prefix_length]:
+            for entry in self._postings.get(gram, ()):
+                overlaps[entry] = overlaps.get(entry, 0) + 1
+        for gram in query_grams[prefix_length:]:
+            postings = self._postings.get(gram)
+            if postings:
+                for entry in overlaps:
+                    if entry in postings:
+                        overlaps[entry] += 1
+
+        query_size = len(query_grams)
+        results = []
+        for entry, overlap in overlaps.items():
+            grams, kind = self._entries[entry]
+            if kinds is not None and kind not in kinds:
+                continue
+            score = 2 * overlap / (query_size + len(grams))
+            if score >= min_score:
+                results.append((entry, kind, score))
+        results.sort(key=lambda result: (-result[2], str(result[0])))
+        return results[:limit]
+
+    def similar(self, name, threshold=0.6, kinds=None, limit=5):
+        """
+        Returns existing entries that look like near-duplicates of name,
+        optionally only of some kinds. Entries that are the same once
+        normalized ("YouTube", "exact:youtube") come first with a score of 1.
+        """
+        return self.search(name, limit=limit, min_score=threshold, kinds=kinds)
@@ -0,0 +1,204 @@
+import collections
+from eventlog import ADJUSTMENT_CATEGORIES
+
+SESSION_KINDS = {
+    "Productive": "focus",
+    "Entertainment": "distraction",
+}
+
+# A finished (or in-progress) session. seconds counts sampled seconds, so it
+# can be lower than end - start when short interruptions were merged in.
+Session = collections.namedtuple("Session", "kind start end dominant_app seconds")
+
+
+class _AppCounter:
+    """
+    Misra-Gries summary of the apps seen in a session: at most `size` counters,
+    so the dominant app is found in constant memory however many apps appear.
+    """
+
+    def __init__(self, size=8):
+        self.size = size
+        self.counts = {}
+
+    def add(self, app, seconds=1):
+        counts = self.counts
+        if app in counts or len(counts) < self.size:
+            counts[app] = counts.get(app, 0) + seconds
+            return
+        for other in list(counts):
+            counts[other] -= seconds
+            if counts[other] <= 0:
+                del counts[other]
+
+    def merge(self, other):
+        for app, seconds in other.counts.items():
+            self.add(app, seconds)
+
+    def dominant(self):
+        return max(self.counts, key=self.counts.get) if self.counts else ""
+
+
+class _OpenSession:
+    def __init__(self, kind, timestamp):
+        self.kind = kind
+        self.start = timestamp
+        self.end = timestamp
+        self.seconds = 0
+        self.apps = _AppCounter()
+
+    def add(self, timestamp, app, seconds):
+        self.end = timestamp + seconds
+        self.seconds += seconds
+        if app:
+            self.apps.add(app, seconds)
+
+    def close(self):
+        return Session(self.kind, self.start, self.end, self.apps.dominant(), self.seconds)
+
+
+class Sessionizer:
+    """
+    Turns the per-second sample stream into focus / distraction / neutral
+    sessions in constant memory.
+
+    A run of a different kind shorter than merge_threshold seconds (checking
+    a chat message during a focus session, say) is folded into the surrounding
+    session. A gap in the samples longer than merge_threshold (idle, app
+    closed) always ends the session.
+    """
+
+    def __init__(self, merge_threshold=60, history_size=10):
+        self.merge_threshold = merge_threshold
+        self.recent = collections.deque(maxlen=history_size)
+        self._current = None
+        self._interruption = None
+
+    @property
+    def current(self):
+        """The in-progress session as a Session, or None."""
+        return self._current.close() if self._current is not None else None
+
+    def feed(self, timestamp, app, category, seconds=1):
+        """
+        Adds one sample.
+
+        Returns:
+            list: The Sessions closed by this sample (usually empty).
+        """
+        if category in ADJUSTMENT_CATEGORIES:
+            return []
+        kind = SESSION_KINDS.get(category, "neutral")
+        closed = []
+        current = self._current
+        interruption = self._interruption
+
+        # A long gap in the samples ends everything that is open
+        last_end = interruption.end if interruption is not None else current.end if current is not None else None
+        if last_end is not None and timestamp - last_end > self.merge_threshold:
+            closed.extend(self._close_all())
+            current = interruption = None
+
+        if current is None:
+            current = self._current = _OpenSession(kind, timestamp)
+        elif kind == current.kind:
+            if interruption is not None:
+                # Short interruption is over: merge it into the session
+                current.seconds += interruption.seconds
+                current.apps.merge(interruption.apps)
+                self._interruption = None
+        else:
+            if interruption is None or interruption.kind != kind:
+                if interruption is not None:
+                    # An interruption of a different kind: fold the old one in and restart
+                    current.seconds += interruption.seconds
+                    current.apps.merge(interruption.apps)
+                interruption = self._interruption = _OpenSession(kind, timestamp)
+            interruption.add(timestamp, app, seconds)
+            if interruption.end - interruption.start >= self.merge_threshold:
+                # Long enough to be a session of its own
+                closed.append(self._finish(current))
+                self._current = interruption
+                self._interruption = None
+            return closed
+
+        current.add(timestamp, app, seconds)
+        return closed
+
+    def flush(self):
+        """Closes and returns any open session (e.g. at shutdown)."""
+        return self._close_all()
+
+    def end_at(self, timestamp):
+        """
+        Closes any open session as if the samples had stopped at timestamp,
+        dropping what was fed after it (e.g. when the user turns out to have
+        been away since then). Recent sessions are cut off the same way.
+
+        Returns:
+            list: The Sessions closed, cut off at timestamp.
+        """
+        for name in ("_interruption", "_current"):
+            open_session = getattr(self, name)
+            if open_session is None or open_session.end <= timestamp:
+                continue
+            if open_session.start >= timestamp:
+                setattr(self, name, None)
+                continue
+            open_session.seconds = max(0, open_session.seconds - (open_session.end - timestamp))
+            open_session.end = timestamp
+        # Sessions already closed in the meantime are clipped the same way
+        recent = [session._replace(end=min(session.end, timestamp),
+                                   seconds=max(0, session.seconds - max(0, session.end - timestamp)))
+                  for session in self.recent if session.start < timestamp]
+        self.recent.clear()
+        self.recent.extend(recent)
+        if self._current is None:
+            # Only an interruption is left (or nothing): it becomes the session
+            self._current, self._interruption = self._interruption, None
+        return self._close_all()
+
+    def _finish(self, open_session):
+        session = open_session.close()
+        self.recent.append(session)
+        return session
+
+    def _close_all(self):
+        closed = []
+        if self._current is not None:
+            if self._interruption is not None:
+                self._current.seconds += self._interruption.seconds
+                self._current.apps.merge(self._interruption.apps)
+            closed.append(self._finish(self._current))
+        self._current = self._interruption = None
+        return closed
+
+
+class FocusBonus:
+    """
+    Awards bonus points for sustained focus: `points` for every full
+    `threshold_seconds` of an uninterrupted focus session (25 minutes by default).
+    """
+
+    def __init__(self, threshold_seconds=25 * 60, points=25):
+        self.threshold_seconds = threshold_seconds
+        self.points = points
+        self._session_start = None
+        self._awarded_blocks = 0
+
+    def check(self, session):
+        """
+        Returns the bonus points earned since the last check for the given
+        in-progress session (0 most of the time).
+        """
+        if session is None or session.kind != "focus":
+            return 0
+        if session.start != self._session_start:
+            self._session_start = session.start
+            self._awarded_blocks = 0
+        blocks = (session.end - session.start) // self.threshold_seconds
+        if blocks <= self._awarded_blocks:
+            return 0
+        new_blocks = blocks - self._awarded_blocks
+        self._awarded_blocks = blocks
+        return int(new_blocks * self.points)
@@ -0,0 +1,371 @@
+import os
+import json
+import time
+import zlib
+import shutil
+import struct
+import logging
+import argparse
+import storage
+import history
+import eventlog
+
+logger = logging.getLogger(__name__)
+
+# A snapshot is one file:
+#     MAGIC, format version (u16)
+#     frames: kind (4 bytes), payload length (u32), raw length (u32), CRC-32 of the raw bytes (u32), payload
+# Each payload is a zlib-compressed block. Frames are written and read one
+# at a time, so neither side ever holds more than one block of history.
+#     META  {"format", "created"}
+#     DOC_  {"key", "data"}: one state document (points, settings, productivity, ...)
+#     SMPL / RHRS / RDAY / IDLE  JSON rows of the history tables
+#     FILE  {"name"}: starts an event log file; the DATA frames after it are its bytes
+#     END_  {"frames", "counts"}: the trailer; a snapshot without it is incomplete
+MAGIC = b"GBTWSNAP"
+FORMAT_VERSION = 1
+FILE_SUFFIX = ".gbtw"
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+_HEADER = struct.Struct(">8sH")
+_FRAME = struct.Struct(">4sIII")
+
+# History tables: (frame kind, table, key columns, other columns)
+_TABLES = (
+    (b"RHRS", "rollup_hourly", ("bucket", "app", "category"), ("seconds", "earned", "lost")),
+    (b"RDAY", "rollup_daily", ("day", "app", "category"), ("seconds", "earned", "lost")),
+    (b"IDLE", "idle_spans", ("rowid",), ("start", "end")),
+)
+_SAMPLE_COLUMNS = ("ts", "app", "category", "delta", "balance")
+
+
+# --- Frames ---
+
+def _write_frame(f, kind, raw, level=6):
+    payload = zlib.compress(raw, level)
+    f.write(_FRAME.pack(kind, len(payload), len(raw), zlib.crc32(raw)))
+    f.write(payload)
+
+def _write_json_frame(f, kind, value):
+    _write_frame(f, kind, json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+def iter_frames(f):
+    """
+    Reads the header of an open snapshot and yields its frames as (kind, raw bytes),
+    checking every frame's length and checksum. Raises ValueError on a damaged file.
+    """
+    header = f.read(_HEADER.size)
+    if len(header) != _HEADER.size or header[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a GetB@ck2Work snapshot.")
+    version = _HEADER.unpack(header)[1]
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Snapshot format {version} is newer than this version supports ({FORMAT_VERSION}).")
+
+    number = 0
+    while True:
+        frame = f.read(_FRAME.size)
+        if not frame:
+            return
+        if len(frame) != _FRAME.size:
+            raise ValueError(f"Snapshot is truncated in frame {number}.")
+        kind, payload_size, raw_size, checksum = _FRAME.unpack(frame)
+        if raw_size > MAX_FRAME_BYTES:
+            raise ValueError(f"Frame {number} is larger than {MAX_FRAME_BYTES} bytes.")
+        payload = f.read(payload_size)
+        if len(payload) != payload_size:
+            raise ValueError(f"Snapshot is truncated in frame {number}.")
+        try:
+            decompressor = zlib.decompressobj()
+            raw = decompressor.decompress(payload, raw_size)
+        except zlib.error as e:
+            raise ValueError(f"Frame {number} is corrupted: {e}") from None
+        if len(raw) != raw_size or decompressor.unconsumed_tail or zlib.crc32(raw) != checksum:
+            raise ValueError(f"Frame {number} failed its checksum.")
+        yield kind, raw
+        number += 1
+
+
+# --- Writing ---
+
+def _iter_table(activity, table, key_columns, columns, batch_size):
+    """Streams a history table in key order, batch_size rows at a time (keyset pagination)."""
+    selected = ", ".join(key_columns + columns)
+    order = ", ".join(key_columns)
+    last = None
+    while True:
+        query = f"SELECT {selected} FROM {table}"
+        params = []
+        if last is not None:
+            query += f" WHERE ({order}) > ({', '.join('?' * len(key_columns))})"
+            params.extend(last)
+        with activity.lock:
+            rows = activity.connection.execute(f"{query} ORDER BY {order} LIMIT ?", params + [batch_size]).fetchall()
+        if not rows:
+            return
+        yield rows
+        last = rows[-1][:len(key_columns)]
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _event_log_files(event_log_dir):
+    if not event_log_dir or not os.path.isdir(event_log_dir):
+        return []
+    return sorted(name for name in os.listdir(event_log_dir) if name.endswith(eventlog.FILE_SUFFIX))
+
+def write_snapshot(dest_path, state=None, activity=None, event_log_dir="activity_log",
+                   rows_per_frame=4096, file_block_size=1024 * 1024):
+    """
+    Writes the state documents (points, settings, the rulebook, the
+    unclassified apps), the activity history and the event log to one
+    snapshot file. The file is written next to dest_path first and
+    moved over it once complete.
+
+    Args:
+        dest_path (str): The snapshot file to write.
+        state (Storage): The state documents. Defaults to the process-wide storage.
+        activity (ActivityHistory): The history to include. Defaults to history.open_history().
+        event_log_dir (str): The event log directory, or None to leave the log out.
+        rows_per_frame (int): History rows per compressed frame.
+        file_block_size (int): Event log bytes per compressed frame.
+
+    Returns:
+        dict: The number of documents, rows per table and event log bytes written.
+    """
+    state = state or storage.get_storage()
+    activity = activity or history.open_history()
+    counts = {"documents": 0, "samples": 0, "event_log_bytes": 0}
+    frames = 0
+
+    temp_path = dest_path + ".tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION))
+            _write_json_frame(f, b"META", {"format": FORMAT_VERSION, "created": time.time()})
+            frames += 1
+
+            for key in sorted(set(state.keys()) | set(storage.DEFAULTS)):
+                data = state.read(key)
+                if data:
+                    _write_json_frame(f, b"DOC_", {"key": key, "data": data})
+                    counts["documents"] += 1
+                    frames += 1
+
+            for batch in _batches(activity.iter_samples(batch_size=rows_per_frame), rows_per_frame):
+                _write_json_frame(f, b"SMPL", batch)
+                counts["samples"] += len(batch)
+                frames += 1
+            for kind, table, key_columns, columns in _TABLES:
+                counts[table] = 0
+                for rows in _iter_table(activity, table, key_columns, columns, rows_per_frame):
+                    if table == "idle_spans":
+                        rows = [row[1:] for row in rows]  # rowids are not kept
+                    _write_json_frame(f, kind, rows)
+                    counts[table] += len(rows)
+                    frames += 1
+
+            for name in _event_log_files(event_log_dir):
+                _write_json_frame(f, b"FILE", {"name": name})
+                frames += 1
+                with open(os.path.join(event_log_dir, name), "rb") as log_file:
+                    for block in iter(lambda: log_file.read(file_block_size), b""):
+                        _write_frame(f, b"DATA", block)
+                        counts["event_log_bytes"] += len(block)
+                        frames += 1
+
+            _write_json_frame(f, b"END_", {"frames": frames, "counts": counts})
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, dest_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    logger.info("Wrote snapshot '%s': %s", dest_path, counts)
+    return counts
+
+
+# --- Reading ---
+
+def verify_snapshot(source_path):
+    """
+    Reads a whole snapshot and checks every frame and the trailer.
+
+    Returns:
+        dict: The trailer's counts and the snapshot's creation time.
+    """
+    created = None
+    with open(source_path, "rb") as f:
+        frames = 0
+        for kind, raw in iter_frames(f):
+            if kind == b"META":
+                created = json.loads(raw).get("created")
+            elif kind == b"END_":
+                trailer = json.loads(raw)
+                if trailer["frames"] != frames:
+                    raise ValueError(f"Snapshot has {frames} frames, its trailer expects {trailer['frames']}.")
+                return dict(trailer["counts"], created=created)
+            frames += 1
+    raise ValueError("Snapshot is incomplete: it has no trailer.")
+
+def restore_snapshot(source_path, state=None, activity=None, event_log_dir="activity_log"):
+    """
+    Replaces the current state, history and event log with a snapshot's.
+
+    The history rows go into an open transaction, the event log into a
+    staging directory and the documents into memory while the snapshot is
+    read; nothing is committed or swapped in until every frame and the
+    trailer checked out, so a damaged or truncated snapshot leaves the
+    current data untouched. Documents the snapshot does not have are
+    removed. With the JSON storage backend the documents are renamed into
+    place one file at a time, so a crash during that last step can leave
+    some of them old; the restore can simply be run again. The app should
+    not be running during a restore.
+
+    Args:
+        source_path (str): The snapshot file.
+        state (Storage): Where the documents go. Defaults to the process-wide storage.
+        activity (ActivityHistory): The history to replace. Defaults to history.open_history().
+        event_log_dir (str): The event log directory to replace, or None to skip the log.
+
+    Returns:
+        dict: The snapshot's counts.
+    """
+    state = state or storage.get_storage()
+    activity = activity or history.open_history()
+    activity.flush()
+
+    staging_dir = old_dir = None
+    if event_log_dir:
+        event_log_dir = os.path.abspath(event_log_dir)
+        staging_dir = event_log_dir + ".restore"
+        old_dir = event_log_dir + ".old"
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        os.makedirs(staging_dir)
+    # The documents share the history transaction when both live in one SQLite database
+    shared = getattr(state, "connection", None) is activity.connection
+    documents = {}
+    log_file = None
+
+    with activity.lock:
+        connection = activity.connection
+        connection.execute("BEGIN")
+        try:
+            for table in ("samples",) + tuple(table for _, table, _, _ in _TABLES):
+                connection.execute(f"DELETE FROM {table}")
+
+            with open(source_path, "rb") as f:
+                frames = 0
+                trailer = None
+                for kind, raw in iter_frames(f):
+                    if kind == b"END_":
+                        trailer = json.loads(raw)
+                        break
+                    frames += 1
+                    if kind == b"DOC_":
+                        document = json.loads(raw)
+                        key = document.get("key")
+                        if not storage.valid_key(key) or not isinstance(document.get("data"), dict):
+                            raise ValueError(f"Snapshot contains an unexpected document {key!r}.")
+                        documents[key] = document["data"]
+                    elif kind == b"SMPL":
+                        connection.executemany(
+                            f"INSERT INTO samples ({', '.join(_SAMPLE_COLUMNS)}) VALUES (?, ?, ?, ?, ?)",
+                            json.loads(raw))
+                    elif kind == b"FILE":
+                        name = json.loads(raw)["name"]
+                        if os.path.basename(name) != name or not name.endswith(eventlog.FILE_SUFFIX):
+                            raise ValueError(f"Snapshot contains an unexpected event log file '{name}'.")
+                        if log_file is not None:
+                            log_file.close()
+                        log_file = None
+                        if staging_dir:
+                            log_file = open(os.path.join(staging_dir, name), "wb")
+                    elif kind == b"DATA":
+                        if log_file is not None:
+                            log_file.write(raw)
+                    else:
+                        for table_kind, table, key_columns, columns in _TABLES:
+                            if kind == table_kind:
+                                columns = columns if table == "idle_spans" else key_columns + columns
+                                connection.executemany(
+                                    f"INSERT INTO {table} ({', '.join(columns)}) "
+                                    f"VALUES ({', '.join('?' * len(columns))})",
+                                    json.loads(raw))
+                                break
+                        # Unknown kinds are from a newer writer and are skipped
+                if log_file is not None:
+                    log_file.close()
+                    log_file = None
+                if trailer is None:
+                    raise ValueError("Snapshot is incomplete: it has no trailer.")
+                if trailer["frames"] != frames:
+                    raise ValueError(f"Snapshot has {frames} frames, its trailer expects {trailer['frames']}.")
+
+            # Documents the snapshot lacks are removed; they are put back,
+            # like the event log, if the history can't be committed
+            previous = None if shared else {key: state.read(key) for key in state.keys()}
+            if staging_dir:
+                shutil.rmtree(old_dir, ignore_errors=True)
+                if os.path.isdir(event_log_dir):
+                    os.replace(event_log_dir, old_dir)
+                os.replace(staging_dir, event_log_dir)
+            try:
+                state.replace_all(documents)
+                connection.execute("COMMIT")
+            except BaseException:
+                if previous is not None:
+                    state.replace_all(previous)
+                if staging_dir:
+                    os.replace(event_log_dir, staging_dir)
+                    if os.path.isdir(old_dir):
+                        os.replace(old_dir, event_log_dir)
+                raise
+        except BaseException:
+            if log_file is not None:
+                log_file.close()
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            if staging_dir:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+
+    if old_dir:
+        shutil.rmtree(old_dir, ignore_errors=True)
+    logger.info("Restored snapshot '%s': %s", source_path, trailer["counts"])
+    return trailer["counts"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Back up, restore or migrate GetB@ck2Work data as one snapshot file.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("create", "Write a snapshot of the current data."),
+                            ("restore", "Replace the current data with a snapshot's (close the app first)."),
+                            ("verify", "Check a snapshot's frames and trailer.")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("snapshot", help=f"The snapshot file, e.g. backup{FILE_SUFFIX}.")
+        if name != "verify":
+            command.add_argument("--event-log", default="activity_log", help="The event log directory.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+    try:
+        if args.command == "create":
+            counts = write_snapshot(args.snapshot, event_log_dir=args.event_log)
+        elif args.command == "restore":
+            counts = restore_snapshot(args.snapshot, event_log_dir=args.event_log)
+        else:
+            counts = verify_snapshot(args.snapshot)
+    except ValueError as e:
+        parser.exit(1, f"{args.snapshot}: {e}\n")
+    print(json.dumps(counts, indent=4))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import sys
+import time
+import random
+import argparse
+import linecache
+import tracemalloc
+import storage
+import activity_trace
+import benchmark
+
+DAY_SECONDS = 86400
+
+
+def synthetic_stream(days=3, active_hours=8, seed=0, unique_ratio=0.02, start=None):
+    """
+    Yields TraceSamples for `days` simulated days with `active_hours` of
+    activity each. Apps are used in runs of about a minute, drawn from the
+    same realistic mix as the benchmarks, and a share of runs are one-off
+    window titles that stress every per-name cache.
+    """
+    rng = random.Random(seed)
+    start = start if start is not None else time.time() - days * DAY_SECONDS
+    day_start = start - start % DAY_SECONDS + 9 * 3600
+    # Built up front so the pool itself does not show up as growth in soak()
+    pool = benchmark.app_name_mix(5000, seed, unique_ratio=0)
+
+    def generate():
+        unique = 0
+        for day in range(days):
+            timestamp = day_start + day * DAY_SECONDS
+            end = timestamp + active_hours * 3600
+            while timestamp < end:
+                if rng.random() < unique_ratio:
+                    unique += 1
+                    app_name = f"Untitled {unique} - {rng.choice(pool)}"
+                else:
+                    app_name = rng.choice(pool)
+                for _ in range(min(int(rng.expovariate(1 / 60)) + 1, int(end - timestamp))):
+                    yield activity_trace.TraceSample(timestamp, app_name, None, None)
+                    timestamp += 1
+
+    return generate()
+
+def repeat_trace(samples, days):
+    """Yields a recorded trace over and over, shifted by whole days, until `days` are covered."""
+    samples = list(samples)
+    if not samples:
+        return
+    first = samples[0].timestamp
+    recorded_days = max(1, int((samples[-1].timestamp - first) // DAY_SECONDS) + 1)
+    for repeat in range((days + recorded_days - 1) // recorded_days):
+        shift = repeat * recorded_days * DAY_SECONDS
+        for sample in samples:
+            yield sample._replace(timestamp=sample.timestamp + shift)
+
+
+def _top_sites(snapshot, baseline, limit):
+    sites = []
+    for stat in snapshot.compare_to(baseline, "lineno")[:limit]:
+        frame = stat.traceback[0]
+        sites.append({
+            "site": f"{frame.filename}:{frame.lineno}",
+            "line": linecache.getline(frame.filename, frame.lineno).strip(),
+            "size_diff_bytes": stat.size_diff,
+            "count_diff": stat.count_diff,
+        })
+    return sites
+
+def soak(samples, max_growth_bytes=512 * 1024, warmup_seconds=2 * 3600, snapshot_every=3600,
+         rulebook=None, storage_kind="memory", top=10):
+    """
+    Drives the monitor with samples under tracemalloc and checks that the
+    memory it retains stops growing.
+
+    A baseline snapshot is taken once warmup_seconds of simulated time have
+    passed (caches filled, first batches flushed); after that the traced
+    size is sampled every snapshot_every simulated seconds. The run fails if
+    the final retained size exceeds the baseline by more than max_growth_bytes.
+
+    Returns:
+        dict: ok, tick count, simulated days, baseline/final/peak traced bytes,
+              the sampled sizes and the top allocation sites since the baseline.
+    """
+    filters = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>"))
+    rulebook = rulebook or benchmark.synthetic_rulebook(1000)
+    series = []
+    baseline = None
+    baseline_size = 0
+    ticks = 0
+    first_timestamp = last_timestamp = next_snapshot = None
+
+    tracemalloc.start()
+    try:
+        with activity_trace.replay_environment(rulebook, storage_kind=storage_kind) as replayed:
+            for sample in samples:
+                if first_timestamp is None:
+                    first_timestamp = sample.timestamp
+                    next_snapshot = first_timestamp + warmup_seconds
+                last_timestamp = sample.timestamp
+                app_name = activity_trace.monitor.app_name_from_sample(*sample[1:])
+                if app_name:
+                    replayed.tick(app_name, now=sample.timestamp, window_title=sample.window_title)
+                    ticks += 1
+
+                if sample.timestamp >= next_snapshot:
+                    next_snapshot += snapshot_every
+                    size = tracemalloc.get_traced_memory()[0]
+                    if baseline is None:
+                        baseline = tracemalloc.take_snapshot().filter_traces(filters)
+                        baseline_size = size
+                    series.append({"simulated_seconds": sample.timestamp - first_timestamp, "traced_bytes": size})
+
+            final = tracemalloc.take_snapshot().filter_traces(filters)
+            final_size, peak_size = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    if baseline is None:
+        baseline, baseline_size = final, final_size
+    growth = final_size - baseline_size
+    return {
+        "ok": growth <= max_growth_bytes,
+        "ticks": ticks,
+        "simulated_days": (last_timestamp - first_timestamp) / DAY_SECONDS if ticks else 0,
+        "baseline_bytes": baseline_size,
+        "final_bytes": final_size,
+        "peak_bytes": peak_size,
+        "growth_bytes": growth,
+        "max_growth_bytes": max_growth_bytes,
+        "series": series,
+        "top_sites": _top_sites(final, baseline, top),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Soak-test the GetB@ck2Work monitor for memory growth.")
+    parser.add_argument("--days", type=int, default=3, help="Simulated days to run.")
+    parser.add_argument("--active-hours", type=int, default=8, help="Active hours per simulated day.")
+    parser.add_argument("--trace", default=None, help="Replay this trace (repeated) instead of synthetic activity.")
+    parser.add_argument("--max-growth-kb", type=float, default=512,
+                        help="Fail if retained memory grows by more than this after warm-up.")
+    parser.add_argument("--storage", choices=("memory", "json", "sqlite"), default="memory")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", "-o", default=None, help="Write the report to this JSON file.")
+    args = parser.parse_args(argv)
+
+    if args.trace:
+        samples = repeat_trace(activity_trace.read_trace(args.trace), args.days)
+    else:
+        samples = synthetic_stream(args.days, args.active_hours, args.seed)
+    report = soak(samples, int(args.max_growth_kb * 1024), storage_kind=args.storage)
+
+    print(f"{report['ticks']} ticks over {report['simulated_days']:.1f} simulated days: "
+          f"{report['growth_bytes'] / 1024:+.1f} KiB retained after warm-up "
+          f"(limit {report['max_growth_bytes'] / 1024:.0f} KiB, peak {report['peak_bytes'] / 1024:.0f} KiB)")
+    print("Top allocation sites since warm-up:")
+    for site in report["top_sites"]:
+        print(f"  {site['size_diff_bytes'] / 1024:+9.1f} KiB {site['count_diff']:+7d}  {site['site']}  {site['line']}")
+    if args.output:
+        storage.write_json_atomic(args.output, report)
+        print(f"Report written to '{args.output}'.")
+
+    if not report["ok"]:
+        print("FAILED: memory kept growing.")
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+import logging
+import os
+import re
+import json
+import copy
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Every piece of persistent state lives under one of these keys. With the
+# JSON backend each key is a "<key>.json" file in the working directory.
+DEFAULTS = {
+    "points": {"points": 0},
+    "settings": {"difficulty_level": "chill"},
+    "productivity": {"productivity_app": [], "entertainment_app": []},
+    "unclassified": {"capacity": 64, "total": 0, "items": []},
+}
+
+# What a document key may look like: it becomes a file name with the JSON backend
+KEY_PATTERN = re.compile(r"[A-Za-z0-9_]+")
+
+def valid_key(key):
+    """Returns whether key can name a state document."""
+    return isinstance(key, str) and KEY_PATTERN.fullmatch(key) is not None
+
+def write_json_atomic(file_path, data):
+    """
+    Helper function to write JSON data to a file.
+    The data is written to a temporary file first and then moved over the
+    original, so readers never see a half-written file.
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class Storage:
+    """
+    Interface for reading and writing the app's state documents (points,
+    settings, rulebook). Documents are plain JSON-compatible dicts.
+    """
+
+    def read(self, key):
+        """Returns the document stored under key, or an empty dict if missing or invalid."""
+        raise NotImplementedError
+
+    def write(self, key, data):
+        """Replaces the document stored under key."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Removes the document stored under key, if any."""
+        raise NotImplementedError
+
+    def replace_all(self, documents):
+        """
+        Replaces every document with documents (key -> data), removing keys
+        that are not in it. The SQLite and memory backends make this one
+        change; the JSON backend only guarantees that a failed write changes
+        nothing, as its files are then renamed one at a time.
+        """
+        raise NotImplementedError
+
+    def version(self, key):
+        """Returns a value that changes whenever the document under key changes."""
+        raise NotImplementedError
+
+    def keys(self):
+        """Returns the keys that currently hold a document."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    @property
+    def lock(self):
+        """The re-entrant lock guarding this backend; shared by stores that reuse it."""
+        return self._lock
+
+    def update(self, key, func):
+        """
+        Read-modify-write of one document under the storage lock.
+        func receives the current document and returns the new one.
+        """
+        with self._lock:
+            data = func(self.read(key))
+            self.write(key, data)
+            return data
+
+    def ensure_defaults(self):
+        """Creates any missing state document with its default content."""
+        for key, default in DEFAULTS.items():
+            if not self.read(key):
+                self.write(key, copy.deepcopy(default))
+
+
+class JsonFileStorage(Storage):
+    """Stores each document as '<key>.json' in a directory (the original layout)."""
+
+    def __init__(self, directory="."):
+        self.directory = directory
+        self._lock = threading.RLock()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def read(self, key):
+        file_path = self.path(key)
+        if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                try:
+                    data = json.load(f)
+                except json.JSONDecodeError:
+                    logger.warning("'%s' is corrupted or empty. Starting with an empty JSON object.", file_path)
+                    return {}
+                except Exception as e:
+                    logger.error("Error reading '%s': %s. Starting with an empty JSON object.", file_path, e)
+                    return {}
+            return data if isinstance(data, dict) else {}
+        return {}
+
+    def write(self, key, data):
+        with self._lock:
+            write_json_atomic(self.path(key), data)
+
+    def delete(self, key):
+        with self._lock:
+            if os.path.exists(self.path(key)):
+                os.remove(self.path(key))
+
+    def replace_all(self, documents):
+        # Every document is written to a temporary file first; the renames
+        # only start once they all exist, so a failed write changes nothing.
+        # The renames themselves are one per file: a crash between them (or a
+        # reader running alongside) sees some old and some new documents.
+        with self._lock:
+            staged = []
+            try:
+                for key, data in documents.items():
+                    fd, temp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=self.directory)
+                    staged.append((temp_path, self.path(key)))
+                    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                        json.dump(data, f, indent=4, ensure_ascii=False)
+            except BaseException:
+                for temp_path, _ in staged:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                raise
+            for temp_path, file_path in staged:
+                os.replace(temp_path, file_path)
+            for key in self.keys():
+                if key not in documents:
+                    self.delete(key)
+
+    def version(self, key):
+        try:
+            stat = os.stat(self.path(key))
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def keys(self):
+        return [key for key in DEFAULTS if os.path.exists(self.path(key))]
+
+
+class SQLiteStorage(Storage):
+    """
+    Stores every document in one SQLite database. The connection is shared
+    (see `connection`, `lock` and `transaction`) so other stores such as activity
+    history can live in the same database.
+    """
+
+    def __init__(self, db_path="getbacktowork.db"):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.RLock()
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS state ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " version INTEGER NOT NULL DEFAULT 1)"
+        )
+
+    @contextmanager
+    def transaction(self):
+        """Runs the enclosed statements in one transaction on the shared connection."""
+        with self._lock:
+            self.connection.execute("BEGIN")
+            try:
+                yield self.connection
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+
+    def read(self, key):
+        with self._lock:
+            row = self.connection.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return {}
+        try:
+            data = json.loads(row[0])
+        except json.JSONDecodeError:
+            logger.warning("State '%s' in '%s' is corrupted. Starting with an empty JSON object.", key, self.db_path)
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def write(self, key, data):
+        value = json.dumps(data, ensure_ascii=False)
+        with self._lock:
+            self.connection.execute(
+                "INSERT INTO state (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, version = state.version + 1",
+                (key, value)
+            )
+
+    def delete(self, key):
+        with self._lock:
+            self.connection.execute("DELETE FROM state WHERE key = ?", (key,))
+
+    def replace_all(self, documents):
+        with self._lock:
+            if self.connection.in_transaction:
+                # Part of a larger transaction on the shared connection
+                self._replace_all(documents)
+            else:
+                with self.transaction():
+                    self._replace_all(documents)
+
+    def _replace_all(self, documents):
+        for key in self.keys():
+            if key not in documents:
+                self.delete(key)
+        for key, data in documents.items():
+            self.write(key, data)
+
+    def version(self, key):
+        with self._lock:
+            row = self.connection.execute("SELECT version FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def keys(self):
+        with self._lock:
+            return [row[0] for row in self.connection.execute("SELECT key FROM state")]
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+
+class MemoryStorage(Storage):
+    """Keeps every document in memory. Nothing touches the disk; meant for tests."""
+
+    def __init__(self, initial=None):
+        self._lock = threading.RLock()
+        self._data = {}
+        self._versions = {}
+        for key, data in (initial or {}).items():
+            self.write(key, data)
+
+    def read(self, key):
+        with self._lock:
+            return copy.deepcopy(self._data.get(key, {}))
+
+    def write(self, key, data):
+        with self._lock:
+            self._data[key] = copy.deepcopy(data)
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+    def delete(self, key):
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+    def replace_all(self, documents):
+        with self._lock:
+            for key in list(self._data):
+                if key not in documents:
+                    self.delete(key)
+            for key, data in documents.items():
+                self.write(key, data)
+
+    def version(self, key):
+        return self._versions.get(key)
+
+    def keys(self):
+        with self._lock:
+            return list(self._data)
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+def create_storage(kind=None, path=None):
+    """
+    Creates a storage backend.
+
+    Args:
+        kind (str): 'json', 'sqlite' or 'memory'. Defaults to the GBTW_STORAGE
+                    environment variable, or 'json' if it is not set.
+        path (str): The directory (json) or database file (sqlite) to use.
+                    Defaults to the GBTW_STORAGE_PATH environment variable.
+
+    Returns:
+        Storage: The new storage backend.
+    """
+    kind = (kind or os.environ.get("GBTW_STORAGE", "json")).lower()
+    path = path or os.environ.get("GBTW_STORAGE_PATH")
+    if kind == "sqlite":
+        return SQLiteStorage(path or "getbacktowork.db")
+    if kind == "memory":
+        return MemoryStorage()
+    if kind == "json":
+        return JsonFileStorage(path or ".")
+    raise ValueError(f"Unknown storage backend '{kind}'. Expected 'json', 'sqlite' or 'memory'.")
+
+def get_storage():
+    """Returns the process-wide storage backend, creating it on first use."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = create_storage()
+    return _storage
+
+def set_storage(storage):
+    """Replaces the process-wide storage backend (e.g. with a MemoryStorage in tests)."""
+    global _storage
+    with _storage_lock:
+        _storage = storage
+
+def resolve(file_path):
+    """
+    Maps a legacy file path such as 'points.json' to a (storage, key) pair.
+    Bare file names use the process-wide storage; paths into another
+    directory keep using the JSON file at that location.
+    """
+    key = os.path.splitext(os.path.basename(file_path))[0]
+    directory = os.path.dirname(file_path)
+    if directory:
+        return JsonFileStorage(directory), key
+    return get_storage(), key
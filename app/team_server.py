@@ -0,0 +1,280 @@
+import os
+import json
+import time
+import logging
+import bisect
+import argparse
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import storage
+import history
+import team_sync
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ("today", "all")
+
+
+class TeamAggregator:
+    """
+    Per-user rollups of the batches sent by SyncClients.
+
+    Each user has per-day category totals (seconds, points), plus running
+    (points, productive seconds) totals per day and overall. A batch only
+    updates its sender's totals and moves that one user within the ranked
+    leaderboards, so applying it does not depend on how many users or days
+    there are, and a leaderboard query is a slice. Recent batch ids are
+    remembered per user so a resent batch is only counted once.
+    """
+
+    def __init__(self, clock=time.time, remembered_batches=1000):
+        self.clock = clock
+        self.remembered_batches = remembered_batches
+        self._users = {}
+        self._seen = {}
+        # user -> [points, productive seconds], overall and per day
+        self._totals = {}
+        self._day_totals = {}
+        # period -> sorted [(-points, -productive seconds, user)]
+        self._boards = {period: [] for period in PERIODS}
+        self._board_day = None
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def apply(self, batch):
+        """
+        Adds a batch to its user's rollups.
+
+        Returns:
+            bool: False if the batch was already applied.
+        """
+        user = batch.get("user")
+        batch_id = batch.get("batch_id")
+        days = batch.get("days")
+        if not isinstance(user, str) or not user or not isinstance(batch_id, str) or not isinstance(days, dict):
+            raise ValueError("A batch needs a user, a batch_id and days.")
+
+        # Validated in full before anything is added, so a bad batch changes nothing
+        rows = []
+        for day, categories in days.items():
+            if not isinstance(categories, dict):
+                raise ValueError(f"Day '{day}' has no categories.")
+            for category, (seconds, points) in categories.items():
+                rows.append((str(day), str(category), int(seconds), int(points)))
+
+        with self._lock:
+            seen = self._seen.setdefault(user, (set(), deque()))
+            if batch_id in seen[0]:
+                return False
+            self._roll_day()
+            old_all = self._board_key(user, "all")
+            old_today = self._board_key(user, "today")
+            user_days = self._users.setdefault(user, {})
+            for day, category, seconds, points in rows:
+                totals = user_days.setdefault(day, {}).setdefault(category, [0, 0])
+                totals[0] += seconds
+                totals[1] += points
+                productive = seconds if category == "Productive" else 0
+                for running in (self._totals.setdefault(user, [0, 0]),
+                                self._day_totals.setdefault(user, {}).setdefault(day, [0, 0])):
+                    running[0] += points
+                    running[1] += productive
+            self._move(user, "all", old_all)
+            self._move(user, "today", old_today)
+
+            seen[0].add(batch_id)
+            seen[1].append(batch_id)
+            if len(seen[1]) > self.remembered_batches:
+                seen[0].discard(seen[1].popleft())
+            self.version += 1
+        return True
+
+    def _board_key(self, user, period):
+        """The user's sort key on a leaderboard, or None if they are not on it."""
+        if user not in self._totals:
+            return None
+        if period == "all":
+            totals = self._totals[user]
+        else:
+            # Everyone is on today's board, at 0 until they send something for today
+            totals = self._day_totals.get(user, {}).get(self._board_day, (0, 0))
+        return (-totals[0], -totals[1], user)
+
+    def _move(self, user, period, old_key):
+        board = self._boards[period]
+        if old_key is not None:
+            del board[bisect.bisect_left(board, old_key)]
+        new_key = self._board_key(user, period)
+        if new_key is not None:
+            bisect.insort(board, new_key)
+
+    def _roll_day(self):
+        """Rebuilds the 'today' board from the per-day totals when the day has changed."""
+        today = history.local_day(self.clock())
+        if today == self._board_day:
+            return
+        self._board_day = today
+        self._boards["today"] = sorted(self._board_key(user, "today") for user in self._totals)
+
+    def _rebuild(self):
+        self._totals = {}
+        self._day_totals = {}
+        for user, days in self._users.items():
+            overall = self._totals[user] = [0, 0]
+            for day, categories in days.items():
+                running = self._day_totals.setdefault(user, {})[day] = [0, 0]
+                for category, (seconds, points) in categories.items():
+                    productive = seconds if category == "Productive" else 0
+                    for totals in (overall, running):
+                        totals[0] += points
+                        totals[1] += productive
+        self._boards["all"] = sorted(self._board_key(user, "all") for user in self._totals)
+        self._board_day = None
+        self._roll_day()
+
+    def leaderboard(self, period="today", limit=10):
+        """Returns the top users for a period ('today' or 'all')."""
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period '{period}'. Expected one of {', '.join(PERIODS)}.")
+        with self._lock:
+            # The first query of a new day moves 'today' on
+            self._roll_day()
+            top = self._boards[period][:limit]
+        return [{"user": user, "points": -points, "productive_seconds": -productive}
+                for points, productive, user in top]
+
+    def user(self, name):
+        """Returns a user's per-day category totals."""
+        with self._lock:
+            return json.loads(json.dumps(self._users.get(name, {})))
+
+    # --- Snapshots ---
+
+    def to_dict(self):
+        """Returns a copy of the rollups, safe to serialize while batches keep arriving."""
+        with self._lock:
+            return json.loads(json.dumps({"users": self._users,
+                                          "seen": {user: list(ids) for user, (_, ids) in self._seen.items()}}))
+
+    def load(self, data):
+        with self._lock:
+            self._users = data.get("users", {})
+            self._seen = {user: (set(ids), deque(ids)) for user, ids in data.get("seen", {}).items()}
+            self._rebuild()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "GetBack2WorkTeam/1"
+
+    def _reply(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if urlparse(self.path).path != team_sync.BATCH_PATH:
+            return self._reply(404, {"error": "not found"})
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > self.server.max_request_bytes:
+            return self._reply(413 if length > 0 else 400, {"error": "bad request size"})
+        body = self.rfile.read(length)
+        try:
+            if self.headers.get("Content-Encoding", "").lower() == "deflate":
+                batch = team_sync.decode_batch(body, self.server.max_request_bytes * 16)
+            else:
+                batch = json.loads(body.decode("utf-8"))
+            applied = self.server.aggregator.apply(batch)
+        except (ValueError, TypeError, AttributeError) as e:
+            return self._reply(400, {"error": str(e)})
+        self._reply(200, {"ok": True, "duplicate": not applied})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == team_sync.LEADERBOARD_PATH:
+            try:
+                period = query.get("period", ["today"])[0]
+                limit = max(1, min(int(query.get("limit", ["10"])[0]), 1000))
+                leaders = self.server.aggregator.leaderboard(period, limit)
+            except ValueError as e:
+                return self._reply(400, {"error": str(e)})
+            return self._reply(200, {"period": period, "leaders": leaders})
+        if url.path.startswith("/v1/users/"):
+            return self._reply(200, {"days": self.server.aggregator.user(url.path[len("/v1/users/"):])})
+        self._reply(404, {"error": "not found"})
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class TeamServer(ThreadingHTTPServer):
+    """
+    The reference aggregation service: an HTTP server around a
+    TeamAggregator that snapshots it to a JSON file every snapshot_interval
+    seconds (when it changed) and on shutdown, and reloads it on start.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 8765), snapshot_path="team_state.json", snapshot_interval=60,
+                 max_request_bytes=256 * 1024, aggregator=None):
+        super().__init__(address, _Handler)
+        self.aggregator = aggregator or TeamAggregator()
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.max_request_bytes = max_request_bytes
+        self._snapshot_version = 0
+        self._stop = threading.Event()
+        if snapshot_path and os.path.exists(snapshot_path):
+            with open(snapshot_path, "r", encoding="utf-8") as f:
+                self.aggregator.load(json.load(f))
+            logger.info("Loaded team state from '%s'.", snapshot_path)
+        self._snapshot_thread = threading.Thread(target=self._snapshot_loop, name="team-snapshot", daemon=True)
+        self._snapshot_thread.start()
+
+    def snapshot(self):
+        """Writes the rollups to snapshot_path if they changed since the last snapshot."""
+        version = self.aggregator.version
+        if not self.snapshot_path or version == self._snapshot_version:
+            return
+        storage.write_json_atomic(self.snapshot_path, self.aggregator.to_dict())
+        self._snapshot_version = version
+
+    def _snapshot_loop(self):
+        while not self._stop.wait(self.snapshot_interval):
+            try:
+                self.snapshot()
+            except Exception:
+                logger.exception("Could not write team snapshot")
+
+    def server_close(self):
+        self._stop.set()
+        self.snapshot()
+        super().server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the GetB@ck2Work team aggregation server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--snapshot", default="team_state.json", help="Where rollups are saved between runs.")
+    parser.add_argument("--snapshot-interval", type=float, default=60)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+    server = TeamServer((args.host, args.port), args.snapshot, args.snapshot_interval)
+    logger.info("Serving on http://%s:%d", args.host, server.server_address[1])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
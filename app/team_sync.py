@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import uuid
+import zlib
+import random
+import logging
+import argparse
+import threading
+import urllib.error
+import urllib.request
+import history
+from eventlog import ADJUSTMENT_CATEGORIES
+
+logger = logging.getLogger(__name__)
+
+# A batch is a zlib-compressed JSON document:
+#     {"user": "alice", "batch_id": "<hex>", "created": <unix seconds>,
+#      "days": {"YYYY-MM-DD": {"<category>": [<seconds>, <points delta>], ...}, ...}}
+# Batches are spooled to disk before they are sent and deleted once the
+# server accepted them; the server ignores batch_ids it has already applied,
+# so a batch resent after a lost response is not counted twice.
+BATCH_SUFFIX = ".json.z"
+BATCH_PATH = "/v1/batches"
+LEADERBOARD_PATH = "/v1/leaderboard"
+
+
+def encode_batch(batch):
+    return zlib.compress(json.dumps(batch, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+def decode_batch(data, max_size=1024 * 1024):
+    """Decompresses and parses a batch, refusing ones that inflate to more than max_size bytes."""
+    decompressor = zlib.decompressobj()
+    try:
+        raw = decompressor.decompress(data, max_size)
+    except zlib.error as e:
+        raise ValueError(f"Batch is not zlib data: {e}") from None
+    if decompressor.unconsumed_tail:
+        raise ValueError(f"Batch is larger than {max_size} bytes.")
+    return json.loads(raw.decode("utf-8"))
+
+
+class SyncClient:
+    """
+    Collects this machine's points and activity for a team leaderboard and
+    sends it to an aggregation server (see team_server.py).
+
+    add() only updates per-day, per-category totals in memory. Every
+    interval seconds the totals become a batch in the spool directory, and
+    all spooled batches are uploaded oldest first. While the server cannot
+    be reached uploads back off exponentially (with jitter) up to
+    max_backoff seconds; batches keep accumulating in the spool meanwhile.
+    """
+
+    def __init__(self, server_url, user, spool_dir="sync_spool", interval=60, max_backoff=900,
+                 max_spooled=10000, timeout=10, clock=time.time):
+        """
+        Args:
+            server_url (str): Base URL of the aggregation server, e.g. "http://127.0.0.1:8765".
+            user (str): The name this machine reports under.
+            spool_dir (str): Where batches wait until the server accepts them.
+            interval (float): Seconds between batches.
+            max_backoff (float): Longest wait between retries while the server is down.
+            max_spooled (int): Batches kept while offline; the oldest are dropped beyond it.
+            timeout (float): Seconds to wait for the server per request.
+            clock (callable): Returns the current unix time.
+        """
+        self.server_url = server_url.rstrip("/")
+        self.user = user
+        self.spool_dir = spool_dir
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.max_spooled = max_spooled
+        self.timeout = timeout
+        self.clock = clock
+        self._days = {}
+        self._lock = threading.Lock()
+        self._upload_lock = threading.Lock()
+        self._failures = 0
+        self._next_attempt = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"sync.batches": 0, "sync.uploaded": 0, "sync.failed": 0, "sync.dropped": 0}
+        os.makedirs(spool_dir, exist_ok=True)
+
+    def add(self, timestamp, category, points_delta):
+        """Counts one recorded sample or points adjustment."""
+        seconds = 0 if category in ADJUSTMENT_CATEGORIES else 1
+        day = history.local_day(timestamp)
+        with self._lock:
+            totals = self._days.setdefault(day, {}).setdefault(category, [0, 0])
+            totals[0] += seconds
+            totals[1] += int(points_delta)
+
+    # --- Spooling ---
+
+    def _spooled(self):
+        return sorted(name for name in os.listdir(self.spool_dir) if name.endswith(BATCH_SUFFIX))
+
+    def spool(self):
+        """Turns the totals collected so far into a batch file. Returns its path, or None if there was nothing."""
+        with self._lock:
+            days, self._days = self._days, {}
+        if not days:
+            return None
+
+        batch = {"user": self.user, "batch_id": uuid.uuid4().hex, "created": self.clock(), "days": days}
+        # Time-ordered names, so uploads go oldest first
+        path = os.path.join(self.spool_dir, f"{time.time_ns():020d}-{batch['batch_id']}{BATCH_SUFFIX}")
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(encode_batch(batch))
+        os.replace(temp_path, path)
+        self.stats["sync.batches"] += 1
+
+        spooled = self._spooled()
+        for name in spooled[:max(0, len(spooled) - self.max_spooled)]:
+            os.remove(os.path.join(self.spool_dir, name))
+            self.stats["sync.dropped"] += 1
+            logger.warning("Sync spool is full; dropped the oldest batch '%s'.", name)
+        return path
+
+    # --- Uploading ---
+
+    def _post(self, data):
+        request = urllib.request.Request(
+            self.server_url + BATCH_PATH, data=data, method="POST",
+            headers={"Content-Type": "application/json", "Content-Encoding": "deflate"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return response.status
+
+    def upload(self):
+        """
+        Sends spooled batches oldest first until one fails.
+
+        Returns:
+            bool: True if the spool was emptied.
+        """
+        with self._upload_lock:
+            for name in self._spooled():
+                path = os.path.join(self.spool_dir, name)
+                with open(path, "rb") as f:
+                    data = f.read()
+                try:
+                    self._post(data)
+                except urllib.error.HTTPError as e:
+                    if 400 <= e.code < 500 and e.code not in (408, 429):
+                        # The server will never take this batch; keeping it would block the rest
+                        logger.error("Sync server rejected batch '%s' (HTTP %d); dropping it.", name, e.code)
+                        os.remove(path)
+                        self.stats["sync.dropped"] += 1
+                        continue
+                    self._failed(e)
+                    return False
+                except (urllib.error.URLError, OSError) as e:
+                    self._failed(e)
+                    return False
+                os.remove(path)
+                self.stats["sync.uploaded"] += 1
+            self._failures = 0
+            self._next_attempt = 0
+            return True
+
+    def _failed(self, error):
+        self._failures += 1
+        self.stats["sync.failed"] += 1
+        delay = min(self.max_backoff, self.interval * 2 ** (self._failures - 1))
+        delay *= random.uniform(0.5, 1.0)
+        self._next_attempt = time.monotonic() + delay
+        logger.warning("Sync server unreachable (%s); %d batches spooled, retrying in %.0f s.",
+                       error, len(self._spooled()), delay)
+
+    def sync(self):
+        """Spools the current totals and uploads the spool unless a retry is not due yet."""
+        self.spool()
+        if time.monotonic() >= self._next_attempt:
+            self.upload()
+
+    # --- Background thread ---
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="team-sync", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sync()
+            except Exception:
+                logger.exception("Team sync failed")
+
+    def close(self):
+        """Stops the background thread and spools what was collected; it is sent on the next start."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout + 1)
+            self._thread = None
+        self.spool()
+
+
+def create_client(settings, **kwargs):
+    """
+    Returns a SyncClient for the "team_sync" settings, or None when syncing
+    is not configured. Example settings:
+        "team_sync": {"server": "http://127.0.0.1:8765", "user": "alice", "interval": 60}
+    """
+    config = settings.get("team_sync") or {}
+    if not config.get("server") or not config.get("user"):
+        return None
+    return SyncClient(config["server"], config["user"], interval=config.get("interval", 60), **kwargs)
+
+def fetch_leaderboard(server_url, period="today", limit=10, timeout=10):
+    """Returns the server's leaderboard: a list of {"user", "points", "productive_seconds"} dicts."""
+    url = f"{server_url.rstrip('/')}{LEADERBOARD_PATH}?period={period}&limit={int(limit)}"
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.loads(response.read().decode("utf-8"))["leaders"]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the GetB@ck2Work team leaderboard.")
+    parser.add_argument("--server", default="http://127.0.0.1:8765")
+    parser.add_argument("--period", choices=("today", "all"), default="today")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    for rank, leader in enumerate(fetch_leaderboard(args.server, args.period, args.limit), start=1):
+        hours, minutes = divmod(leader["productive_seconds"] // 60, 60)
+        print(f"{rank:>3}. {leader['user']:<20}{leader['points']:>8} points  {hours}h {minutes:02d}m productive")
+
+if __name__ == "__main__":
+    main()
@@ -1,108 +1,94 @@
-import win32gui
-import win32process
-import psutil
 import app_classifier
-import json
+import scoring
+import monitor
 import blocker
+import backends
 import tkinter as tk
-import pywinauto.application
 import time
+import diagnostics
 
-def get_active_app():
-    handle = win32gui.GetForegroundWindow()
-    _,pid = win32process.GetWindowThreadProcessId(handle)
+def get_foreground_sample():
+    """
+    Returns (process_name, window_title, url) for the foreground window, or
+    None if there is none or its process is gone. url is only looked up for Chrome.
+    """
+    backend = backends.get_backend()
+    start = time.perf_counter_ns()
+    foreground = backend.foreground_window()
+    process_name = backend.process_name(foreground[1]) if foreground is not None else None
+    diagnostics.record_since("foreground", start)
+
+    if process_name is None:
+        return None
+    handle, pid = foreground
+    window_title = backend.window_title(handle)
+    url = _get_chrome_url(pid) if process_name == "chrome.exe" else None
+    return process_name, window_title, url
 
-    for process in psutil.process_iter(['pid', 'name']):
-        if process.info['pid'] == pid:
-            process_name = process.info['name']
-            if process_name == "chrome.exe":
-                return get_current_tab_name()
-            return process_name
+def get_active_app():
+    sample = get_foreground_sample()
+    if sample is None:
+        return None
+    return monitor.app_name_from_sample(*sample)
         
-def check_app(app_name):
-    category = app_classifier.classify_app(app_name)
-    
-    # Load current difficulty level
-    try:
-        with open('settings.json', 'r') as f:
-            settings = json.load(f)
-            difficulty = settings.get('difficulty_level', 'chill')
-    except (FileNotFoundError, json.JSONDecodeError):
-        difficulty = 'chill'  # Default to chill mode if settings not found
-    
-    # Load current points
-    with open('points.json', 'r') as file:
-        data = json.load(file)
-        current_points = data.get('points', 0)
+def check_app(app_name, window_title=None):
+    category, _ = score_app(app_name, window_title)
+    return category
 
-    # Calculate points based on difficulty level
-    if category == "Productive":
-        if difficulty == "chill":
-            points_change = 1  # 1 point per second
-        elif difficulty == "medium":
-            # Add 1 point every 5 seconds
-            if time.time() % 5 < 1:  # Check if we're in the first second of each 5-second interval
-                points_change = 1
-            else:
-                points_change = 0
-        else:  # productive_guru
-            # Add 1 point every 10 seconds
-            if time.time() % 10 < 1:  # Check if we're in the first second of each 10-second interval
-                points_change = 1
-            else:
-                points_change = 0
-        current_points += points_change
-    elif category == "Entertainment":
-        if difficulty == "chill":
-            points_change = -1  # No point deduction in chill mode
-        elif difficulty == "medium":
-            points_change = -5  # -5 points per second
-        else:  # productive_guru
-            points_change = -10  # -10 points per second
+def show_blocker():
+    blocker.show_popup("Reminder!", "GET BACK TO WORKK!!")
 
-        if current_points <= 0:
-            blocker.show_popup("Reminder!", "GET BACK TO WORKK!!")
-        current_points = max(0, current_points + points_change)  # Ensure points don't go below 0
+def score_app(app_name, window_title=None):
+    """
+    Classifies app_name (and its window title, if given), applies the points change for one second of use under
+    the current difficulty level and saves the new balance.
 
-    # Save updated points
-    with open('points.json', 'w') as file:
-        json.dump({"points": current_points}, file, indent=2)
-    
-    return category
+    Returns:
+        tuple: (category, points_delta) where points_delta is the change actually
+               applied to the stored balance.
+    """
+    start = time.perf_counter_ns()
+    category = app_classifier.classify_app(app_name, window_title=window_title)
+    diagnostics.record_since("classify", start)
 
-def get_current_tab_name():
+    start = time.perf_counter_ns()
+    points_delta, _, previous_points = scoring.score_sample(category)
+    diagnostics.record_since("score", start)
 
-    try:
-        foregroundApp = win32gui.GetForegroundWindow()
-        TID, PID = win32process.GetWindowThreadProcessId(foregroundApp)
-        chromeApp = pywinauto.application.Application(backend = "uia").connect(process = PID) # Connects to active Chrome
-        topWindow = chromeApp.top_window() 
-        url = topWindow.child_window(title = "Address and search bar", control_type = "Edit").get_value() # URL is here
+    if category == "Entertainment" and previous_points <= 0:
+        show_blocker()
 
-        tabName = url.split("/")[0].split(".")[-2].capitalize()
+    return category, points_delta
 
+def _get_chrome_url(pid):
+    """Reads the address bar of the Chrome window owned by pid, or returns None."""
+    start = time.perf_counter_ns()
+    try:
+        url = backends.get_backend().browser_url(pid)
     except Exception:
-        tabName = "URL not detected"
+        url = None
+        diagnostics.count("chrome_scrape.failed")
 
-    return tabName
+    diagnostics.record_since("chrome_scrape", start)
+    return url
+
+def get_current_tab_name():
+    foreground = backends.get_backend().foreground_window()
+    return monitor.tab_name_from_url(_get_chrome_url(foreground[1]) if foreground is not None else None)
 
 def get_all_app_list():
+    """Returns the names of the processes owning a visible window, in window order."""
+    backend = backends.get_backend()
     app_list = []
     ignored_list = ["TextInputHost.exe", "explorer.exe"]
-    for process in psutil.process_iter(['pid', 'name']):
-        pid = process.info['pid']
-
-        def enumWindowsArguments(handle, __):
-            _, foundPID = win32process.GetWindowThreadProcessId(handle)
-
-            if foundPID == pid and win32gui.IsWindowVisible(handle):
-                process_name = process.info["name"]
-                if process_name and (process_name not in ignored_list):
-                    app_name = process_name # Get all active app name
-                    if app_name not in app_list:
-                        app_list.append(app_name)
-
-        win32gui.EnumWindows(enumWindowsArguments, None)
+    names = {}
+    for _, pid in backend.visible_windows():
+        if pid in names:
+            continue
+        # Looked up once per process rather than once per (process, window) pair
+        process_name = names[pid] = backend.process_name(pid)
+        if process_name and (process_name not in ignored_list) and process_name not in app_list:
+            app_list.append(process_name) # Get all active app name
     return app_list
 
 if __name__ == "__main__":
@@ -0,0 +1,208 @@
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class _Timer:
+    __slots__ = ("due", "callback", "interval", "cancelled")
+
+    def __init__(self, due, callback, interval=None):
+        self.due = due
+        self.callback = callback
+        self.interval = interval
+        self.cancelled = False
+
+
+class FrameScheduler:
+    """
+    Runs all UI timers, animations and callbacks posted from worker threads
+    from a single Tk after() loop.
+
+    Each frame runs posted callbacks and due timers until frame_budget is
+    used up; whatever is left waits for the next frame, so a burst of work
+    cannot freeze the window. Repeating timers and animations never queue
+    up missed runs: when the loop falls behind they skip to the current
+    frame. While nothing is pending the loop wakes only every idle_interval,
+    to pick up callbacks posted from worker threads; work scheduled from the
+    UI thread wakes it at once.
+    """
+
+    def __init__(self, widget, frame_interval=0.016, frame_budget=0.008, idle_interval=0.5):
+        """
+        Args:
+            widget: The Tk widget whose after() drives the loop.
+            frame_interval (float): Seconds between frames while work is pending.
+            frame_budget (float): Seconds of work run per frame before yielding to Tk.
+            idle_interval (float): Seconds between frames while nothing is pending.
+        """
+        self.widget = widget
+        self.frame_interval = frame_interval
+        self.frame_budget = frame_budget
+        self.idle_interval = idle_interval
+        self._posted = deque()
+        self._keyed = {}
+        self._timers = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._after_id = None
+        self._idle = False
+        self._ui_thread = None
+        self._stats = {"ui.frames": 0, "ui.over_budget": 0, "ui.dropped_frames": 0, "ui.coalesced": 0}
+
+    # --- Scheduling (any thread) ---
+
+    def call_soon(self, callback, key=None):
+        """
+        Runs callback on the UI thread in the next frame. With a key, a
+        callback still waiting under the same key is replaced instead of
+        queuing another one, e.g. for a label refreshed every second.
+        """
+        if key is None:
+            self._posted.append((None, callback))
+        else:
+            with self._lock:
+                if key in self._keyed:
+                    self._stats["ui.coalesced"] += 1
+                else:
+                    self._posted.append((key, None))
+                self._keyed[key] = callback
+        self._wake()
+
+    def call_later(self, delay, callback):
+        """Runs callback once, delay seconds from now. Returns a handle for cancel()."""
+        return self._add_timer(_Timer(time.monotonic() + delay, callback))
+
+    def every(self, interval, callback, first_delay=None):
+        """Runs callback every interval seconds; runs missed while behind are skipped. Returns a handle."""
+        first_delay = interval if first_delay is None else first_delay
+        return self._add_timer(_Timer(time.monotonic() + first_delay, callback, interval))
+
+    def animate(self, frames, interval, on_frame, on_done=None):
+        """
+        Calls on_frame(index) for index 0..frames-1, one every interval seconds,
+        then on_done(). Frames whose time has already passed when the loop gets
+        to them are dropped, so a slow frame shortens the animation instead of
+        delaying everything after it. Returns a handle for cancel().
+        """
+        start = time.monotonic()
+        state = {"last": -1}
+
+        def step():
+            index = int((time.monotonic() - start) / interval)
+            if index > state["last"] + 1:
+                self._stats["ui.dropped_frames"] += min(index, frames) - state["last"] - 1
+            state["last"] = index
+            if index >= frames:
+                timer.cancelled = True
+                if on_done is not None:
+                    on_done()
+                return
+            on_frame(index)
+            timer.due = start + (index + 1) * interval
+
+        timer = _Timer(start, step, interval)
+        return self._add_timer(timer)
+
+    def cancel(self, handle):
+        """Cancels a timer or animation; it is dropped the next time it comes up."""
+        if handle is not None:
+            handle.cancelled = True
+
+    def _add_timer(self, timer):
+        with self._lock:
+            heapq.heappush(self._timers, (timer.due, next(self._sequence), timer))
+        self._wake()
+        return timer
+
+    def _wake(self):
+        """Brings an idle loop forward when called on the UI thread."""
+        # Tk calls from other threads block until the UI thread serves them,
+        # so their posts wait for the idle wake-up instead
+        if self._idle and threading.current_thread() is self._ui_thread:
+            self._idle = False
+            self.widget.after_cancel(self._after_id)
+            self._after_id = self.widget.after(0, self._frame)
+
+    # --- The frame loop (UI thread) ---
+
+    def start(self):
+        if self._after_id is None:
+            self._ui_thread = threading.current_thread()
+            self._after_id = self.widget.after(0, self._frame)
+        return self
+
+    def stop(self):
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+        self._idle = False
+
+    def stats(self):
+        """Returns frame, dropped-frame and coalescing counters for the diagnostics."""
+        stats = dict(self._stats)
+        stats["ui.pending"] = len(self._posted) + len(self._timers)
+        return stats
+
+    def _frame(self):
+        self._after_id = None
+        self._idle = False
+        self._stats["ui.frames"] += 1
+        deadline = time.monotonic() + self.frame_budget
+        try:
+            self._run_posted(deadline)
+            self._run_timers(deadline)
+        finally:
+            now = time.monotonic()
+            if now > deadline:
+                self._stats["ui.over_budget"] += 1
+            with self._lock:
+                next_due = self._timers[0][0] if self._timers else None
+            if self._posted or (next_due is not None and next_due <= now):
+                # Work left over: let Tk redraw and handle input first
+                delay = self.frame_interval
+            elif next_due is None:
+                delay = self.idle_interval
+            else:
+                delay = min(self.idle_interval, next_due - now)
+            self._idle = delay > self.frame_interval
+            self._after_id = self.widget.after(math.ceil(delay * 1000), self._frame)
+
+    def _run_posted(self, deadline):
+        posted = self._posted
+        # Only what was posted before this frame started; new posts wait for the next
+        for _ in range(len(posted)):
+            if time.monotonic() >= deadline:
+                return
+            key, callback = posted.popleft()
+            if key is not None:
+                with self._lock:
+                    callback = self._keyed.pop(key)
+            self._run(callback)
+
+    def _run_timers(self, deadline):
+        now = time.monotonic()
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not self._timers or self._timers[0][0] > now:
+                    return
+                _, _, timer = heapq.heappop(self._timers)
+            if timer.cancelled:
+                continue
+            self._run(timer.callback)
+            if timer.interval is not None and not timer.cancelled:
+                # Next run from now (animations set their own due time): missed runs are not made up
+                if timer.due <= now:
+                    timer.due = now + timer.interval
+                self._add_timer(timer)
+
+    def _run(self, callback):
+        try:
+            callback()
+        except Exception:
+            logger.exception("UI callback %r failed", callback)
@@ -0,0 +1,17 @@
+import os
+import sys
+import pytest
+
+# The app modules import each other by bare name (e.g. "import storage")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+import storage
+
+
+@pytest.fixture
+def rulebook():
+    """Swaps in a MemoryStorage as the process-wide storage for one test."""
+    previous = storage._storage
+    state = storage.MemoryStorage()
+    storage.set_storage(state)
+    yield state
+    storage.set_storage(previous)
@@ -0,0 +1,26 @@
+import app_classifier
+
+
+def test_regex_rule_with_global_flags_does_not_break_other_rules(rulebook):
+    rulebook.write("productivity", {"productivity_app": ["regex:(?i)foo.*", "regex:^bar$"],
+                                    "entertainment_app": ["youtube"]})
+
+    assert app_classifier.classify_app("FooEditor") == "Productive"
+    assert app_classifier.classify_app("bar") == "Productive"
+    assert app_classifier.classify_app("youtube.com") == "Entertainment"
+
+
+def test_regex_rule_with_backreference_keeps_its_group_numbers(rulebook):
+    rulebook.write("productivity", {"productivity_app": ["regex:(a)x", "regex:(b)\\1"],
+                                    "entertainment_app": []})
+
+    assert app_classifier.classify_app("bb") == "Productive"
+    assert app_classifier.classify_app("ax") == "Productive"
+    assert app_classifier.classify_app("ba") == "Unclassified"
+
+
+def test_regex_rules_sharing_a_group_name_are_compiled_separately():
+    matcher = app_classifier.RuleMatcher({"productivity_app": ["regex:(?P<x>ab)", "regex:(?P<x>cd)"]})
+
+    assert matcher.classify("ab") == "Productive"
+    assert matcher.classify("cd") == "Productive"
@@ -0,0 +1,20 @@
+import random
+import pytest
+import chart
+
+
+@pytest.mark.parametrize("length, threshold", [(10, 5), (1000, 100), (12345, 1000), (5, 10)])
+def test_lttb_stream_matches_lttb(length, threshold):
+    rng = random.Random(length)
+    points = [(index, rng.random() * 100) for index in range(length)]
+
+    assert chart.lttb_stream(iter(points), length, threshold) == chart.lttb(points, threshold)
+
+
+def test_lttb_stream_tolerates_a_short_stream():
+    points = [(index, index % 7) for index in range(500)]
+
+    sampled = chart.lttb_stream(iter(points), 1000, 100)
+
+    assert sampled[0] == points[0] and sampled[-1] == points[-1]
+    assert sampled == sorted(sampled)
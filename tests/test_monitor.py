@@ -0,0 +1,33 @@
+import json
+import sqlite3
+import time
+import storage
+import history
+import monitor
+
+
+class _EventLog:
+    def append(self, *args):
+        pass
+
+
+def test_begin_idle_takes_back_a_span_longer_than_an_hour(tmp_path):
+    rules = tmp_path / "productivity.json"
+    rules.write_text(json.dumps({"productivity_app": ["code.exe"], "entertainment_app": []}))
+    state = storage.MemoryStorage({"points": {"points": 0}})
+    activity = history.ActivityHistory(sqlite3.connect(":memory:", isolation_level=None, check_same_thread=False))
+    tracker = monitor.Monitor(_EventLog(), activity, state=state, categories_file_path=str(rules))
+
+    start = int(time.time()) - 3 * 3600
+    since = start + 600
+    for second in range(600):
+        balance_at_since = tracker.tick("code.exe", now=start + second).points
+    for second in range(600, 600 + 2 * 3600):
+        tracker.tick("code.exe", now=start + second)
+
+    balance = tracker.begin_idle(since, now=start + 600 + 2 * 3600)
+
+    assert balance == balance_at_since
+    assert state.read("points")["points"] == balance_at_since
+    assert tracker.dwell.app_seconds["code.exe"] == 600
+    assert [category for ts, _, category, _, _ in activity.iter_samples(start=since)] == ["Rescore"]
@@ -0,0 +1,37 @@
+import pytest
+import save_app
+
+
+@pytest.mark.parametrize("extension", [".csv", ".json"])
+def test_export_and_import_keep_lists_and_priorities(rulebook, tmp_path, extension):
+    lists = {"productivity_app": ["code", "regex:^x$", {"type": "glob", "pattern": "vs*", "priority": 5}],
+             "entertainment_app": ["youtube"]}
+    rulebook.write("productivity", lists)
+    path = str(tmp_path / f"rules{extension}")
+    save_app.export_apps(path)
+
+    rulebook.write("productivity", {"productivity_app": [], "entertainment_app": []})
+    summary = save_app.import_apps(path, "productivity_app")
+
+    assert summary["added"] == 4
+    assert rulebook.read("productivity") == lists
+
+
+def test_text_export_refuses_to_merge_lists(rulebook, tmp_path):
+    rulebook.write("productivity", {"productivity_app": ["code"], "entertainment_app": ["youtube"]})
+
+    with pytest.raises(ValueError):
+        save_app.export_apps(str(tmp_path / "rules.txt"))
+
+
+def test_text_import_keeps_hashes_inside_names(rulebook, tmp_path):
+    path = tmp_path / "rules.txt"
+    path.write_text("# blocked sites\n"
+                    "mail.example.com/#inbox\n"
+                    "regex:^a#b$  # not part of the rule\n"
+                    "0.0.0.0 ads.example.com #tracker\n")
+
+    save_app.import_apps(str(path), "entertainment_app")
+
+    assert rulebook.read("productivity")["entertainment_app"] == ["mail.example.com/#inbox", "regex:^a#b$",
+                                                                  "ads.example.com"]
@@ -0,0 +1,38 @@
+import search_index
+
+
+def make_index():
+    index = search_index.TrigramIndex()
+    index.add("youtube", "entertainment")
+    index.add("code", "productivity")
+    index.add("Code.exe", "seen")
+    return index
+
+
+def test_case_variant_is_reported_as_duplicate():
+    similar = make_index().similar("YouTube", kinds=("productivity", "entertainment"))
+
+    assert similar[0] == ("youtube", "entertainment", 1.0)
+
+
+def test_typed_prefix_variant_is_reported_as_duplicate():
+    similar = make_index().similar("exact:youtube")
+
+    assert ("youtube", "entertainment", 1.0) in similar
+
+
+def test_similar_filters_by_kind():
+    similar = make_index().similar("code", kinds=("seen",), threshold=0.3)
+
+    assert [entry for entry, _, _ in similar] == ["Code.exe"]
+
+
+
+def test_kind_filter_applies_before_the_limit():
+    index = make_index()
+    for number in range(20):
+        index.add(f"code.exe{number}", "seen")
+
+    similar = index.similar("code.exe", kinds=("productivity",), threshold=0.3)
+
+    assert [entry for entry, _, _ in similar] == ["code"]
@@ -0,0 +1,28 @@
+import sqlite3
+import storage
+import history
+import snapshot
+
+
+def _history():
+    return history.ActivityHistory(sqlite3.connect(":memory:", isolation_level=None, check_same_thread=False))
+
+
+def test_json_store_round_trip_keeps_unclassified_and_drops_extra_documents(tmp_path):
+    (tmp_path / "source").mkdir()
+    source = storage.JsonFileStorage(str(tmp_path / "source"))
+    source.write("points", {"points": 5})
+    source.write("unclassified", {"capacity": 64, "total": 3, "items": [["newapp.exe", 3, 0]]})
+    path = str(tmp_path / "backup.gbtw")
+    counts = snapshot.write_snapshot(path, state=source, activity=_history(), event_log_dir=None)
+
+    (tmp_path / "dest").mkdir()
+    dest = storage.JsonFileStorage(str(tmp_path / "dest"))
+    dest.write("points", {"points": 99})
+    dest.write("settings", {"difficulty_level": "hard"})
+    restored = snapshot.restore_snapshot(path, state=dest, activity=_history(), event_log_dir=None)
+
+    assert restored == counts
+    assert sorted(dest.keys()) == ["points", "unclassified"]
+    assert dest.read("unclassified") == source.read("unclassified")
+    assert dest.read("points") == {"points": 5}